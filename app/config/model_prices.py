@@ -0,0 +1,53 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class ModelPrice:
+    """Price of a model in USD per million tokens"""
+
+    input: float
+    output: float
+    # Input tokens read from and written to the provider's prompt cache
+    cache_read: float
+    cache_write: float
+
+    def cost(
+        self,
+        input_tokens: int,
+        output_tokens: int,
+        cache_read_tokens: int = 0,
+        cache_creation_tokens: int = 0,
+    ) -> float:
+        """Cost of a call in USD, input_tokens includes the cached tokens."""
+        uncached = max(input_tokens - cache_read_tokens - cache_creation_tokens, 0)
+        return (
+            uncached * self.input
+            + cache_read_tokens * self.cache_read
+            + cache_creation_tokens * self.cache_write
+            + output_tokens * self.output
+        ) / 1_000_000
+
+
+# List prices as of June 2025, update when adding a model to a prompt config
+MODEL_PRICES: Dict[str, ModelPrice] = {
+    "openai/gpt-4o": ModelPrice(
+        input=2.50, output=10.00, cache_read=1.25, cache_write=2.50
+    ),
+    "openai/gpt-4o-mini": ModelPrice(
+        input=0.15, output=0.60, cache_read=0.075, cache_write=0.15
+    ),
+    "anthropic/claude-sonnet-4-20250514": ModelPrice(
+        input=3.00, output=15.00, cache_read=0.30, cache_write=3.75
+    ),
+    "google/gemini-2.5-flash-preview-04-17": ModelPrice(
+        input=0.15, output=0.60, cache_read=0.0375, cache_write=0.15
+    ),
+}
+
+
+def model_price(model: str) -> Optional[ModelPrice]:
+    """Price of a model, free for the fake model and None if unknown."""
+    if model.startswith("fake/"):
+        return ModelPrice(input=0.0, output=0.0, cache_read=0.0, cache_write=0.0)
+    return MODEL_PRICES.get(model)
@@ -12,6 +12,8 @@ class PromptConfig(BaseModel):
     path: str
     model: str
     temperature: float = 0.0
+    # Headlines per request when articles are analysed in batches
+    batch_size: int = 1
     content: Optional[str] = None
 
     def load_content(self, base_path: Path) -> str:
@@ -29,6 +31,9 @@ class PromptsConfig(BaseModel):
     clickbait_score: PromptConfig
     emotional_impact: PromptConfig
     category_tag: PromptConfig
+    # Single call returning all four analyses, used instead of the prompts
+    # above when set
+    combined: Optional[PromptConfig] = None
 
     def load_prompt(self, prompt_name: str, base_path: Path = Path("app")) -> None:
         """Load a specific prompt by name"""
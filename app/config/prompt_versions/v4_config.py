@@ -0,0 +1,45 @@
+from app.config.prompt_config import PromptConfig, PromptsConfig
+
+VERSION = 4
+TEMPERATURE = 1.0
+MODEL = "anthropic/claude-sonnet-4-20250514"
+# Headlines per request when analysing articles in batches
+BATCH_SIZE = 10
+
+prompt_config: PromptsConfig = PromptsConfig(
+    headline_sentiment=PromptConfig(
+        version=VERSION,
+        path="prompts/headline-sentiment-v1.txt",
+        model=MODEL,
+        temperature=TEMPERATURE,
+        batch_size=BATCH_SIZE,
+    ),
+    clickbait_score=PromptConfig(
+        version=VERSION,
+        path="prompts/clickbait-score-v1.txt",
+        model=MODEL,
+        temperature=TEMPERATURE,
+        batch_size=BATCH_SIZE,
+    ),
+    emotional_impact=PromptConfig(
+        version=VERSION,
+        path="prompts/emotional-impact-tag-v1.txt",
+        model=MODEL,
+        temperature=TEMPERATURE,
+        batch_size=BATCH_SIZE,
+    ),
+    category_tag=PromptConfig(
+        version=VERSION,
+        path="prompts/category-tag-v1.txt",
+        model=MODEL,
+        temperature=TEMPERATURE,
+        batch_size=BATCH_SIZE,
+    ),
+    combined=PromptConfig(
+        version=VERSION,
+        path="prompts/combined-analysis-v1.txt",
+        model=MODEL,
+        temperature=TEMPERATURE,
+        batch_size=BATCH_SIZE,
+    ),
+)
@@ -1,4 +1,4 @@
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Set
 import logging
 from app.config.settings import settings
 from supabase import create_client, Client
@@ -17,6 +17,27 @@ class Database:
             supabase_key=settings.SUPABASE_KEY,
         )
 
+    @staticmethod
+    def _build_article_row(
+        title: str,
+        url: str,
+        description: Optional[str] = None,
+        category: Optional[str] = None,
+        media_url: Optional[str] = None,
+        publish_date: Optional[str] = None,
+        source: str = "Unknown",
+    ) -> Dict[str, Any]:
+        """Clean article fields into a news_articles row."""
+        return {
+            "title": title.strip(),
+            "url": url.strip(),
+            "description": strip_html(description),
+            "category": category.strip() if category else "UNKNOWN",
+            "media_url": media_url.strip() if media_url else None,
+            "publish_date": publish_date,
+            "source": source.strip() if source else "Unknown",
+        }
+
     async def insert_article(
         self,
         title: str,
@@ -46,15 +67,15 @@ class Database:
         """
 
         try:
-            article_data = {
-                "title": title.strip(),
-                "url": url.strip(),
-                "description": strip_html(description),
-                "category": category.strip() if category else "UNKNOWN",
-                "media_url": media_url.strip() if media_url else None,
-                "publish_date": publish_date,
-                "source": source.strip() if source else "Unknown",
-            }
+            article_data = self._build_article_row(
+                title=title,
+                url=url,
+                description=description,
+                category=category,
+                media_url=media_url,
+                publish_date=publish_date,
+                source=source,
+            )
 
             response = (
                 self.supabase.table("news_articles").insert(article_data).execute()
@@ -69,6 +90,87 @@ class Database:
                 return None
             raise
 
+    async def insert_articles(
+        self,
+        articles: List[Dict[str, Any]],
+        already_clean: bool = False,
+        update_existing: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Insert many news articles in one request, skipping known URLs.
+
+        Uses an upsert with ON CONFLICT (url) DO NOTHING, so duplicates are
+        skipped by the database instead of raising a unique violation.
+
+        Args:
+            articles: Article dicts with the same keys as the insert_article arguments
+            already_clean: Articles are already cleaned news_articles rows, e.g.
+                from ArticleRecord.to_row, and are inserted as is
+            update_existing: Overwrite the articles already stored with the same
+                URL instead of skipping them, e.g. to reprocess archived feeds
+
+        Returns:
+            List[Dict[str, Any]]: Only the rows that were actually inserted, or
+                inserted and updated with update_existing
+
+        Raises:
+            APIError: If there's an error inserting the articles
+        """
+        rows_by_url: Dict[str, Dict[str, Any]] = {}
+        for article in articles:
+            row = article if already_clean else self._build_article_row(**article)
+            rows_by_url.setdefault(row["url"], row)
+
+        if not rows_by_url:
+            return []
+
+        try:
+            response = (
+                self.supabase.table("news_articles")
+                .upsert(
+                    list(rows_by_url.values()),
+                    on_conflict="url",
+                    ignore_duplicates=not update_existing,
+                )
+                .execute()
+            )
+
+            return response.data if response.data else []
+
+        except APIError as e:
+            logger.error(f"Error inserting articles: {e}")
+            raise
+
+    async def insert_article_aliases(
+        self, aliases: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Link duplicate copies of a story to the article ingested for it.
+
+        Args:
+            aliases: Dicts with the duplicate's url, title and source, and the
+                news_article_url of the canonical article
+
+        Returns:
+            List[Dict[str, Any]]: Only the aliases that were actually inserted
+
+        Raises:
+            APIError: If there's an error inserting the aliases
+        """
+        if not aliases:
+            return []
+
+        try:
+            response = (
+                self.supabase.table("news_article_aliases")
+                .upsert(aliases, on_conflict="url", ignore_duplicates=True)
+                .execute()
+            )
+
+            return response.data if response.data else []
+
+        except APIError as e:
+            logger.error(f"Error inserting article aliases: {e}")
+            raise
+
     async def insert_article_sentiment(
         self,
         news_article_id: int,
@@ -197,6 +299,112 @@ class Database:
             logger.error(f"Error inserting category tags: {e}")
             raise
 
+    async def insert_article_sentiments(
+        self, sentiments: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Insert the sentiment analysis results of many articles in one request.
+
+        Args:
+            sentiments: Dicts with the same keys as the insert_article_sentiment
+                arguments
+
+        Returns:
+            List[Dict[str, Any]]: The inserted sentiment rows, with their ids
+
+        Raises:
+            APIError: If there's an error inserting the sentiments
+        """
+        if not sentiments:
+            return []
+
+        try:
+            response = (
+                self.supabase.table("news_article_sentiments")
+                .insert(sentiments)
+                .execute()
+            )
+
+            return response.data if response.data else []
+
+        except APIError as e:
+            logger.error(f"Error inserting article sentiments: {e}")
+            raise
+
+    async def insert_emotional_impact_tags_bulk(
+        self, tags: List[Dict[str, Any]]
+    ) -> None:
+        """Insert the emotional impact tags of many sentiments in one request.
+
+        Args:
+            tags: Dicts with the news_article_sentiment_id, primary_tag and
+                secondary_tags of each sentiment
+        """
+        await self._insert_tags_bulk(
+            tags,
+            "emotional_impact_tags",
+            "news_article_emotional_impact",
+            "emotional_impact_tag_id",
+        )
+
+    async def insert_category_tags_bulk(self, tags: List[Dict[str, Any]]) -> None:
+        """Insert the category tags of many sentiments in one request.
+
+        Args:
+            tags: Dicts with the news_article_sentiment_id, primary_tag and
+                secondary_tags of each sentiment
+        """
+        await self._insert_tags_bulk(
+            tags, "category_tags", "news_article_tags", "category_tag_id"
+        )
+
+    async def _insert_tags_bulk(
+        self,
+        tags: List[Dict[str, Any]],
+        tag_table: str,
+        link_table: str,
+        tag_id_column: str,
+    ) -> None:
+        all_tags = {
+            tag_name
+            for tag in tags
+            for tag_name in [tag["primary_tag"]] + tag["secondary_tags"]
+        }
+        if not all_tags:
+            return
+
+        try:
+            response = (
+                self.supabase.table(tag_table)
+                .select("id, tag_name")
+                .in_("tag_name", list(all_tags))
+                .execute()
+            )
+            tag_id_map = {tag["tag_name"]: tag["id"] for tag in response.data}
+
+            links = []
+            for tag in tags:
+                # The same tag as primary and secondary is linked once
+                for tag_name in dict.fromkeys(
+                    [tag["primary_tag"]] + tag["secondary_tags"]
+                ):
+                    tag_id = tag_id_map.get(tag_name)
+                    if tag_id:
+                        links.append(
+                            {
+                                "news_article_sentiment_id": tag[
+                                    "news_article_sentiment_id"
+                                ],
+                                tag_id_column: tag_id,
+                                "is_primary": tag_name == tag["primary_tag"],
+                            }
+                        )
+            if links:
+                self.supabase.table(link_table).insert(links).execute()
+
+        except APIError as e:
+            logger.error(f"Error inserting {tag_table}: {e}")
+            raise
+
     async def get_articles_without_sentiment(
         self, limit: int = 100, created_after: Optional[str] = "2024-12-31T00:00:00Z"
     ) -> List[Dict[str, Any]]:
@@ -233,6 +441,126 @@ class Database:
             logger.error(f"Error fetching articles without sentiment: {e}")
             raise
 
+    async def get_articles_with_sentiment(self, article_ids: List[int]) -> Set[int]:
+        """Get which of the given articles already have a sentiment record.
+
+        Args:
+            article_ids: Ids of the articles to check
+
+        Returns:
+            Set[int]: Ids of the articles with at least one sentiment record
+
+        Raises:
+            APIError: If there's an error fetching the sentiments
+        """
+        if not article_ids:
+            return set()
+
+        try:
+            response = (
+                self.supabase.table("news_article_sentiments")
+                .select("news_article_id")
+                .in_("news_article_id", article_ids)
+                .execute()
+            )
+
+            return {row["news_article_id"] for row in response.data or []}
+
+        except APIError as e:
+            logger.error(f"Error fetching article sentiments: {e}")
+            raise
+
+    async def get_article_urls(
+        self, after_id: int = 0, limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        """Get the id and url of articles with an id greater than after_id.
+
+        Args:
+            after_id: Only return articles with an id greater than this
+            limit: Maximum number of articles to return
+
+        Returns:
+            List[Dict[str, Any]]: Articles ordered by id ascending
+
+        Raises:
+            APIError: If there's an error fetching the articles
+        """
+        try:
+            response = (
+                self.supabase.table("news_articles")
+                .select("id, url")
+                .gt("id", after_id)
+                .order("id")
+                .limit(limit)
+                .execute()
+            )
+
+            return response.data if response.data else []
+
+        except APIError as e:
+            logger.error(f"Error fetching article urls: {e}")
+            raise
+
+    async def get_articles_without_content(
+        self, limit: int = 100, created_after: Optional[str] = "2024-12-31T00:00:00Z"
+    ) -> List[Dict[str, Any]]:
+        """Get the newest articles whose page has not been fetched yet.
+
+        Args:
+            limit: Maximum number of articles to return
+            created_after: Only return articles created after this timestamp
+
+        Returns:
+            List[Dict[str, Any]]: The id, url and source of each article
+
+        Raises:
+            APIError: If there's an error fetching the articles
+        """
+        try:
+            response = (
+                self.supabase.table("news_articles")
+                .select("id, url, source")
+                .is_("content", "null")
+                .is_("hidden", "null")
+                .gte("created_at", created_after)
+                .order("id", desc=True)
+                .limit(limit)
+                .execute()
+            )
+
+            return response.data if response.data else []
+
+        except APIError as e:
+            logger.error(f"Error fetching articles without content: {e}")
+            raise
+
+    async def update_article_contents(self, articles: List[Dict[str, Any]]) -> int:
+        """Store the extracted content of many articles in one request.
+
+        Args:
+            articles: Dicts with the article id, content, markdown_content and
+                html_content
+
+        Returns:
+            int: Number of articles updated
+
+        Raises:
+            APIError: If there's an error updating the articles
+        """
+        if not articles:
+            return 0
+
+        try:
+            response = self.supabase.rpc(
+                "update_article_contents", {"articles": articles}
+            ).execute()
+
+            return response.data if isinstance(response.data, int) else 0
+
+        except APIError as e:
+            logger.error(f"Error updating article contents: {e}")
+            raise
+
     async def get_latest_articles(
         self,
         limit: int = 500,
@@ -265,3 +593,51 @@ class Database:
         except APIError as e:
             logger.error(f"Error fetching latest articles: {e}")
             raise
+
+    async def claim_feed_shards(
+        self, worker_id: str, num_shards: int, lease_seconds: int
+    ) -> List[int]:
+        """Renew this worker's shard leases and claim its fair share of free ones.
+
+        Args:
+            worker_id: Unique id of the calling worker
+            num_shards: Total number of logical shards, the same for all workers
+            lease_seconds: How long the leases last without being renewed
+
+        Returns:
+            List[int]: The shards now leased to the worker
+
+        Raises:
+            APIError: If there's an error claiming the shards
+        """
+        try:
+            response = self.supabase.rpc(
+                "claim_feed_shards",
+                {
+                    "worker": worker_id,
+                    "num_shards": num_shards,
+                    "lease_seconds": lease_seconds,
+                },
+            ).execute()
+
+            return [row["shard"] for row in response.data] if response.data else []
+
+        except APIError as e:
+            logger.error(f"Error claiming feed shards: {e}")
+            raise
+
+    async def release_feed_shards(self, worker_id: str) -> None:
+        """Release all shard leases held by a worker, e.g. on shutdown.
+
+        Args:
+            worker_id: Unique id of the worker
+
+        Raises:
+            APIError: If there's an error releasing the shards
+        """
+        try:
+            self.supabase.rpc("release_feed_shards", {"worker": worker_id}).execute()
+
+        except APIError as e:
+            logger.error(f"Error releasing feed shards: {e}")
+            raise
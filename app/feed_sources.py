@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List
+from typing import List, Optional
 
 
 @dataclass
@@ -7,6 +7,9 @@ class FeedSource:
     id: str
     name: str
     url: str
+    # Seconds to connect and to read the whole feed, defaults to FeedFetcher's
+    connect_timeout: Optional[float] = None
+    read_timeout: Optional[float] = None
 
 
 # NOTE:
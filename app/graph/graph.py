@@ -1,13 +1,21 @@
+import asyncio
 import logging
-from typing import List, Optional, TypedDict, cast
+from typing import Any, Awaitable, Dict, List, Optional, TypedDict, TypeVar, cast
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.state import CompiledStateGraph
 
 from app.config.prompt_config import PromptConfig
-from app.services.sentiment_analyzer import SentimentAnalyzer
-from app.services.category_analyzer import CategoryAnalyzer
-from app.services.emotional_impact_analyzer import EmotionalImpactAnalyzer
-from app.services.clickbait_analyzer import ClickbaitAnalyzer
+from app.config.prompt_config import prompt_config as prompts_config
+from app.llm.usage import call_context, llm_metrics
+from app.services.sentiment_analyzer import HeadlineSentiment, SentimentAnalyzer
+from app.services.category_analyzer import CategoryAnalyzer, CategoryTagResponse
+from app.services.emotional_impact_analyzer import (
+    EmotionalImpactAnalyzer,
+    EmotionalImpactResponse,
+)
+from app.services.clickbait_analyzer import ClickbaitAnalyzer, ClickbaitScore
+from app.services.combined_analyzer import CombinedAnalysisResponse, CombinedAnalyzer
+from app.services.analyzer_registry import get_analyzer
 from app.db import Database
 
 from dotenv import load_dotenv
@@ -16,6 +24,8 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class SentimentData(TypedDict):
     sentiment: str
@@ -47,19 +57,19 @@ class OverallState(InputState):
     categories: TagData
 
 
-async def handle_get_sentiment(state: OverallState) -> OverallState:
+async def handle_get_sentiment(state: OverallState) -> Dict[str, SentimentData]:
     """Process sentiment analysis for the headline."""
     try:
-        analyzer = SentimentAnalyzer()
-        sentiment_result, prompt_config = await analyzer.analyze_headline(
-            state["headline"]
-        )
+        analyzer = get_analyzer(SentimentAnalyzer)
+        with call_context("sentiment", [state["news_article_id"]]):
+            sentiment_result, prompt_config = await analyzer.analyze_headline(
+                state["headline"]
+            )
         logger.info(
             f"Sentiment analysis completed for headline: {state['headline'][:50]}..."
         )
 
         return {
-            **state,
             "sentiment": {
                 "sentiment": sentiment_result.sentiment,
                 "confidence": sentiment_result.confidence,
@@ -71,20 +81,20 @@ async def handle_get_sentiment(state: OverallState) -> OverallState:
         raise
 
 
-async def handle_get_category(state: OverallState) -> OverallState:
+async def handle_get_category(state: OverallState) -> Dict[str, TagData]:
     """Process category analysis for the headline."""
     try:
-        analyzer = CategoryAnalyzer()
+        analyzer = get_analyzer(CategoryAnalyzer)
         description = state.get("description", None)
-        category_result, prompt_config = await analyzer.analyze_headline(
-            state["headline"], description
-        )
+        with call_context("categories", [state["news_article_id"]]):
+            category_result, prompt_config = await analyzer.analyze_headline(
+                state["headline"], description
+            )
         logger.info(
             f"Category analysis completed for headline: {state['headline'][:50]}..."
         )
 
         return {
-            **state,
             "categories": {
                 "primary_tag": category_result.primary_tag,
                 "secondary_tags": category_result.secondary_tags,
@@ -96,19 +106,19 @@ async def handle_get_category(state: OverallState) -> OverallState:
         raise
 
 
-async def handle_get_emotional_impact(state: OverallState) -> OverallState:
+async def handle_get_emotional_impact(state: OverallState) -> Dict[str, TagData]:
     """Process emotional impact analysis for the headline."""
     try:
-        analyzer = EmotionalImpactAnalyzer()
-        emotional_result, prompt_config = await analyzer.analyze_headline(
-            state["headline"]
-        )
+        analyzer = get_analyzer(EmotionalImpactAnalyzer)
+        with call_context("emotional_impact", [state["news_article_id"]]):
+            emotional_result, prompt_config = await analyzer.analyze_headline(
+                state["headline"]
+            )
         logger.info(
             f"Emotional impact analysis completed for headline: {state['headline'][:50]}..."
         )
 
         return {
-            **state,
             "emotional_impact": {
                 "primary_tag": emotional_result.primary_tag,
                 "secondary_tags": emotional_result.secondary_tags,
@@ -120,19 +130,19 @@ async def handle_get_emotional_impact(state: OverallState) -> OverallState:
         raise
 
 
-async def handle_get_clickbait(state: OverallState) -> OverallState:
+async def handle_get_clickbait(state: OverallState) -> Dict[str, ClickbaitData]:
     """Process clickbait analysis for the headline."""
     try:
-        analyzer = ClickbaitAnalyzer()
-        clickbait_result, prompt_config = await analyzer.analyze_headline(
-            state["headline"]
-        )
+        analyzer = get_analyzer(ClickbaitAnalyzer)
+        with call_context("clickbait", [state["news_article_id"]]):
+            clickbait_result, prompt_config = await analyzer.analyze_headline(
+                state["headline"]
+            )
         logger.info(
             f"Clickbait analysis completed for headline: {state['headline'][:50]}..."
         )
 
         return {
-            **state,
             "clickbait": {
                 "score": clickbait_result.score,
                 "prompt_config": prompt_config,
@@ -143,39 +153,130 @@ async def handle_get_clickbait(state: OverallState) -> OverallState:
         raise
 
 
+async def handle_get_combined_analysis(
+    state: OverallState,
+) -> Dict[str, SentimentData | ClickbaitData | TagData]:
+    """Process all four analyses for the headline in a single LLM call."""
+    try:
+        analyzer = get_analyzer(CombinedAnalyzer)
+        description = state.get("description", None)
+        with call_context("combined", [state["news_article_id"]]):
+            result, prompt_config = await analyzer.analyze_headline(
+                state["headline"], description
+            )
+        logger.info(
+            f"Combined analysis completed for headline: {state['headline'][:50]}..."
+        )
+
+        return combined_state(result, prompt_config)
+    except Exception as e:
+        logger.error(f"Error in combined analysis: {str(e)}", exc_info=True)
+        raise
+
+
+def combined_state(
+    result: CombinedAnalysisResponse, prompt_config: PromptConfig
+) -> Dict[str, SentimentData | ClickbaitData | TagData]:
+    """Same state, and so the same version_info and rows, as the separate nodes."""
+    return {
+        "sentiment": {
+            "sentiment": result.sentiment,
+            "confidence": result.confidence,
+            "prompt_config": prompt_config,
+        },
+        "clickbait": {
+            "score": result.clickbait_score,
+            "prompt_config": prompt_config,
+        },
+        "emotional_impact": {
+            "primary_tag": result.emotional_impact.primary_tag,
+            "secondary_tags": result.emotional_impact.secondary_tags,
+            "prompt_config": prompt_config,
+        },
+        "categories": {
+            "primary_tag": result.categories.primary_tag,
+            "secondary_tags": result.categories.secondary_tags,
+            "prompt_config": prompt_config,
+        },
+    }
+
+
+def separate_state(
+    sentiment: HeadlineSentiment,
+    sentiment_config: PromptConfig,
+    categories: CategoryTagResponse,
+    category_config: PromptConfig,
+    emotional_impact: EmotionalImpactResponse,
+    emotional_impact_config: PromptConfig,
+    clickbait: ClickbaitScore,
+    clickbait_config: PromptConfig,
+) -> Dict[str, SentimentData | ClickbaitData | TagData]:
+    """State of the four separate analyses, as written by the graph nodes."""
+    return {
+        "sentiment": {
+            "sentiment": sentiment.sentiment,
+            "confidence": sentiment.confidence,
+            "prompt_config": sentiment_config,
+        },
+        "categories": {
+            "primary_tag": categories.primary_tag,
+            "secondary_tags": categories.secondary_tags,
+            "prompt_config": category_config,
+        },
+        "emotional_impact": {
+            "primary_tag": emotional_impact.primary_tag,
+            "secondary_tags": emotional_impact.secondary_tags,
+            "prompt_config": emotional_impact_config,
+        },
+        "clickbait": {
+            "score": clickbait.score,
+            "prompt_config": clickbait_config,
+        },
+    }
+
+
 async def return_news_sentiment(state: OverallState) -> OverallState:
     """Return the state"""
     return state
 
 
-async def save_news_sentiment(state: OverallState) -> bool:
+def version_info(state: OverallState, store_metrics: bool = False) -> Dict[str, Any]:
+    """Prompt configs of the analyses, stored with the sentiment, and the
+    article's LLM call metrics if `store_metrics` is set."""
+    info = {
+        "sentiment": state["sentiment"]["prompt_config"].model_dump(
+            exclude={"content"}
+        ),
+        "categories": state["categories"]["prompt_config"].model_dump(
+            exclude={"content"}
+        ),
+        "emotional_impact": state["emotional_impact"]["prompt_config"].model_dump(
+            exclude={"content"}
+        ),
+        "clickbait": state["clickbait"]["prompt_config"].model_dump(
+            exclude={"content"}
+        ),
+    }
+    if store_metrics:
+        info["metrics"] = llm_metrics.article(state["news_article_id"])
+    return info
+
+
+async def save_news_sentiment(
+    state: OverallState, db: Optional[Database] = None, store_metrics: bool = False
+) -> bool:
     """Add news sentiment to the state."""
     try:
-        db = Database()
+        db = db or Database()
         news_article_id = state["news_article_id"]
         logger.info(f"Saving sentiment analysis for article ID: {news_article_id}")
 
-        version_info = {
-            "sentiment": state["sentiment"]["prompt_config"].model_dump(
-                exclude={"content"}
-            ),
-            "categories": state["categories"]["prompt_config"].model_dump(
-                exclude={"content"}
-            ),
-            "emotional_impact": state["emotional_impact"]["prompt_config"].model_dump(
-                exclude={"content"}
-            ),
-            "clickbait": state["clickbait"]["prompt_config"].model_dump(
-                exclude={"content"}
-            ),
-        }
-
         sentiment_result = await db.insert_article_sentiment(
             news_article_id=news_article_id,
             sentiment_label=state["sentiment"]["sentiment"],
             sentiment_confidence=state["sentiment"]["confidence"],
             clickbait_level=int(state["clickbait"]["score"]),
-            version_info=version_info,
+            version_info=version_info(state, store_metrics),
         )
 
         if sentiment_result:
@@ -208,6 +309,61 @@ async def save_news_sentiment(state: OverallState) -> bool:
         return False
 
 
+async def save_news_sentiments(
+    states: List[OverallState],
+    db: Optional[Database] = None,
+    store_metrics: bool = False,
+) -> int:
+    """Save the analyses of many articles with a few bulk inserts.
+
+    Used to ingest batch jobs, where saving article by article would take
+    several requests per article.
+
+    Returns:
+        int: Number of articles saved
+    """
+    if not states:
+        return 0
+    db = db or Database()
+    sentiments = await db.insert_article_sentiments(
+        [
+            {
+                "news_article_id": state["news_article_id"],
+                "sentiment_label": state["sentiment"]["sentiment"],
+                "sentiment_confidence": state["sentiment"]["confidence"],
+                "clickbait_level": int(state["clickbait"]["score"]),
+                "version_info": version_info(state, store_metrics),
+            }
+            for state in states
+        ]
+    )
+    sentiment_ids = {row["news_article_id"]: row["id"] for row in sentiments}
+    saved = [state for state in states if state["news_article_id"] in sentiment_ids]
+
+    await db.insert_emotional_impact_tags_bulk(
+        [
+            {
+                "news_article_sentiment_id": sentiment_ids[state["news_article_id"]],
+                "primary_tag": state["emotional_impact"]["primary_tag"],
+                "secondary_tags": state["emotional_impact"]["secondary_tags"],
+            }
+            for state in saved
+        ]
+    )
+    await db.insert_category_tags_bulk(
+        [
+            {
+                "news_article_sentiment_id": sentiment_ids[state["news_article_id"]],
+                "primary_tag": state["categories"]["primary_tag"],
+                "secondary_tags": state["categories"]["secondary_tags"],
+            }
+            for state in saved
+        ]
+    )
+    logger.info(f"Saved sentiment analysis of {len(saved)} articles")
+    return len(saved)
+
+
 # Build graph
 builder = StateGraph(
     OverallState,
@@ -220,18 +376,39 @@ builder.add_node("get_emotional_impact", handle_get_emotional_impact)
 builder.add_node("get_clickbait", handle_get_clickbait)
 builder.add_node("return_news_sentiment", return_news_sentiment)
 # Logic
-builder.add_edge(START, "get_sentiment")
-builder.add_edge("get_sentiment", "get_category")
-builder.add_edge("get_category", "get_emotional_impact")
-builder.add_edge("get_emotional_impact", "get_clickbait")
-builder.add_edge("get_clickbait", "return_news_sentiment")
+# The four analyses are independent, so they run concurrently and each node
+# only writes its own key. return_news_sentiment waits for all of them
+ANALYSIS_NODES = [
+    "get_sentiment",
+    "get_category",
+    "get_emotional_impact",
+    "get_clickbait",
+]
+for node in ANALYSIS_NODES:
+    builder.add_edge(START, node)
+builder.add_edge(ANALYSIS_NODES, "return_news_sentiment")
 builder.add_edge("return_news_sentiment", END)
 
 # Add
 graph: CompiledStateGraph = builder.compile()
 
+# Prompt versions with a combined prompt analyse each headline in one call
+combined_builder = StateGraph(
+    OverallState,
+    input=InputState,
+)
+combined_builder.add_node("get_combined_analysis", handle_get_combined_analysis)
+combined_builder.add_node("return_news_sentiment", return_news_sentiment)
+combined_builder.add_edge(START, "get_combined_analysis")
+combined_builder.add_edge("get_combined_analysis", "return_news_sentiment")
+combined_builder.add_edge("return_news_sentiment", END)
+
+combined_graph: CompiledStateGraph = combined_builder.compile()
+
 
-async def run_graph(app_input: InputState):
+async def run_graph(
+    app_input: InputState, db: Optional[Database] = None, store_metrics: bool = False
+):
     try:
         if not app_input:
             raise ValueError("No input provided")
@@ -240,7 +417,7 @@ async def run_graph(app_input: InputState):
 
         result: OverallState = cast(
             OverallState,
-            await graph.ainvoke(
+            await (combined_graph if prompts_config.combined else graph).ainvoke(
                 input=app_input,
                 config={"configurable": {"thread_id": "1"}},
                 debug=True,
@@ -249,7 +426,7 @@ async def run_graph(app_input: InputState):
 
         logger.info("Analysis completed. Result Attached", extra={"result": result})
 
-        save_result = await save_news_sentiment(result)
+        save_result = await save_news_sentiment(result, db, store_metrics)
         if save_result:
             logger.info(
                 f"Successfully saved analysis for article ID: {app_input['news_article_id']}"
@@ -262,3 +439,137 @@ async def run_graph(app_input: InputState):
     except Exception as e:
         logger.error(f"Error running analysis graph: {str(e)}", exc_info=True)
         raise
+
+
+def analysis_batch_size() -> int:
+    """Headlines per request of the current prompt config, 1 if not batched."""
+    if prompts_config.combined:
+        return prompts_config.combined.batch_size
+    return max(
+        prompts_config.headline_sentiment.batch_size,
+        prompts_config.category_tag.batch_size,
+        prompts_config.emotional_impact.batch_size,
+        prompts_config.clickbait_score.batch_size,
+    )
+
+
+async def analyze_batch(
+    app_inputs: List[InputState],
+) -> List[Optional[OverallState]]:
+    """Analyse several articles with batched prompts, instead of the graph.
+
+    Each analyzer sends `batch_size` headlines per request of its prompt config
+    and the four analyzers run concurrently. Articles with a failed analysis
+    are None.
+    """
+    headlines = [app_input["headline"] for app_input in app_inputs]
+    article_ids = [app_input["news_article_id"] for app_input in app_inputs]
+    described = [
+        (app_input["headline"], app_input.get("description"))
+        for app_input in app_inputs
+    ]
+    states: List[Optional[OverallState]] = []
+
+    if prompts_config.combined:
+        with call_context("combined", article_ids):
+            results, prompt_config = await get_analyzer(
+                CombinedAnalyzer
+            ).analyze_headlines(described)
+        for app_input, result in zip(app_inputs, results):
+            states.append(
+                cast(
+                    OverallState, {**app_input, **combined_state(result, prompt_config)}
+                )
+                if result
+                else None
+            )
+        return states
+
+    (
+        (sentiments, sentiment_config),
+        (categories, category_config),
+        (emotional_impacts, emotional_impact_config),
+        (clickbaits, clickbait_config),
+    ) = await asyncio.gather(
+        _attributed(
+            "sentiment",
+            article_ids,
+            get_analyzer(SentimentAnalyzer).analyze_headlines(headlines),
+        ),
+        _attributed(
+            "categories",
+            article_ids,
+            get_analyzer(CategoryAnalyzer).analyze_headlines(described),
+        ),
+        _attributed(
+            "emotional_impact",
+            article_ids,
+            get_analyzer(EmotionalImpactAnalyzer).analyze_headlines(headlines),
+        ),
+        _attributed(
+            "clickbait",
+            article_ids,
+            get_analyzer(ClickbaitAnalyzer).analyze_headlines(headlines),
+        ),
+    )
+    for app_input, sentiment, category, emotional_impact, clickbait in zip(
+        app_inputs, sentiments, categories, emotional_impacts, clickbaits
+    ):
+        if not (sentiment and category and emotional_impact and clickbait):
+            states.append(None)
+            continue
+        states.append(
+            cast(
+                OverallState,
+                {
+                    **app_input,
+                    **separate_state(
+                        sentiment,
+                        sentiment_config,
+                        category,
+                        category_config,
+                        emotional_impact,
+                        emotional_impact_config,
+                        clickbait,
+                        clickbait_config,
+                    ),
+                },
+            )
+        )
+    return states
+
+
+async def _attributed(
+    analysis: str, article_ids: List[int], analysis_call: Awaitable[T]
+) -> T:
+    # Each analysis runs in its own task, so its context is its own
+    with call_context(analysis, article_ids):
+        return await analysis_call
+
+
+async def run_batch(
+    app_inputs: List[InputState],
+    db: Optional[Database] = None,
+    store_metrics: bool = False,
+) -> List[bool]:
+    """Analyse and save several articles with batched prompts.
+
+    Returns whether each article was analysed and saved.
+    """
+    logger.info(f"Starting batched analysis of {len(app_inputs)} articles")
+    states = await analyze_batch(app_inputs)
+    return list(
+        await asyncio.gather(
+            *(
+                save_news_sentiment(state, db, store_metrics)
+                if state
+                else _failed(app_input)
+                for app_input, state in zip(app_inputs, states)
+            )
+        )
+    )
+
+
+async def _failed(app_input: InputState) -> bool:
+    logger.error(f"Failed to analyse article ID: {app_input['news_article_id']}")
+    return False
@@ -0,0 +1,144 @@
+import asyncio
+import re
+import time
+from typing import Any, List, Literal, Optional, Set, Type, get_args, get_origin
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel
+
+
+# Items of a batch prompt, see app.services.batch_analysis
+_ITEM_RE = re.compile(r"^Item \d+:", re.MULTILINE)
+
+
+def fake_response(
+    response_model: Type[BaseModel], items: int = 0, index: int = 0
+) -> BaseModel:
+    """A valid instance of a response model, built from its field types.
+
+    Lists of models get one result per item of a batch prompt, numbered by
+    their `index` field.
+    """
+    values: dict[str, Any] = {}
+    for name, field in response_model.model_fields.items():
+        annotation = field.annotation
+        if get_origin(annotation) is Literal:
+            values[name] = get_args(annotation)[0]
+        elif annotation is int:
+            values[name] = index if name == "index" else 50
+        elif annotation is float:
+            values[name] = 0.5
+        elif get_origin(annotation) is list:
+            item_type = get_args(annotation)[0]
+            if isinstance(item_type, type) and issubclass(item_type, BaseModel):
+                values[name] = [fake_response(item_type, index=i) for i in range(items)]
+            else:
+                values[name] = []
+        elif isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            values[name] = fake_response(annotation)
+        else:
+            values[name] = "fake"
+    return response_model.model_validate(values)
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+        )
+    return str(content)
+
+
+def _count_items(prompt: Any) -> int:
+    text = prompt.to_string() if hasattr(prompt, "to_string") else str(prompt)
+    return len(_ITEM_RE.findall(text))
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model that answers after a fixed latency without calling a provider.
+
+    Selected with the "fake/<latency seconds>" model name, e.g. "fake/0.5", to
+    benchmark the analysis pipeline without API keys or cost. The sync API
+    blocks for the latency like a real client would, the async API sleeps.
+
+    Responses report usage_metadata with a rough count of the input tokens at
+    4 characters per token, to compare prompt versions. Prompt caching is
+    simulated like Anthropic's: only system message blocks marked with
+    cache_control are cached, and count as cached tokens once seen before.
+    Unmarked prefixes, which OpenAI and Gemini would cache on their own, are
+    never reported as cached.
+    """
+
+    latency: float = 0.5
+    cached_prefixes: Set[str] = set()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        input_tokens = sum(len(_text(m.content)) for m in messages) // 4
+        prefix = "".join(
+            block["text"]
+            for m in messages
+            if isinstance(m, SystemMessage) and isinstance(m.content, list)
+            for block in m.content
+            if isinstance(block, dict) and "cache_control" in block
+        )
+        cached = prefix in self.cached_prefixes
+        if prefix:
+            self.cached_prefixes.add(prefix)
+        message = AIMessage(
+            content="",
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": 20,
+                "total_tokens": input_tokens + 20,
+                "input_token_details": {
+                    "cache_read": len(prefix) // 4 if cached else 0,
+                    "cache_creation": 0 if cached else len(prefix) // 4,
+                },
+            },
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Any = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    def with_structured_output(  # type: ignore[override]
+        self, schema: Type[BaseModel], include_raw: bool = False, **kwargs: Any
+    ) -> Runnable:
+        def output(raw: BaseMessage, prompt: Any) -> Any:
+            parsed = fake_response(schema, _count_items(prompt))
+            if include_raw:
+                return {"raw": raw, "parsed": parsed, "parsing_error": None}
+            return parsed
+
+        def respond(prompt: Any) -> Any:
+            return output(self.invoke(prompt), prompt)
+
+        async def arespond(prompt: Any) -> Any:
+            return output(await self.ainvoke(prompt), prompt)
+
+        return RunnableLambda(respond, afunc=arespond)
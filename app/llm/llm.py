@@ -1,11 +1,15 @@
-from typing import Type, TypeVar
+from functools import lru_cache
+from typing import Any, Dict, Optional, Type, TypeVar
 from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.language_models import BaseChatModel
-from langchain_core.runnables import Runnable
+from langchain_core.runnables import Runnable, RunnableConfig, RunnableLambda
+
+from app.llm.fake_llm import FakeChatModel
+from app.llm.usage import LLMCall, llm_metrics
 
 
 load_dotenv()
@@ -13,18 +17,17 @@ load_dotenv()
 T = TypeVar("T", bound=BaseModel)
 
 
-def create_llm(
-    model: str,
-    temperature: float,
-    response_model: Type[T] | None = None,
-) -> BaseChatModel | Runnable:
+@lru_cache(maxsize=None)
+def get_chat_model(model: str, temperature: float) -> BaseChatModel:
     """
-    Create an LLM instance based on the model name.
+    Get the chat model client for a model name and temperature.
+
+    Clients are created once per process and shared, so every analyzer using
+    the same model reuses the same provider client and its warm connections.
 
     Args:
         model: The provider and name of the model (e.g., "openai/gpt-4o", "google/gemini-2.0-flash")
         temperature: The temperature setting for the model
-        response_model: Optional Pydantic model for structured output
 
     Returns:
         An instance of BaseChatModel configured for the specified model
@@ -50,12 +53,66 @@ def create_llm(
             model=model,
             temperature=temperature,
         )
+    elif model.startswith("fake/"):
+        # For benchmarks, the name is the simulated latency in seconds
+        latency = model.replace("fake/", "")
+        llm = FakeChatModel(latency=float(latency) if latency else 0.5)
     else:
         raise ValueError(
-            f"Unsupported model: {model}. Make sure you added prefix for provider (openai/, anthropic/, google/)"
+            f"Unsupported model: {model}. Make sure you added prefix for provider (openai/, anthropic/, google/, fake/)"
         )
+    return llm
 
+
+def create_llm(
+    model: str,
+    temperature: float,
+    response_model: Type[T] | None = None,
+) -> BaseChatModel | Runnable:
+    """
+    Create an LLM instance based on the model name.
+
+    Args:
+        model: The provider and name of the model (e.g., "openai/gpt-4o", "google/gemini-2.0-flash")
+        temperature: The temperature setting for the model
+        response_model: Optional Pydantic model for structured output
+
+    Returns:
+        The shared chat model, wrapped for structured output if a response
+        model is given. Structured calls are recorded in llm_metrics with
+        their latency and the provider's token counts
+    """
+    llm = get_chat_model(model, temperature)
     if response_model:
-        return llm.with_structured_output(response_model)
+        # The raw response carries the token counts, including cached tokens
+        structured = llm.with_structured_output(response_model, include_raw=True)
+
+        def invoke(prompt: Any, config: RunnableConfig) -> Any:
+            call = LLMCall.start(model)
+            try:
+                output = structured.invoke(prompt, config)
+            except Exception:
+                llm_metrics.record(call.finish(ok=False))
+                raise
+            return _parsed(call, output)
+
+        async def ainvoke(prompt: Any, config: RunnableConfig) -> Any:
+            call = LLMCall.start(model)
+            try:
+                output = await structured.ainvoke(prompt, config)
+            except Exception:
+                llm_metrics.record(call.finish(ok=False))
+                raise
+            return _parsed(call, output)
+
+        return RunnableLambda(invoke, afunc=ainvoke, name="recorded_llm")
 
     return llm
+
+
+def _parsed(call: LLMCall, output: Dict[str, Any]) -> Any:
+    error: Optional[BaseException] = output.get("parsing_error")
+    llm_metrics.record(call.finish(output["raw"], ok=error is None))
+    if error is not None:
+        raise error
+    return output["parsed"]
@@ -0,0 +1,65 @@
+from typing import Any, Dict, Optional, Tuple
+
+from langchain_core.messages import SystemMessage
+from langchain_core.prompts import ChatPromptTemplate, PromptTemplate
+
+# Everything before this heading in a prompt is the same for every headline
+INPUT_HEADING = "# Input"
+
+# Providers that cache prompt prefixes only when marked with cache_control
+CACHE_CONTROL_PROVIDERS: Tuple[str, ...] = ("anthropic/",)
+
+
+def supports_cache_control(model: str) -> bool:
+    """Whether the provider caches prompt prefixes only when marked.
+
+    OpenAI and Gemini cache long repeated prefixes on their own, Anthropic
+    only caches up to a block with cache_control.
+    """
+    return model.startswith(CACHE_CONTROL_PROVIDERS)
+
+
+def cached_prefix_prompt(
+    content: str,
+    static_inputs: Dict[str, Any],
+    model: str,
+    input_section: Optional[str] = None,
+) -> ChatPromptTemplate:
+    """Prompt with the static instructions rendered once, as a system message.
+
+    The instructions, with the tag lists and other static values filled in,
+    come first and are identical for every headline, so the provider can
+    cache them. Only the "# Input" section is left as a template, sent as the
+    human message.
+
+    Args:
+        content: Prompt text, with the per headline values under "# Input"
+        static_inputs: Values of the template variables in the instructions
+        model: Provider and name of the model, to mark the prefix for caching
+        input_section: Template replacing the prompt's "# Input" section,
+            e.g. to send several headlines at once
+
+    Returns:
+        The prompt, whose input variables are those of the input section
+    """
+    instructions, heading, input_part = content.rpartition(INPUT_HEADING)
+    if not heading:
+        return ChatPromptTemplate.from_template(content).partial(**static_inputs)
+
+    template = PromptTemplate.from_template(instructions)
+    static_text = template.format(
+        **{name: static_inputs[name] for name in template.input_variables}
+    ).rstrip()
+    system = SystemMessage(
+        content=[
+            {
+                "type": "text",
+                "text": static_text,
+                "cache_control": {"type": "ephemeral"},
+            }
+        ]
+        if supports_cache_control(model)
+        else static_text
+    )
+    human = input_section if input_section is not None else heading + input_part
+    return ChatPromptTemplate.from_messages([system, ("human", human)])
@@ -0,0 +1,285 @@
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from app.config.model_prices import model_price
+
+logger = logging.getLogger(__name__)
+
+# What the LLM calls made in the current task are for, see call_context
+_analysis: ContextVar[str] = ContextVar("llm_call_analysis", default="unknown")
+_articles: ContextVar[Tuple[int, ...]] = ContextVar("llm_call_articles", default=())
+_retry: ContextVar[bool] = ContextVar("llm_call_retry", default=False)
+
+
+@contextmanager
+def call_context(
+    analysis: Optional[str] = None,
+    articles: Optional[Sequence[int]] = None,
+    retry: Optional[bool] = None,
+) -> Iterator[None]:
+    """Attribute the LLM calls made inside to an analysis and the ids of the
+    articles they analyse, and mark them as retries.
+
+    Arguments left as None keep the value of the enclosing context.
+    """
+    tokens: List[Tuple[ContextVar[Any], Any]] = []
+    if analysis is not None:
+        tokens.append((_analysis, _analysis.set(analysis)))
+    if articles is not None:
+        tokens.append((_articles, _articles.set(tuple(articles))))
+    if retry is not None:
+        tokens.append((_retry, _retry.set(retry)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+def current_articles() -> Tuple[int, ...]:
+    """Ids of the articles the calls in the current context analyse."""
+    return _articles.get()
+
+
+@dataclass
+class LLMCall:
+    """Tokens, latency and cost of one LLM request"""
+
+    analysis: str
+    model: str
+    # Articles analysed by the request, several for batched prompts
+    articles: List[int]
+    latency: float
+    ok: bool = True
+    retry: bool = False
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+    # USD, None if the model has no price in MODEL_PRICES
+    cost: Optional[float] = None
+    at: float = field(default_factory=time.time)
+
+    @classmethod
+    def start(cls, model: str) -> "LLMCall":
+        """A call in the current context, its latency is set by finish."""
+        return cls(
+            analysis=_analysis.get(),
+            model=model,
+            articles=list(_articles.get()),
+            latency=time.perf_counter(),
+            retry=_retry.get(),
+        )
+
+    def finish(self, message: Any = None, ok: bool = True) -> "LLMCall":
+        """Set the latency, and the tokens and cost from the usage_metadata of
+        the model response, if any."""
+        self.latency = time.perf_counter() - self.latency
+        self.ok = ok
+        usage = getattr(message, "usage_metadata", None) or {}
+        self.input_tokens = usage.get("input_tokens", 0)
+        self.output_tokens = usage.get("output_tokens", 0)
+        details = usage.get("input_token_details") or {}
+        self.cache_read_tokens = details.get("cache_read") or 0
+        self.cache_creation_tokens = details.get("cache_creation") or 0
+        price = model_price(self.model)
+        if price is not None:
+            self.cost = price.cost(
+                self.input_tokens,
+                self.output_tokens,
+                self.cache_read_tokens,
+                self.cache_creation_tokens,
+            )
+        return self
+
+
+@dataclass
+class TokenUsage:
+    """Token counts reported by the providers, summed over every LLM call.
+
+    `cache_read_tokens` are input tokens served from the provider's prompt
+    cache, billed at a fraction of the price, and `cache_creation_tokens`
+    those written to it.
+    """
+
+    calls: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_creation_tokens: int = 0
+
+    def add(self, call: LLMCall) -> None:
+        self.calls += 1
+        self.input_tokens += call.input_tokens
+        self.output_tokens += call.output_tokens
+        self.cache_read_tokens += call.cache_read_tokens
+        self.cache_creation_tokens += call.cache_creation_tokens
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
+
+    def stats(self) -> Dict[str, float]:
+        """Token counts and the share of input tokens read from the cache."""
+        return {
+            **asdict(self),
+            "cached_share": (
+                self.cache_read_tokens / self.input_tokens if self.input_tokens else 0.0
+            ),
+        }
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Nearest rank percentile, q from 0 to 100."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(-(-q * len(ordered) // 100)), 1)
+    return ordered[rank - 1]
+
+
+def _aggregate(calls: Iterable[Tuple[LLMCall, float]]) -> Dict[str, Any]:
+    """Totals of calls, each counted by its share, e.g. 1/10 of a request for
+    ten articles."""
+    totals: Dict[str, Any] = {
+        "calls": 0.0,
+        "retries": 0.0,
+        "failures": 0.0,
+        "input_tokens": 0.0,
+        "output_tokens": 0.0,
+        "cached_tokens": 0.0,
+        "latency": 0.0,
+        "cost": 0.0,
+    }
+    for call, share in calls:
+        totals["calls"] += share
+        totals["retries"] += share if call.retry else 0
+        totals["failures"] += 0 if call.ok else share
+        totals["input_tokens"] += call.input_tokens * share
+        totals["output_tokens"] += call.output_tokens * share
+        totals["cached_tokens"] += call.cache_read_tokens * share
+        totals["latency"] += call.latency * share
+        totals["cost"] += (call.cost or 0.0) * share
+    digits = {"cost": 6, "latency": 3}
+    return {key: round(value, digits.get(key, 2)) for key, value in totals.items()}
+
+
+class LLMMetrics:
+    """Per call records of the LLM requests of a run.
+
+    create_llm records every structured call, attributed with call_context,
+    and the records are appended to `sink` as one compact JSON line per call, every
+    `flush_every` calls and at the end of a run. Set `sink` to None to keep
+    them in memory only.
+    """
+
+    def __init__(
+        self,
+        sink: Optional[Path] = Path("data") / "llm_calls.ndjson",
+        flush_every: int = 100,
+    ) -> None:
+        self.sink = sink
+        self.flush_every = flush_every
+        self.calls: List[LLMCall] = []
+        self.usage = TokenUsage()
+        self._by_article: Dict[int, List[LLMCall]] = {}
+        self._flushed = 0
+        self._unpriced: set[str] = set()
+
+    def record(self, call: LLMCall) -> None:
+        self.calls.append(call)
+        self.usage.add(call)
+        for article_id in call.articles:
+            self._by_article.setdefault(article_id, []).append(call)
+        if call.cost is None and call.model not in self._unpriced:
+            self._unpriced.add(call.model)
+            logger.warning(f"No price for {call.model}, its cost is not counted")
+        if len(self.calls) - self._flushed >= self.flush_every:
+            self.flush()
+
+    def flush(self) -> None:
+        """Append the calls recorded since the last flush to the sink."""
+        pending = self.calls[self._flushed :]
+        self._flushed = len(self.calls)
+        if self.sink is None or not pending:
+            return
+        try:
+            self.sink.parent.mkdir(parents=True, exist_ok=True)
+            with self.sink.open("a", encoding="utf-8") as f:
+                for call in pending:
+                    line = asdict(call)
+                    line["latency"] = round(call.latency, 4)
+                    f.write(json.dumps(line, separators=(",", ":")))
+                    f.write("\n")
+        except OSError as e:
+            logger.error(f"Error writing LLM call metrics: {str(e)}")
+
+    def reset(self) -> None:
+        """Flush and forget the calls of the previous run."""
+        self.flush()
+        self.calls = []
+        self.usage.reset()
+        self._by_article = {}
+        self._flushed = 0
+
+    def article(self, article_id: int) -> Dict[str, Any]:
+        """Totals of the calls for an article, overall and per analysis.
+
+        Batched requests count for their share of the articles they analysed.
+        """
+        calls = [
+            (call, 1 / len(call.articles))
+            for call in self._by_article.get(article_id, [])
+        ]
+        analyses = sorted({call.analysis for call, _ in calls})
+        return {
+            **_aggregate(calls),
+            "analyses": {
+                analysis: _aggregate(
+                    (call, share) for call, share in calls if call.analysis == analysis
+                )
+                for analysis in analyses
+            },
+        }
+
+    def summary(self, articles: int) -> Dict[str, Any]:
+        """Totals, p50/p95 latency and cost per 1k articles, overall and per
+        analysis, for a run that analysed `articles` articles."""
+
+        def describe(calls: List[LLMCall]) -> Dict[str, Any]:
+            latencies = [call.latency for call in calls]
+            totals = _aggregate((call, 1.0) for call in calls)
+            return {
+                **totals,
+                "p50_latency": round(percentile(latencies, 50), 3),
+                "p95_latency": round(percentile(latencies, 95), 3),
+                "cost_per_1k_articles": (
+                    round(totals["cost"] / articles * 1000, 4) if articles else 0.0
+                ),
+            }
+
+        analyses = sorted({call.analysis for call in self.calls})
+        return {
+            **describe(self.calls),
+            "articles": articles,
+            "cached_share": round(self.usage.stats()["cached_share"], 3),
+            "unpriced_models": sorted(self._unpriced),
+            "analyses": {
+                analysis: describe(
+                    [call for call in self.calls if call.analysis == analysis]
+                )
+                for analysis in analyses
+            },
+        }
+
+
+llm_metrics = LLMMetrics()
@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+
+from app.config.prompt_config import PromptConfig
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R", bound=BaseModel)
+
+
+def normalize_input(value: Optional[str]) -> str:
+    """Unicode and whitespace normalized text, so trivially different copies of
+    a headline share a cache entry. Case is kept, as it affects clickbait."""
+    return " ".join(unicodedata.normalize("NFKC", value or "").split())
+
+
+class AnalysisCache:
+    """On-disk cache of analyzer results, shared by all runs on a host.
+
+    Results are keyed by the prompt's version, path, model, temperature and a
+    hash of its content, the values rendered into its instructions (e.g. the
+    tag lists), the response model and the normalized inputs, so a changed
+    prompt, tag list or model never reuses old results. Entries older than
+    `max_age` are dropped, and beyond `max_entries` the least recently used
+    go first.
+
+    Concurrent requests for the same key share one in-flight call. `hits`
+    counts results served from the cache, `shared` those served by another
+    in-flight call and `misses` the calls actually made.
+    """
+
+    def __init__(
+        self,
+        path: Path = Path("data") / "analysis_cache.sqlite3",
+        max_entries: int = 200_000,
+        max_age: float = 90 * 24 * 3600,
+        enabled: bool = True,
+    ) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.enabled = enabled
+        self.hits = 0
+        self.shared = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._puts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            # Several worker processes may share the cache
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_cache_used_at "
+                "ON analysis_cache (used_at)"
+            )
+            self._conn.commit()
+            self.evict()
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def key(
+        prompt: PromptConfig,
+        response_model: Type[BaseModel],
+        inputs: Dict[str, str],
+        static_inputs: Optional[Dict[str, Any]] = None,
+    ) -> str:
+        """Cache key of an analysis.
+
+        Args:
+            prompt: Config of the prompt, with its content
+            response_model: Model of the result
+            inputs: Per headline values of the prompt, normalized
+            static_inputs: Values rendered into the prompt's instructions
+        """
+        content_hash = hashlib.sha256((prompt.content or "").encode()).hexdigest()
+        static_hash = hashlib.sha256(
+            json.dumps(static_inputs or {}, sort_keys=True, default=str).encode()
+        ).hexdigest()
+        payload = {
+            "prompt": [
+                prompt.version,
+                prompt.path,
+                prompt.model,
+                prompt.temperature,
+                content_hash,
+                static_hash,
+            ],
+            "response_model": response_model.__name__,
+            "inputs": {name: normalize_input(value) for name, value in inputs.items()},
+        }
+        return hashlib.sha256(
+            json.dumps(payload, sort_keys=True).encode("utf-8")
+        ).hexdigest()
+
+    def get(self, key: str, response_model: Type[R]) -> Optional[R]:
+        """Cached result of a key, or None."""
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] < time.time() - self.max_age:
+            return None
+        try:
+            result = response_model.model_validate(json.loads(row[0]))
+        except (ValidationError, ValueError):
+            return None
+        conn.execute(
+            "UPDATE analysis_cache SET used_at = ? WHERE key = ?", (time.time(), key)
+        )
+        conn.commit()
+        return result
+
+    def put(self, key: str, result: BaseModel) -> None:
+        conn = self._connect()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO analysis_cache (key, value, created_at, used_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, result.model_dump_json(), now, now),
+        )
+        conn.commit()
+        self._puts += 1
+        if self._puts % 1000 == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries and the least recently used beyond max_entries."""
+        conn = self._connect()
+        deleted = conn.execute(
+            "DELETE FROM analysis_cache WHERE created_at < ?",
+            (time.time() - self.max_age,),
+        ).rowcount
+        deleted += conn.execute(
+            "DELETE FROM analysis_cache WHERE key IN (SELECT key FROM analysis_cache "
+            "ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        conn.commit()
+        if deleted:
+            logger.info(f"Evicted {deleted} entries from the analysis cache")
+        return deleted
+
+    def lookup(self, key: str, response_model: Type[R]) -> Optional[R]:
+        """Cached result of a key, counting a hit, or None."""
+        if not self.enabled:
+            return None
+        try:
+            result = self.get(key, response_model)
+        except sqlite3.Error as e:
+            logger.error(f"Error reading analysis cache: {str(e)}")
+            return None
+        if result is not None:
+            self.hits += 1
+        return result
+
+    def inflight(self, key: str) -> Optional[asyncio.Future]:
+        """The pending call for a key, if another caller is already making it.
+
+        Callers count results they take from it in `shared`.
+        """
+        return self._inflight.get(key) if self.enabled else None
+
+    def start(self, key: str) -> None:
+        """Mark a key as being computed by the caller, who must call finish."""
+        self.misses += 1
+        if self.enabled:
+            self._inflight[key] = asyncio.get_running_loop().create_future()
+
+    def finish(self, key: str, result: Optional[BaseModel]) -> None:
+        """Store the result of a started key, None if the call failed, and
+        hand it to the callers waiting on it."""
+        future = self._inflight.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(result)
+        if result is None or not self.enabled:
+            return
+        try:
+            self.put(key, result)
+        except sqlite3.Error as e:
+            logger.error(f"Error writing analysis cache: {str(e)}")
+
+    async def get_or_compute(
+        self,
+        prompt: PromptConfig,
+        response_model: Type[R],
+        inputs: Dict[str, str],
+        compute: Callable[[], Awaitable[Any]],
+        static_inputs: Optional[Dict[str, Any]] = None,
+    ) -> R:
+        """Cached result of an analysis, or the validated result of `compute`."""
+        key = self.key(prompt, response_model, inputs, static_inputs)
+        cached = self.lookup(key, response_model)
+        if cached is not None:
+            return cached
+
+        # If the shared call failed, another waiter may have started the next
+        # one already, so check again before starting it
+        pending = self.inflight(key)
+        while pending is not None:
+            shared = await pending
+            if shared is not None:
+                self.shared += 1
+                return response_model.model_validate(shared)
+            pending = self.inflight(key)
+
+        self.start(key)
+        result: Optional[R] = None
+        try:
+            result = response_model.model_validate(await compute())
+            return result
+        finally:
+            self.finish(key, result)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit and miss counts, and the share of analyses that made no call."""
+        total = self.hits + self.shared + self.misses
+        return {
+            "hits": self.hits,
+            "shared": self.shared,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.shared) / total if total else 0.0,
+        }
+
+
+analysis_cache = AnalysisCache()
@@ -0,0 +1,61 @@
+import logging
+import threading
+from typing import Any, Dict, Tuple, Type, TypeVar
+
+from app.config.prompt_config import PromptConfig, prompt_config
+
+logger = logging.getLogger(__name__)
+
+A = TypeVar("A")
+
+
+class AnalyzerRegistry:
+    """Process wide cache of analyzers, so each chain is built only once.
+
+    An analyzer builds its prompt template and LLM chain on construction.
+    Instances are keyed by the analyzer class and the version, model and
+    temperature of its prompt, so a different prompt config gets a new
+    analyzer while every article analysed with the same config shares one.
+    Analyzer classes name their prompt in a PROMPT_NAME class attribute.
+    """
+
+    def __init__(self) -> None:
+        self._analyzers: Dict[Tuple[Any, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(analyzer_cls: Type[Any]) -> Tuple[Any, ...]:
+        prompt: PromptConfig = getattr(prompt_config, analyzer_cls.PROMPT_NAME)
+        return (
+            analyzer_cls,
+            prompt.version,
+            prompt.path,
+            prompt.model,
+            prompt.temperature,
+        )
+
+    def get(self, analyzer_cls: Type[A]) -> A:
+        """The shared analyzer of a class for the current prompt config."""
+        key = self._key(analyzer_cls)
+        analyzer = self._analyzers.get(key)
+        if analyzer is None:
+            with self._lock:
+                analyzer = self._analyzers.get(key)
+                if analyzer is None:
+                    logger.info(f"Building {analyzer_cls.__name__} for {key[1:]}")
+                    analyzer = analyzer_cls()
+                    self._analyzers[key] = analyzer
+        return analyzer
+
+    def clear(self) -> None:
+        """Drop all analyzers, e.g. after the prompt config changed."""
+        with self._lock:
+            self._analyzers.clear()
+
+
+analyzer_registry = AnalyzerRegistry()
+
+
+def get_analyzer(analyzer_cls: Type[A]) -> A:
+    """The shared analyzer of a class, see AnalyzerRegistry."""
+    return analyzer_registry.get(analyzer_cls)
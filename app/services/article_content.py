@@ -0,0 +1,195 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.db import Database
+from app.feed_sources import FeedSource
+from app.services.feed_fetcher import FeedFetcher
+from app.utils.article_mods import ExtractedArticle, extract_article
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+
+class ArticleContentService:
+    """Fill the content, markdown_content and html_content of news articles.
+
+    Article pages are fetched concurrently with the same global and per host
+    limits as the feeds, plus a minimum interval between requests to the same
+    host. The main text is extracted in a process pool when `extract_workers`
+    is set, and results are written in batches of `batch_size` through the
+    update_article_contents function.
+
+    Pages without an article body (galleries, videos, non HTML) are stored with
+    empty content so they are not fetched again. Pages that fail to download
+    are left for the next run.
+    """
+
+    def __init__(
+        self,
+        db: Optional[Database] = None,
+        max_concurrency: int = 10,
+        max_per_host: int = 2,
+        min_host_interval: float = 1.0,
+        extract_workers: int = 0,
+        batch_size: int = 50,
+        max_page_bytes: int = 5_000_000,
+    ) -> None:
+        self.db = db or Database()
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.min_host_interval = min_host_interval
+        self.extract_workers = extract_workers
+        self.batch_size = batch_size
+        self.max_page_bytes = max_page_bytes
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.stats: Dict[str, float] = {}
+        self._pending: List[Dict[str, Any]] = []
+
+    async def run(self, limit: int = 100) -> Dict[str, float]:
+        """Fetch and store the content of the newest articles without any."""
+        articles = await self.db.get_articles_without_content(limit=limit)
+        logger.info(f"Fetching content of {len(articles)} articles")
+        return await self.process_articles(articles)
+
+    async def process_articles(
+        self, articles: List[Dict[str, Any]]
+    ) -> Dict[str, float]:
+        """Fetch, extract and store the content of the given articles.
+
+        Args:
+            articles: Dicts with at least the id and url of each article
+
+        Returns:
+            Dict[str, float]: Counts, bytes, seconds per stage and throughput
+        """
+        self.stats = {
+            "pages": len(articles),
+            "fetched": 0,
+            "extracted": 0,
+            "not_articles": 0,
+            "failed": 0,
+            "stored": 0,
+            "bytes": 0,
+            "fetch_seconds": 0.0,
+            "extract_seconds": 0.0,
+            "write_seconds": 0.0,
+        }
+        self._pending = []
+        if self.extract_workers > 0:
+            self.executor = ProcessPoolExecutor(max_workers=self.extract_workers)
+
+        start = time.perf_counter()
+        try:
+            async with FeedFetcher(
+                max_concurrency=self.max_concurrency,
+                max_per_host=self.max_per_host,
+                min_host_interval=self.min_host_interval,
+            ) as fetcher:
+                await asyncio.gather(
+                    *(self._process_article(fetcher, article) for article in articles)
+                )
+            await self._flush()
+        finally:
+            if self.executor is not None:
+                self.executor.shutdown()
+                self.executor = None
+
+        elapsed = time.perf_counter() - start
+        self.stats["seconds"] = elapsed
+        self.stats["pages_per_second"] = (
+            self.stats["fetched"] / elapsed if elapsed else 0
+        )
+        self.stats["bytes_per_second"] = self.stats["bytes"] / elapsed if elapsed else 0
+        logger.info(f"Finished fetching article content: {self.stats}")
+        return self.stats
+
+    async def _extract(self, content: bytes) -> Optional[ExtractedArticle]:
+        if self.executor is None:
+            return extract_article(content)
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, extract_article, content
+        )
+
+    async def _process_article(
+        self, fetcher: FeedFetcher, article: Dict[str, Any]
+    ) -> None:
+        # Pages go through the feed fetcher for its per host limits and deadlines
+        page = FeedSource(
+            str(article["id"]), article.get("source") or "Unknown", article["url"]
+        )
+        # Oversized pages are stopped mid download, and stored as not articles
+        fetched = await fetcher.fetch(page, max_bytes=self.max_page_bytes)
+        self.stats["fetch_seconds"] += fetched.elapsed
+        if fetched.too_large:
+            logger.info(f"Skipping {article['url']}, over {self.max_page_bytes} bytes")
+        elif not fetched.ok or fetched.content is None:
+            self.stats["failed"] += 1
+            return
+        else:
+            self.stats["fetched"] += 1
+            self.stats["bytes"] += len(fetched.content)
+        content_type = next(
+            (v for k, v in fetched.headers.items() if k.lower() == "content-type"), ""
+        )
+
+        extracted: Optional[ExtractedArticle] = None
+        if "html" in content_type and fetched.content is not None:
+            start = time.perf_counter()
+            try:
+                extracted = await self._extract(fetched.content)
+            except Exception as e:
+                logger.error(f"Error extracting {article['url']}: {str(e)}")
+            self.stats["extract_seconds"] += time.perf_counter() - start
+
+        if extracted:
+            self.stats["extracted"] += 1
+        else:
+            self.stats["not_articles"] += 1
+
+        self._pending.append(
+            {
+                "id": article["id"],
+                "content": extracted.content if extracted else "",
+                "markdown_content": extracted.markdown_content if extracted else None,
+                "html_content": extracted.html_content if extracted else None,
+            }
+        )
+        if len(self._pending) >= self.batch_size:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            await self.db.update_article_contents(batch)
+            self.stats["stored"] += len(batch)
+        except Exception as e:
+            logger.error(f"Error storing content of {len(batch)} articles: {str(e)}")
+        self.stats["write_seconds"] += time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    async def main() -> None:
+        service = ArticleContentService(extract_workers=2)
+        stats = await service.run(limit=500)
+
+        message = (
+            "📄 *Article Content Report* 📄\n\n"
+            f"✅ *Extracted:* {stats['extracted']}\n"
+            f"🚫 *Not Articles:* {stats['not_articles']}\n"
+            f"❌ *Failed:* {stats['failed']}\n"
+            f"⚡ *Pages/sec:* {stats['pages_per_second']:.1f}\n"
+            f"📦 *MB Processed:* {stats['bytes'] / 1e6:.1f}\n\n"
+        )
+        print(message)
+
+    asyncio.run(main())
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+from typing import (
+    Annotated,
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+)
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import Runnable
+from pydantic import BaseModel, BeforeValidator, Field, ValidationError, create_model
+
+from app.config.prompt_config import PromptConfig
+from app.llm.prompt_prefix import cached_prefix_prompt
+from app.llm.usage import call_context, current_articles
+from app.services.analysis_cache import analysis_cache
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar("R", bound=BaseModel)
+
+# Replaces the single headline "# Input" section of a prompt
+BATCH_INPUT = """# Input
+
+The input below has several numbered items. Analyze each item on its own, exactly as described above, and return one result per item in `results`, with `index` set to the item's number.
+
+{items}"""
+
+
+def batch_prompt(
+    content: str, static_inputs: Dict[str, Any], model: str
+) -> ChatPromptTemplate:
+    """Prompt for a batch of items, from the content of a single item prompt.
+
+    The instructions, tag lists and examples are sent once per batch instead of
+    once per headline, as the same cacheable prefix as the single item prompt.
+    """
+    return cached_prefix_prompt(content, static_inputs, model, BATCH_INPUT)
+
+
+def format_items(items: List[Dict[str, str]]) -> str:
+    """Numbered items for BATCH_INPUT, e.g. "Item 0:\\nHeadline: ..." """
+    blocks = []
+    for index, item in enumerate(items):
+        lines = [f"Item {index}:"] + [
+            f"{key.capitalize()}: {value}" for key, value in item.items()
+        ]
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks)
+
+
+def batch_response_model(response_model: Type[R]) -> Type[BaseModel]:
+    """Structured output model with one indexed result per item of a batch.
+
+    Items that fail validation are dropped instead of failing the whole batch,
+    so they can be retried on their own.
+    """
+    indexed_model = create_model(
+        f"Indexed{response_model.__name__}",
+        __base__=response_model,
+        index=(int, Field(description="Number of the item in the input")),
+    )
+
+    def drop_invalid(items: Any) -> Any:
+        if not isinstance(items, list):
+            return items
+        valid = []
+        for item in items:
+            try:
+                valid.append(indexed_model.model_validate(item))
+            except ValidationError as e:
+                logger.warning(f"Dropping invalid batch item: {str(e)}")
+        return valid
+
+    return create_model(
+        f"Batch{response_model.__name__}",
+        results=(
+            Annotated[List[indexed_model], BeforeValidator(drop_invalid)],  # type: ignore[valid-type]
+            Field(description="One result per input item"),
+        ),
+    )
+
+
+async def analyze_in_batches(
+    prompt: PromptConfig,
+    items: List[Dict[str, str]],
+    batch_chain: Runnable,
+    response_model: Type[R],
+    analyze_one: Callable[[Dict[str, str]], Awaitable[R]],
+    batch_size: int,
+    static_inputs: Optional[Dict[str, Any]] = None,
+) -> List[Optional[R]]:
+    """Analyze items in requests of up to `batch_size` items, concurrently.
+
+    Results are matched to items by index. Items missing from a batch result,
+    invalid or duplicated are retried with `analyze_one`, and items whose retry
+    fails too are None. Items in the analysis cache, or already being analysed
+    by another caller, are not sent again. If the call context has one article
+    per item, each request is attributed to the articles of its items.
+
+    Args:
+        prompt: Config of the prompt, keys the analysis cache
+        items: Template values of each item, e.g. {"headline": ...}
+        batch_chain: Chain from batch_prompt to a batch_response_model output
+        response_model: Model of a single item's result
+        analyze_one: Analyze a single item, used for retries
+        batch_size: Maximum number of items per request
+        static_inputs: Values rendered into the prompt's instructions, keys
+            the analysis cache
+
+    Returns:
+        One result per item, in the same order
+    """
+    results: List[Optional[R]] = [None] * len(items)
+    article_ids = current_articles()
+
+    def articles_of(positions: List[int]) -> Optional[List[int]]:
+        if len(article_ids) != len(items):
+            return None
+        return [article_ids[position] for position in positions]
+
+    keys = [
+        analysis_cache.key(prompt, response_model, item, static_inputs)
+        for item in items
+    ]
+    # Positions analysed by this call, and those waiting on another call
+    owned: List[int] = []
+    waiting: Dict[int, asyncio.Future] = {}
+    for position, key in enumerate(keys):
+        results[position] = analysis_cache.lookup(key, response_model)
+        if results[position] is not None:
+            continue
+        pending = analysis_cache.inflight(key)
+        if pending is not None:
+            waiting[position] = pending
+        else:
+            analysis_cache.start(key)
+            owned.append(position)
+
+    async def run_batch(positions: List[int]) -> None:
+        batch = [items[position] for position in positions]
+        try:
+            with call_context(articles=articles_of(positions)):
+                response = await batch_chain.ainvoke({"items": format_items(batch)})
+            for result in response.results:
+                if (
+                    0 <= result.index < len(batch)
+                    and results[positions[result.index]] is None
+                ):
+                    results[positions[result.index]] = response_model.model_validate(
+                        result.model_dump(exclude={"index"})
+                    )
+        except Exception as e:
+            logger.error(f"Error analyzing batch of {len(batch)}: {str(e)}")
+
+    async def retry(position: int) -> None:
+        try:
+            with call_context(articles=articles_of([position]), retry=True):
+                results[position] = await analyze_one(items[position])
+        except Exception as e:
+            logger.error(f"Error analyzing item {position} on its own: {str(e)}")
+
+    try:
+        await asyncio.gather(
+            *(
+                run_batch(owned[start : start + batch_size])
+                for start in range(0, len(owned), batch_size)
+            )
+        )
+    finally:
+        for position in owned:
+            analysis_cache.finish(keys[position], results[position])
+
+    for position, pending in waiting.items():
+        shared = await pending
+        if shared is not None:
+            analysis_cache.shared += 1
+            results[position] = response_model.model_validate(shared)
+
+    failed = [position for position, result in enumerate(results) if result is None]
+    if failed:
+        logger.info(f"Retrying {len(failed)} of {len(items)} items one at a time")
+        await asyncio.gather(*(retry(position) for position in failed))
+    return results
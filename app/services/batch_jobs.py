@@ -0,0 +1,785 @@
+import argparse
+import asyncio
+import json
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Protocol, Set, Tuple, Type, cast
+
+from langchain_core.messages import convert_to_messages, convert_to_openai_messages
+from pydantic import BaseModel
+
+from app.config.prompt_config import PromptConfig
+from app.config.prompt_config import prompt_config as prompts_config
+from app.db import Database
+from app.graph.graph import (
+    InputState,
+    OverallState,
+    combined_state,
+    save_news_sentiments,
+    separate_state,
+)
+from app.llm.llm import create_llm
+from app.llm.usage import call_context, llm_metrics
+from app.services.analyzer_registry import get_analyzer
+from app.services.category_analyzer import CategoryAnalyzer
+from app.services.clickbait_analyzer import ClickbaitAnalyzer
+from app.services.combined_analyzer import CombinedAnalyzer
+from app.services.emotional_impact_analyzer import EmotionalImpactAnalyzer
+from app.services.sentiment_analyzer import SentimentAnalyzer
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+# Analyzer of each analysis in a job, keyed like the graph state
+SEPARATE_ANALYZERS: Dict[str, Type[Any]] = {
+    "sentiment": SentimentAnalyzer,
+    "categories": CategoryAnalyzer,
+    "emotional_impact": EmotionalImpactAnalyzer,
+    "clickbait": ClickbaitAnalyzer,
+}
+COMBINED_ANALYZERS: Dict[str, Type[Any]] = {"combined": CombinedAnalyzer}
+ANALYZERS: Dict[str, Type[Any]] = {**SEPARATE_ANALYZERS, **COMBINED_ANALYZERS}
+RESPONSE_MODELS: Dict[str, Type[BaseModel]] = {
+    analyzer.RESPONSE_MODEL.__name__: analyzer.RESPONSE_MODEL
+    for analyzer in ANALYZERS.values()
+}
+
+# Endpoint of every request, in the OpenAI batch input format
+CHAT_ENDPOINT = "/v1/chat/completions"
+
+
+class BatchProvider(Protocol):
+    """A provider batch API: takes a JSONL file of requests, answers later.
+
+    Request and result lines use the OpenAI batch format, results have the
+    custom_id of their request and either a response or an error.
+    """
+
+    name: str
+
+    def supports(self, model: str) -> bool:
+        """Whether the provider can run a model, e.g. "openai/gpt-4o"."""
+        ...
+
+    async def submit(self, path: Path, model: str) -> str:
+        """Submit a request file for a model, returns the provider's batch id."""
+        ...
+
+    async def status(self, batch_id: str) -> str:
+        """One of "in_progress", "completed" or "failed"."""
+        ...
+
+    async def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        """Result lines of a completed batch."""
+        ...
+
+
+class LocalBatchProvider:
+    """File-based stand-in for a provider batch API, for tests and models
+    without one.
+
+    Submitted files are copied to `root/<batch_id>/input.jsonl` and answered
+    on the first status check, through create_llm with the response model
+    named in each request, e.g. with a "fake/0" model to test a whole job
+    without API keys.
+    """
+
+    name = "local"
+
+    def __init__(
+        self, root: Path = Path("data") / "batch_jobs" / "local", concurrency: int = 10
+    ) -> None:
+        self.root = root
+        self.concurrency = concurrency
+
+    def supports(self, model: str) -> bool:
+        return True
+
+    async def submit(self, path: Path, model: str) -> str:
+        batch_id = uuid.uuid4().hex
+        batch_dir = self.root / batch_id
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        (batch_dir / "input.jsonl").write_bytes(path.read_bytes())
+        (batch_dir / "model").write_text(model)
+        return batch_id
+
+    async def status(self, batch_id: str) -> str:
+        batch_dir = self.root / batch_id
+        if not (batch_dir / "input.jsonl").exists():
+            return "failed"
+        if not (batch_dir / "output.jsonl").exists():
+            await self._answer(batch_dir)
+        return "completed"
+
+    async def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        return _read_jsonl(self.root / batch_id / "output.jsonl")
+
+    async def _answer(self, batch_dir: Path) -> None:
+        model = (batch_dir / "model").read_text()
+        limit = asyncio.Semaphore(self.concurrency)
+
+        async def answer(request: Dict[str, Any]) -> Dict[str, Any]:
+            body = request["body"]
+            try:
+                response_model = RESPONSE_MODELS[
+                    body["response_format"]["json_schema"]["name"]
+                ]
+                chain = create_llm(model, body["temperature"], response_model)
+                article_id, analysis = request["custom_id"].split(":", 1)
+                async with limit:
+                    with call_context(analysis, [int(article_id)]):
+                        result = await chain.ainvoke(
+                            convert_to_messages(body["messages"])
+                        )
+                content = response_model.model_validate(result).model_dump_json()
+            except Exception as e:
+                return result_line(request["custom_id"], error=str(e))
+            return result_line(request["custom_id"], content)
+
+        requests = _read_jsonl(batch_dir / "input.jsonl")
+        results = await asyncio.gather(*(answer(request) for request in requests))
+        _write_jsonl(batch_dir / "output.jsonl", results)
+        llm_metrics.flush()
+
+
+class OpenAIBatchProvider:
+    """The OpenAI Batch API, at half the price of synchronous requests and
+    answered within `completion_window`."""
+
+    name = "openai"
+
+    def __init__(self, completion_window: str = "24h") -> None:
+        # Installed with langchain-openai, only needed for this provider
+        from openai import AsyncOpenAI
+
+        self.client = AsyncOpenAI()
+        self.completion_window = completion_window
+
+    def supports(self, model: str) -> bool:
+        return model.startswith("openai/")
+
+    async def submit(self, path: Path, model: str) -> str:
+        if not self.supports(model):
+            raise ValueError(f"The OpenAI batch provider can't run {model}")
+        with path.open("rb") as f:
+            uploaded = await self.client.files.create(file=f, purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=CHAT_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    async def status(self, batch_id: str) -> str:
+        batch = await self.client.batches.retrieve(batch_id)
+        # Expired and cancelled batches keep the results finished so far
+        if batch.status in ("completed", "expired", "cancelled"):
+            return "completed"
+        if batch.status == "failed":
+            return "failed"
+        return "in_progress"
+
+    async def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        batch = await self.client.batches.retrieve(batch_id)
+        results: List[Dict[str, Any]] = []
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                results.extend(
+                    json.loads(line) for line in content.text.splitlines() if line
+                )
+        return results
+
+
+class AnthropicBatchProvider:
+    """The Anthropic Message Batches API, at half the price of synchronous
+    requests and answered within 24 hours.
+
+    Request files are converted from the OpenAI batch format on submit: the
+    system message becomes the system prompt, marked for caching, and the
+    response format a tool the model must call. Results are converted back,
+    so they parse like OpenAI ones.
+    """
+
+    name = "anthropic"
+
+    def __init__(self, max_tokens: int = 1024) -> None:
+        # Installed with langchain-anthropic, only needed for this provider
+        from anthropic import AsyncAnthropic
+
+        self.client = AsyncAnthropic()
+        self.max_tokens = max_tokens
+
+    def supports(self, model: str) -> bool:
+        return model.startswith("anthropic/")
+
+    async def submit(self, path: Path, model: str) -> str:
+        if not self.supports(model):
+            raise ValueError(f"The Anthropic batch provider can't run {model}")
+        batch = await self.client.messages.batches.create(
+            requests=[self._request(request) for request in _read_jsonl(path)]
+        )
+        return batch.id
+
+    def _request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        body = request["body"]
+        schema = body["response_format"]["json_schema"]
+        system = [m["content"] for m in body["messages"] if m["role"] == "system"]
+        params: Dict[str, Any] = {
+            "model": body["model"],
+            "max_tokens": self.max_tokens,
+            "temperature": body["temperature"],
+            "messages": [m for m in body["messages"] if m["role"] != "system"],
+            "tools": [
+                {
+                    "name": schema["name"],
+                    "description": f"Record the {schema['name']} result",
+                    "input_schema": schema["schema"],
+                }
+            ],
+            "tool_choice": {"type": "tool", "name": schema["name"]},
+        }
+        if system:
+            params["system"] = [
+                {
+                    "type": "text",
+                    "text": "\n\n".join(str(content) for content in system),
+                    "cache_control": {"type": "ephemeral"},
+                }
+            ]
+        # Anthropic custom ids only allow letters, digits, "_" and "-"
+        return {
+            "custom_id": request["custom_id"].replace(":", "-", 1),
+            "params": params,
+        }
+
+    async def status(self, batch_id: str) -> str:
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        # Ended batches have a result for every request, errored or not
+        return "completed" if batch.processing_status == "ended" else "in_progress"
+
+    async def results(self, batch_id: str) -> List[Dict[str, Any]]:
+        results: List[Dict[str, Any]] = []
+        async for entry in await self.client.messages.batches.results(batch_id):
+            custom_id = entry.custom_id.replace("-", ":", 1)
+            if entry.result.type != "succeeded":
+                results.append(result_line(custom_id, error=entry.result.type))
+                continue
+            answer = next(
+                (
+                    block.input
+                    for block in entry.result.message.content
+                    if block.type == "tool_use"
+                ),
+                None,
+            )
+            results.append(result_line(custom_id, json.dumps(answer)))
+        return results
+
+
+PROVIDERS: Dict[str, Type[Any]] = {
+    LocalBatchProvider.name: LocalBatchProvider,
+    OpenAIBatchProvider.name: OpenAIBatchProvider,
+    AnthropicBatchProvider.name: AnthropicBatchProvider,
+}
+
+
+@dataclass
+class BatchPart:
+    """One request file of a job and its provider batch, all for one model"""
+
+    model: str
+    path: str
+    requests: int = 0
+    batch_id: Optional[str] = None
+    status: str = "created"
+
+
+@dataclass
+class BatchJob:
+    """Analysis of a set of articles through a provider batch API.
+
+    The job's files live in its own directory: `job.json`, the articles in
+    `articles.jsonl` and one request file per part. Status goes from created
+    to submitted, completed (or failed) and ingested.
+    """
+
+    id: str
+    provider: str
+    created_at: str
+    articles: int
+    # Config of each analysis, keyed like the graph state, without content
+    prompts: Dict[str, Dict[str, Any]]
+    parts: List[BatchPart] = field(default_factory=list)
+    status: str = "created"
+    # Articles saved so far, so an interrupted ingest resumes where it stopped
+    saved: int = 0
+    stats: Dict[str, int] = field(default_factory=dict)
+
+
+def _read_jsonl(path: Path) -> List[Dict[str, Any]]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _write_jsonl(path: Path, lines: List[Dict[str, Any]]) -> None:
+    tmp_path = path.with_suffix(".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        for line in lines:
+            f.write(json.dumps(line, separators=(",", ":")))
+            f.write("\n")
+    tmp_path.replace(path)
+
+
+def build_request(
+    custom_id: str,
+    prompt: PromptConfig,
+    messages: List[Any],
+    response_model: Type[BaseModel],
+) -> Dict[str, Any]:
+    """A request line in the OpenAI batch input format."""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": CHAT_ENDPOINT,
+        "body": {
+            "model": prompt.model.split("/", 1)[-1],
+            "temperature": prompt.temperature,
+            "messages": convert_to_openai_messages(messages),
+            "response_format": {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": response_model.__name__,
+                    "schema": response_model.model_json_schema(),
+                },
+            },
+        },
+    }
+
+
+def result_line(
+    custom_id: str, content: Optional[str] = None, error: Optional[str] = None
+) -> Dict[str, Any]:
+    """A result line in the OpenAI batch output format, for providers that
+    answer in another format."""
+    if error is not None:
+        return {"custom_id": custom_id, "response": None, "error": {"message": error}}
+    return {
+        "custom_id": custom_id,
+        "response": {
+            "status_code": 200,
+            "body": {"choices": [{"message": {"content": content}}]},
+        },
+        "error": None,
+    }
+
+
+def parse_result(result: Dict[str, Any]) -> Tuple[str, Optional[Any]]:
+    """Custom id and parsed JSON answer of a result line, None if it failed."""
+    response = result.get("response") or {}
+    if result.get("error") or response.get("status_code") != 200:
+        return result["custom_id"], None
+    try:
+        content = response["body"]["choices"][0]["message"]["content"]
+        return result["custom_id"], json.loads(content)
+    except (KeyError, IndexError, TypeError, ValueError):
+        return result["custom_id"], None
+
+
+class BatchJobService:
+    """Analyse articles through a provider batch API instead of one request
+    per analysis.
+
+    For backfills, where results can wait hours: every analysis of every
+    article is written to JSONL request files, submitted through a
+    BatchProvider, polled until done and ingested into the database with a
+    few bulk inserts per `save_batch_size` articles. Articles with a failed
+    analysis are not saved, so the next job or run picks them up again.
+    """
+
+    def __init__(
+        self,
+        provider: BatchProvider,
+        db: Optional[Database] = None,
+        root: Path = Path("data") / "batch_jobs",
+        poll_interval: float = 60.0,
+        max_requests_per_file: int = 50_000,
+        max_file_bytes: int = 190_000_000,
+        save_batch_size: int = 500,
+    ) -> None:
+        self.provider = provider
+        self.db = db or Database()
+        self.root = root
+        self.poll_interval = poll_interval
+        # Per file limits of the OpenAI batch API are 50,000 requests and 200 MB
+        self.max_requests_per_file = max_requests_per_file
+        self.max_file_bytes = max_file_bytes
+        self.save_batch_size = save_batch_size
+
+    def _job_dir(self, job_id: str) -> Path:
+        return self.root / job_id
+
+    def save_job(self, job: BatchJob) -> None:
+        path = self._job_dir(job.id) / "job.json"
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(asdict(job), indent=2))
+        tmp_path.replace(path)
+
+    def load_job(self, job_id: str) -> BatchJob:
+        data = json.loads((self._job_dir(job_id) / "job.json").read_text())
+        data["parts"] = [BatchPart(**part) for part in data["parts"]]
+        return BatchJob(**data)
+
+    def list_jobs(self) -> List[BatchJob]:
+        """Every job, oldest first."""
+        jobs = [
+            self.load_job(path.parent.name) for path in self.root.glob("*/job.json")
+        ]
+        return sorted(jobs, key=lambda job: job.created_at)
+
+    def pending_article_ids(self) -> Set[int]:
+        """Ids of the articles in jobs that are not ingested or failed yet."""
+        article_ids: Set[int] = set()
+        for job in self.list_jobs():
+            if job.status not in ("ingested", "failed"):
+                article_ids.update(
+                    item["news_article_id"]
+                    for item in _read_jsonl(self._job_dir(job.id) / "articles.jsonl")
+                )
+        return article_ids
+
+    async def create_job(self, limit: int = 10_000) -> Optional[BatchJob]:
+        """Write the requests of up to `limit` articles without sentiment.
+
+        Articles of earlier jobs that are not ingested yet are left out, their
+        sentiment rows would otherwise be saved twice.
+
+        Returns:
+            The job, or None if there are no articles to analyse
+
+        Raises:
+            ValueError: If the provider can't run a model of the prompt config,
+                before anything is written
+        """
+        analyzers = {
+            key: get_analyzer(analyzer)
+            for key, analyzer in (
+                COMBINED_ANALYZERS if prompts_config.combined else SEPARATE_ANALYZERS
+            ).items()
+        }
+        unsupported = sorted(
+            {
+                self._prompt(analyzer).model
+                for analyzer in analyzers.values()
+                if not self.provider.supports(self._prompt(analyzer).model)
+            }
+        )
+        if unsupported:
+            raise ValueError(
+                f"The {self.provider.name} batch provider can't run "
+                f"{', '.join(unsupported)}"
+            )
+
+        pending = self.pending_article_ids()
+        articles = [
+            article
+            for article in await self.db.get_articles_without_sentiment(
+                limit=limit + len(pending)
+            )
+            if article["id"] not in pending
+        ][:limit]
+        if not articles:
+            logger.info("No articles found without sentiment analysis")
+            return None
+
+        created_at = datetime.now(timezone.utc)
+        job = BatchJob(
+            id=f"{created_at:%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}",
+            provider=self.provider.name,
+            created_at=created_at.isoformat(),
+            articles=len(articles),
+            prompts={
+                key: self._prompt(analyzer).model_dump(exclude={"content"})
+                for key, analyzer in analyzers.items()
+            },
+        )
+        job_dir = self._job_dir(job.id)
+        job_dir.mkdir(parents=True, exist_ok=True)
+
+        inputs: List[InputState] = [
+            {
+                "headline": article["title"],
+                "description": article["description"],
+                "news_article_id": article["id"],
+            }
+            for article in articles
+        ]
+        _write_jsonl(job_dir / "articles.jsonl", [dict(item) for item in inputs])
+
+        # Requests are split by model, each provider batch runs a single model
+        files: Dict[str, Tuple[BatchPart, Any, int]] = {}
+        try:
+            for item in inputs:
+                for key, analyzer in analyzers.items():
+                    prompt = self._prompt(analyzer)
+                    line = (
+                        json.dumps(
+                            build_request(
+                                f"{item['news_article_id']}:{key}",
+                                prompt,
+                                analyzer.format_messages(
+                                    item["headline"], item["description"]
+                                ),
+                                analyzer.RESPONSE_MODEL,
+                            ),
+                            separators=(",", ":"),
+                        )
+                        + "\n"
+                    ).encode("utf-8")
+
+                    part, f, size = files.get(prompt.model, (None, None, 0))
+                    if (
+                        part is None
+                        or part.requests >= self.max_requests_per_file
+                        or size + len(line) > self.max_file_bytes
+                    ):
+                        if f is not None:
+                            f.close()
+                        part = BatchPart(
+                            model=prompt.model,
+                            path=f"requests-{len(job.parts):03d}.jsonl",
+                        )
+                        job.parts.append(part)
+                        f = (job_dir / part.path).open("wb")
+                        size = 0
+                    f.write(line)
+                    part.requests += 1
+                    files[prompt.model] = (part, f, size + len(line))
+        finally:
+            for _, f, _ in files.values():
+                f.close()
+
+        self.save_job(job)
+        logger.info(
+            f"Created batch job {job.id} with {len(articles)} articles in "
+            f"{len(job.parts)} request files"
+        )
+        return job
+
+    @staticmethod
+    def _prompt(analyzer: Any) -> PromptConfig:
+        prompt = getattr(prompts_config, analyzer.PROMPT_NAME)
+        if prompt is None:
+            raise ValueError(f"No {analyzer.PROMPT_NAME} prompt in this config")
+        return prompt
+
+    async def submit_job(self, job: BatchJob) -> None:
+        """Submit every part of a job not submitted yet.
+
+        Raises:
+            ValueError: If the job has no requests, it would never finish
+        """
+        if not job.parts:
+            raise ValueError(f"Batch job {job.id} has no requests to submit")
+        for part in job.parts:
+            if part.batch_id is None:
+                part.batch_id = await self.provider.submit(
+                    self._job_dir(job.id) / part.path, part.model
+                )
+                part.status = "in_progress"
+                logger.info(f"Submitted {part.path} of job {job.id}: {part.batch_id}")
+                # Saved after each part, so a failed submit is not repeated
+                self.save_job(job)
+        job.status = "submitted"
+        self.save_job(job)
+
+    async def poll_job(self, job: BatchJob) -> bool:
+        """Update the status of a submitted job.
+
+        Returns:
+            bool: Whether every part is finished, completed or failed, False
+                for a job without parts
+        """
+        if not job.parts:
+            return False
+        for part in job.parts:
+            if part.batch_id is not None and part.status == "in_progress":
+                part.status = await self.provider.status(part.batch_id)
+        finished = all(part.status in ("completed", "failed") for part in job.parts)
+        if finished and job.status == "submitted":
+            completed = any(part.status == "completed" for part in job.parts)
+            job.status = "completed" if completed else "failed"
+        self.save_job(job)
+        return finished
+
+    async def wait_for_job(self, job: BatchJob) -> None:
+        while not await self.poll_job(job):
+            logger.info(f"Batch job {job.id} is in progress")
+            await asyncio.sleep(self.poll_interval)
+
+    async def ingest_job(self, job: BatchJob) -> Dict[str, int]:
+        """Validate the results of a finished job and save them in bulk.
+
+        Returns:
+            Dict[str, int]: Articles in the job, saved and failed
+
+        Raises:
+            ValueError: If a part of the job is not submitted or still running,
+                its results would be lost
+        """
+        if job.status == "ingested":
+            logger.info(f"Batch job {job.id} is already ingested")
+            return job.stats
+        if not await self.poll_job(job):
+            unfinished = [
+                part.path
+                for part in job.parts
+                if part.status not in ("completed", "failed")
+            ]
+            raise ValueError(
+                f"Batch job {job.id} is not finished, {len(unfinished)} of "
+                f"{len(job.parts)} request files are pending: {', '.join(unfinished)}"
+            )
+
+        answers: Dict[str, Any] = {}
+        for part in job.parts:
+            if part.batch_id is not None and part.status == "completed":
+                for result in await self.provider.results(part.batch_id):
+                    custom_id, answer = parse_result(result)
+                    if answer is not None:
+                        answers[custom_id] = answer
+
+        configs = {key: PromptConfig(**prompt) for key, prompt in job.prompts.items()}
+        states: List[OverallState] = []
+        failed = 0
+        for item in _read_jsonl(self._job_dir(job.id) / "articles.jsonl"):
+            state = self._state(cast(InputState, item), answers, configs)
+            if state is None:
+                failed += 1
+            else:
+                states.append(state)
+
+        for start in range(job.saved, len(states), self.save_batch_size):
+            chunk = states[start : start + self.save_batch_size]
+            # The sentiments and tags of a chunk are separate inserts, if the
+            # tags failed before a resume the sentiments are already saved
+            existing = await self.db.get_articles_with_sentiment(
+                [state["news_article_id"] for state in chunk]
+            )
+            if existing:
+                logger.info(
+                    f"Skipping {len(existing)} articles of job {job.id} that "
+                    "already have a sentiment"
+                )
+            await save_news_sentiments(
+                [state for state in chunk if state["news_article_id"] not in existing],
+                self.db,
+            )
+            job.saved = min(start + self.save_batch_size, len(states))
+            self.save_job(job)
+
+        job.status = "ingested"
+        job.stats = {"articles": job.articles, "saved": job.saved, "failed": failed}
+        self.save_job(job)
+        logger.info(f"Ingested batch job {job.id}: {job.stats}")
+        return job.stats
+
+    @staticmethod
+    def _state(
+        item: InputState, answers: Dict[str, Any], configs: Dict[str, PromptConfig]
+    ) -> Optional[OverallState]:
+        results = {}
+        for key in configs:
+            answer = answers.get(f"{item['news_article_id']}:{key}")
+            if answer is None:
+                return None
+            try:
+                results[key] = get_analyzer(ANALYZERS[key]).validate_result(answer)
+            except Exception as e:
+                logger.error(
+                    f"Invalid {key} result for article {item['news_article_id']}: "
+                    f"{str(e)}"
+                )
+                return None
+
+        if "combined" in results:
+            analyses = combined_state(results["combined"], configs["combined"])
+        else:
+            analyses = separate_state(
+                results["sentiment"],
+                configs["sentiment"],
+                results["categories"],
+                configs["categories"],
+                results["emotional_impact"],
+                configs["emotional_impact"],
+                results["clickbait"],
+                configs["clickbait"],
+            )
+        return cast(OverallState, {**item, **analyses})
+
+    async def run(self, limit: int = 10_000) -> Dict[str, int]:
+        """Create, submit, wait for and ingest a job in one go."""
+        job = await self.create_job(limit)
+        if job is None:
+            return {"articles": 0, "saved": 0, "failed": 0}
+        await self.submit_job(job)
+        await self.wait_for_job(job)
+        return await self.ingest_job(job)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(
+        description="Analyse articles without sentiment through a provider batch API"
+    )
+    parser.add_argument(
+        "command", choices=["run", "create", "submit", "status", "ingest"]
+    )
+    parser.add_argument("--provider", choices=sorted(PROVIDERS), default="local")
+    parser.add_argument("--job", default=None, help="Job id, defaults to the latest")
+    parser.add_argument("--limit", type=int, default=10_000)
+    parser.add_argument("--poll-interval", type=float, default=60.0)
+    args = parser.parse_args()
+
+    async def main() -> None:
+        start_time = time.time()
+        service = BatchJobService(
+            PROVIDERS[args.provider](), poll_interval=args.poll_interval
+        )
+        if args.command == "run":
+            stats = await service.run(limit=args.limit)
+        elif args.command == "create":
+            job = await service.create_job(limit=args.limit)
+            print(f"Created batch job {job.id}" if job else "No articles to analyse")
+            return
+        else:
+            jobs = service.list_jobs()
+            job = service.load_job(args.job) if args.job else jobs[-1]
+            if args.command == "submit":
+                await service.submit_job(job)
+            elif args.command == "status":
+                await service.poll_job(job)
+            if args.command != "ingest":
+                parts = ", ".join(f"{part.path}: {part.status}" for part in job.parts)
+                print(f"Batch job {job.id} is {job.status} ({parts})")
+                return
+            stats = await service.ingest_job(job)
+
+        run_duration = int(time.time() - start_time)
+        message = (
+            "📦 *Batch Sentiment Analysis Report* 📦\n\n"
+            f"📊 *Articles:* {stats['articles']}\n"
+            f"✅ *Saved:* {stats['saved']}\n"
+            f"❌ *Failed:* {stats['failed']}\n"
+            f"⏱ *Duration:* {run_duration // 60}m {run_duration % 60}s\n"
+        )
+        print(message)
+
+    asyncio.run(main())
@@ -1,10 +1,18 @@
-from typing import List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 from pydantic import BaseModel, Field
+from langchain_core.messages import BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
 
 from app.config.prompt_config import PromptConfig, prompt_config
 from app.config.category_tags import CategoryTags
 from app.llm.llm import create_llm
+from app.llm.prompt_prefix import cached_prefix_prompt
+from app.services.analysis_cache import analysis_cache
+from app.services.batch_analysis import (
+    analyze_in_batches,
+    batch_prompt,
+    batch_response_model,
+)
 
 from dotenv import load_dotenv
 
@@ -19,6 +27,10 @@ class CategoryTagResponse(BaseModel):
 
 
 class CategoryAnalyzer:
+    # Name of the prompt in PromptsConfig, also keys the shared instance
+    PROMPT_NAME = "category_tag"
+    RESPONSE_MODEL = CategoryTagResponse
+
     def __init__(self) -> None:
         # Load prompts if not already loaded
         if prompt_config.category_tag.content is None:
@@ -27,8 +39,13 @@ class CategoryAnalyzer:
         if prompt_config.category_tag.content is None:
             raise ValueError("Category tag prompt is not loaded")
 
-        self.category_prompt: ChatPromptTemplate = ChatPromptTemplate.from_template(
-            prompt_config.category_tag.content
+        # Static parts of the prompt, rendered once per prompt version
+        self.static_inputs = {"category_tags_list": CategoryTags.to_text_list()}
+
+        self.category_prompt: ChatPromptTemplate = cached_prefix_prompt(
+            prompt_config.category_tag.content,
+            self.static_inputs,
+            prompt_config.category_tag.model,
         )
 
         self.category_analyzer = create_llm(
@@ -40,6 +57,16 @@ class CategoryAnalyzer:
         # Create the chain
         self.category_chain = self.category_prompt | self.category_analyzer
 
+        self.category_batch_chain = batch_prompt(
+            prompt_config.category_tag.content,
+            self.static_inputs,
+            prompt_config.category_tag.model,
+        ) | create_llm(
+            model=prompt_config.category_tag.model,
+            temperature=prompt_config.category_tag.temperature,
+            response_model=batch_response_model(CategoryTagResponse),
+        )
+
         # Get all available category tags
         self.available_tags = [tag.name for tag in CategoryTags.CATEGORY_TAGS]
 
@@ -47,22 +74,69 @@ class CategoryAnalyzer:
         self, headline: str, description: Optional[str] = None
     ) -> Tuple[CategoryTagResponse, PromptConfig]:
         """Analyze the category tags for a single headline"""
-        result = CategoryTagResponse.model_validate(
-            self.category_chain.invoke(
-                {
-                    "headline": headline,
-                    "description": description or "",
-                    "category_tags_list": CategoryTags.to_text_list(),
-                }
+        result = await analysis_cache.get_or_compute(
+            prompt_config.category_tag,
+            CategoryTagResponse,
+            {"headline": headline, "description": description or ""},
+            lambda: self.category_chain.ainvoke(
+                self.prompt_inputs(headline, description)
+            ),
+            self.static_inputs,
+        )
+
+        return self.validate_result(result), prompt_config.category_tag
+
+    async def analyze_headlines(
+        self, headlines: List[Tuple[str, Optional[str]]]
+    ) -> Tuple[List[Optional[CategoryTagResponse]], PromptConfig]:
+        """Analyze the category tags of several headlines and descriptions,
+        batch_size per request.
+
+        Headlines whose analysis failed twice are None.
+        """
+
+        async def analyze_one(item: dict[str, str]) -> CategoryTagResponse:
+            result, _ = await self.analyze_headline(
+                item["headline"], item["description"]
             )
+            return result
+
+        results = await analyze_in_batches(
+            prompt_config.category_tag,
+            [
+                {"headline": headline, "description": description or ""}
+                for headline, description in headlines
+            ],
+            self.category_batch_chain,
+            CategoryTagResponse,
+            analyze_one,
+            prompt_config.category_tag.batch_size,
+            self.static_inputs,
+        )
+        return [
+            self.validate_result(result) if result else None for result in results
+        ], prompt_config.category_tag
+
+    def prompt_inputs(
+        self, headline: str, description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Template values of the prompt for a single headline"""
+        return {"headline": headline, "description": description or ""}
+
+    def format_messages(
+        self, headline: str, description: Optional[str] = None
+    ) -> List[BaseMessage]:
+        """The prompt for a single headline, as sent to the model"""
+        return self.category_prompt.format_messages(
+            **self.prompt_inputs(headline, description)
         )
 
+    def validate_result(self, result: Any) -> CategoryTagResponse:
+        result = CategoryTagResponse.model_validate(result)
         # Validate that returned tags exist in our available tags
         validated_tags = [
             tag for tag in result.secondary_tags if tag in self.available_tags
         ]
-        response = CategoryTagResponse(
+        return CategoryTagResponse(
             primary_tag=result.primary_tag, secondary_tags=validated_tags
         )
-
-        return response, prompt_config.category_tag
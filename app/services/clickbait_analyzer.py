@@ -1,8 +1,16 @@
+from langchain_core.messages import BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import Any, Dict, List, Literal, Optional
 from app.config.prompt_config import PromptConfig, prompt_config
 from app.llm.llm import create_llm
+from app.llm.prompt_prefix import cached_prefix_prompt
+from app.services.analysis_cache import analysis_cache
+from app.services.batch_analysis import (
+    analyze_in_batches,
+    batch_prompt,
+    batch_response_model,
+)
 
 from dotenv import load_dotenv
 
@@ -20,6 +28,10 @@ class ClickbaitScore(BaseModel):
 
 
 class ClickbaitAnalyzer:
+    # Name of the prompt in PromptsConfig, also keys the shared instance
+    PROMPT_NAME = "clickbait_score"
+    RESPONSE_MODEL = ClickbaitScore
+
     def __init__(self) -> None:
         # Load prompts if not already loaded
         if prompt_config.clickbait_score.content is None:
@@ -28,8 +40,10 @@ class ClickbaitAnalyzer:
         if prompt_config.clickbait_score.content is None:
             raise ValueError("Clickbait score prompt is not loaded")
 
-        self.clickbait_prompt: ChatPromptTemplate = ChatPromptTemplate.from_template(
-            prompt_config.clickbait_score.content
+        self.clickbait_prompt: ChatPromptTemplate = cached_prefix_prompt(
+            prompt_config.clickbait_score.content,
+            {},
+            prompt_config.clickbait_score.model,
         )
 
         self.clickbait_analyzer = create_llm(
@@ -40,11 +54,62 @@ class ClickbaitAnalyzer:
 
         self.clickbait_chain = self.clickbait_prompt | self.clickbait_analyzer
 
+        self.clickbait_batch_chain = batch_prompt(
+            prompt_config.clickbait_score.content,
+            {},
+            prompt_config.clickbait_score.model,
+        ) | create_llm(
+            model=prompt_config.clickbait_score.model,
+            temperature=prompt_config.clickbait_score.temperature,
+            response_model=batch_response_model(ClickbaitScore),
+        )
+
     async def analyze_headline(
         self, headline: str
     ) -> tuple[ClickbaitScore, PromptConfig]:
         """Analyze the clickbait score of a single headline"""
-        result = self.clickbait_chain.invoke({"headline": headline})
+        result = await analysis_cache.get_or_compute(
+            prompt_config.clickbait_score,
+            ClickbaitScore,
+            {"headline": headline},
+            lambda: self.clickbait_chain.ainvoke(self.prompt_inputs(headline)),
+        )
+
+        return self.validate_result(result), prompt_config.clickbait_score
+
+    async def analyze_headlines(
+        self, headlines: List[str]
+    ) -> tuple[List[Optional[ClickbaitScore]], PromptConfig]:
+        """Analyze the clickbait score of several headlines, batch_size per request.
+
+        Headlines whose analysis failed twice are None.
+        """
+
+        async def analyze_one(item: dict[str, str]) -> ClickbaitScore:
+            result, _ = await self.analyze_headline(item["headline"])
+            return result
+
+        results = await analyze_in_batches(
+            prompt_config.clickbait_score,
+            [{"headline": headline} for headline in headlines],
+            self.clickbait_batch_chain,
+            ClickbaitScore,
+            analyze_one,
+            prompt_config.clickbait_score.batch_size,
+        )
+        return results, prompt_config.clickbait_score
+
+    def prompt_inputs(
+        self, headline: str, description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Template values of the prompt for a single headline"""
+        return {"headline": headline}
 
-        return ClickbaitScore.model_validate(result), prompt_config.clickbait_score
+    def format_messages(
+        self, headline: str, description: Optional[str] = None
+    ) -> List[BaseMessage]:
+        """The prompt for a single headline, as sent to the model"""
+        return self.clickbait_prompt.format_messages(**self.prompt_inputs(headline))
 
+    def validate_result(self, result: Any) -> ClickbaitScore:
+        return ClickbaitScore.model_validate(result)
@@ -0,0 +1,171 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate
+from pydantic import BaseModel, Field
+
+from app.config.category_tags import CategoryTags
+from app.config.emotional_impact_tags import EmotionalImpactTags
+from app.config.prompt_config import PromptConfig, prompt_config
+from app.llm.llm import create_llm
+from app.llm.prompt_prefix import cached_prefix_prompt
+from app.services.analysis_cache import analysis_cache
+from app.services.batch_analysis import (
+    analyze_in_batches,
+    batch_prompt,
+    batch_response_model,
+)
+from app.services.category_analyzer import CategoryTagResponse
+from app.services.clickbait_analyzer import ClickbaitScoreType
+from app.services.emotional_impact_analyzer import EmotionalImpactResponse
+from app.services.sentiment_analyzer import SENTIMENT_CATEGORIES, SentimentType
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class CombinedAnalysisResponse(BaseModel):
+    """Response model for sentiment, clickbait, emotional impact and category
+    analysis of a headline in a single call"""
+
+    sentiment: SentimentType = Field(
+        description="The sentiment category of the headline"
+    )
+    confidence: int = Field(description="Confidence score from 0 to 100")
+    clickbait_score: ClickbaitScoreType = Field(
+        description="The clickbait score from 1 (not clickbait) to 5 (extremely clickbait)"
+    )
+    emotional_impact: EmotionalImpactResponse = Field(
+        description="The emotional impact tags that apply to the headline"
+    )
+    categories: CategoryTagResponse = Field(
+        description="The category tags that apply to the article"
+    )
+
+
+class CombinedAnalyzer:
+    # Name of the prompt in PromptsConfig, also keys the shared instance
+    PROMPT_NAME = "combined"
+    RESPONSE_MODEL = CombinedAnalysisResponse
+
+    def __init__(self) -> None:
+        if prompt_config.combined is None:
+            raise ValueError("No combined prompt in this prompt config version")
+        self.prompt_config: PromptConfig = prompt_config.combined
+
+        # Load prompts if not already loaded
+        if self.prompt_config.content is None:
+            prompt_config.load_prompt("combined")
+
+        if self.prompt_config.content is None:
+            raise ValueError("Combined analysis prompt is not loaded")
+
+        # Static parts of the prompt, rendered once per prompt version
+        self.static_inputs = {
+            "categories": SENTIMENT_CATEGORIES,
+            "emotional_impact_tags_list": EmotionalImpactTags.to_text_list(),
+            "category_tags_list": CategoryTags.to_text_list(),
+        }
+
+        self.combined_prompt: ChatPromptTemplate = cached_prefix_prompt(
+            self.prompt_config.content, self.static_inputs, self.prompt_config.model
+        )
+
+        self.combined_analyzer = create_llm(
+            model=self.prompt_config.model,
+            temperature=self.prompt_config.temperature,
+            response_model=CombinedAnalysisResponse,
+        )
+
+        self.combined_chain = self.combined_prompt | self.combined_analyzer
+
+        self.combined_batch_chain = batch_prompt(
+            self.prompt_config.content, self.static_inputs, self.prompt_config.model
+        ) | create_llm(
+            model=self.prompt_config.model,
+            temperature=self.prompt_config.temperature,
+            response_model=batch_response_model(CombinedAnalysisResponse),
+        )
+
+        self.valid_emotional_impact_tags: List[str] = [
+            tag.name for tag in EmotionalImpactTags.EMOTIONAL_IMPACT_TAGS
+        ]
+        self.valid_category_tags: List[str] = [
+            tag.name for tag in CategoryTags.CATEGORY_TAGS
+        ]
+
+    async def analyze_headline(
+        self, headline: str, description: Optional[str] = None
+    ) -> Tuple[CombinedAnalysisResponse, PromptConfig]:
+        """Analyze the sentiment, clickbait score, emotional impact and
+        categories of a single headline"""
+        result = await analysis_cache.get_or_compute(
+            self.prompt_config,
+            CombinedAnalysisResponse,
+            {"headline": headline, "description": description or ""},
+            lambda: self.combined_chain.ainvoke(
+                self.prompt_inputs(headline, description)
+            ),
+            self.static_inputs,
+        )
+        return self.validate_result(result), self.prompt_config
+
+    async def analyze_headlines(
+        self, headlines: List[Tuple[str, Optional[str]]]
+    ) -> Tuple[List[Optional[CombinedAnalysisResponse]], PromptConfig]:
+        """Analyze several headlines and descriptions, batch_size per request.
+
+        Headlines whose analysis failed twice are None.
+        """
+
+        async def analyze_one(item: dict[str, str]) -> CombinedAnalysisResponse:
+            result, _ = await self.analyze_headline(
+                item["headline"], item["description"]
+            )
+            return result
+
+        results = await analyze_in_batches(
+            self.prompt_config,
+            [
+                {"headline": headline, "description": description or ""}
+                for headline, description in headlines
+            ],
+            self.combined_batch_chain,
+            CombinedAnalysisResponse,
+            analyze_one,
+            self.prompt_config.batch_size,
+            self.static_inputs,
+        )
+        return [
+            self.validate_result(result) if result else None for result in results
+        ], self.prompt_config
+
+    def prompt_inputs(
+        self, headline: str, description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Template values of the prompt for a single headline"""
+        return {"headline": headline, "description": description or ""}
+
+    def format_messages(
+        self, headline: str, description: Optional[str] = None
+    ) -> List[BaseMessage]:
+        """The prompt for a single headline, as sent to the model"""
+        return self.combined_prompt.format_messages(
+            **self.prompt_inputs(headline, description)
+        )
+
+    def validate_result(self, result: Any) -> CombinedAnalysisResponse:
+        result = CombinedAnalysisResponse.model_validate(result)
+        # Validate that returned secondary tags exist, like the single analyzers
+        result.emotional_impact.secondary_tags = [
+            tag
+            for tag in result.emotional_impact.secondary_tags
+            if tag in self.valid_emotional_impact_tags
+        ]
+        result.categories.secondary_tags = [
+            tag
+            for tag in result.categories.secondary_tags
+            if tag in self.valid_category_tags
+        ]
+        return result
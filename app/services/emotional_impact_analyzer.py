@@ -1,11 +1,19 @@
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
+from langchain_core.messages import BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
 
 from app.config.prompt_config import PromptConfig, prompt_config
 from app.config.emotional_impact_tags import EmotionalImpactTags
 from app.llm.llm import create_llm
+from app.llm.prompt_prefix import cached_prefix_prompt
+from app.services.analysis_cache import analysis_cache
+from app.services.batch_analysis import (
+    analyze_in_batches,
+    batch_prompt,
+    batch_response_model,
+)
 
 from dotenv import load_dotenv
 
@@ -25,6 +33,10 @@ class EmotionalImpactResponse(BaseModel):
 
 
 class EmotionalImpactAnalyzer:
+    # Name of the prompt in PromptsConfig, also keys the shared instance
+    PROMPT_NAME = "emotional_impact"
+    RESPONSE_MODEL = EmotionalImpactResponse
+
     def __init__(self) -> None:
         # Load prompts if not already loaded
         if prompt_config.emotional_impact.content is None:
@@ -33,8 +45,15 @@ class EmotionalImpactAnalyzer:
         if prompt_config.emotional_impact.content is None:
             raise ValueError("Emotional impact prompt is not loaded")
 
-        self.emotional_impact_prompt: ChatPromptTemplate = (
-            ChatPromptTemplate.from_template(prompt_config.emotional_impact.content)
+        # Static parts of the prompt, rendered once per prompt version
+        self.static_inputs = {
+            "emotional_impact_tags_list": EmotionalImpactTags.to_text_list()
+        }
+
+        self.emotional_impact_prompt: ChatPromptTemplate = cached_prefix_prompt(
+            prompt_config.emotional_impact.content,
+            self.static_inputs,
+            prompt_config.emotional_impact.model,
         )
 
         self.emotional_impact_analyzer = create_llm(
@@ -47,6 +66,16 @@ class EmotionalImpactAnalyzer:
             self.emotional_impact_prompt | self.emotional_impact_analyzer
         )
 
+        self.emotional_impact_batch_chain = batch_prompt(
+            prompt_config.emotional_impact.content,
+            self.static_inputs,
+            prompt_config.emotional_impact.model,
+        ) | create_llm(
+            model=prompt_config.emotional_impact.model,
+            temperature=prompt_config.emotional_impact.temperature,
+            response_model=batch_response_model(EmotionalImpactResponse),
+        )
+
         # Get valid tags from config
         self.valid_tags: List[str] = [
             tag.name for tag in EmotionalImpactTags.EMOTIONAL_IMPACT_TAGS
@@ -56,22 +85,62 @@ class EmotionalImpactAnalyzer:
         self, headline: str
     ) -> Tuple[EmotionalImpactResponse, PromptConfig]:
         """Analyze the emotional impact of a single headline"""
-        result = EmotionalImpactResponse.model_validate(
-            self.emotional_impact_chain.invoke(
-                {
-                    "headline": headline,
-                    "emotional_impact_tags_list": EmotionalImpactTags.to_text_list(),
-                }
-            )
+        result = await analysis_cache.get_or_compute(
+            prompt_config.emotional_impact,
+            EmotionalImpactResponse,
+            {"headline": headline},
+            lambda: self.emotional_impact_chain.ainvoke(self.prompt_inputs(headline)),
+            self.static_inputs,
+        )
+
+        return self.validate_result(result), prompt_config.emotional_impact
+
+    async def analyze_headlines(
+        self, headlines: List[str]
+    ) -> Tuple[List[Optional[EmotionalImpactResponse]], PromptConfig]:
+        """Analyze the emotional impact of several headlines, batch_size per request.
+
+        Headlines whose analysis failed twice are None.
+        """
+
+        async def analyze_one(item: dict[str, str]) -> EmotionalImpactResponse:
+            result, _ = await self.analyze_headline(item["headline"])
+            return result
+
+        results = await analyze_in_batches(
+            prompt_config.emotional_impact,
+            [{"headline": headline} for headline in headlines],
+            self.emotional_impact_batch_chain,
+            EmotionalImpactResponse,
+            analyze_one,
+            prompt_config.emotional_impact.batch_size,
+            self.static_inputs,
+        )
+        return [
+            self.validate_result(result) if result else None for result in results
+        ], prompt_config.emotional_impact
+
+    def prompt_inputs(
+        self, headline: str, description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Template values of the prompt for a single headline"""
+        return {"headline": headline}
+
+    def format_messages(
+        self, headline: str, description: Optional[str] = None
+    ) -> List[BaseMessage]:
+        """The prompt for a single headline, as sent to the model"""
+        return self.emotional_impact_prompt.format_messages(
+            **self.prompt_inputs(headline)
         )
 
+    def validate_result(self, result: Any) -> EmotionalImpactResponse:
+        result = EmotionalImpactResponse.model_validate(result)
         # Validate that returned tags exist in our config
         validated_tags: List[str] = [
             tag for tag in result.secondary_tags if tag in self.valid_tags
         ]
-        response = EmotionalImpactResponse(
+        return EmotionalImpactResponse(
             primary_tag=result.primary_tag,
             secondary_tags=validated_tags,
         )
-
-        return response, prompt_config.emotional_impact
@@ -0,0 +1,197 @@
+import io
+import logging
+import re
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import mktime_tz, parsedate_tz
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+CONTENT = "{http://purl.org/rss/1.0/modules/content/}"
+MEDIA = "{http://search.yahoo.com/mrss/}"
+
+# RFC 822 dates with an explicit zone, the only ones parsed here. Other
+# formats are left to feedparser's date heuristics
+_XML_ENCODING_RE = re.compile(rb"""^<\?xml[^>]*encoding=["']([A-Za-z0-9._-]+)["']""")
+_CHARSET_RE = re.compile(r"charset=[\"']?([A-Za-z0-9._-]+)", re.IGNORECASE)
+_RFC822_RE = re.compile(
+    r"^(?:[A-Za-z]{3},\s*)?\d{1,2}\s+[A-Za-z]{3}\s+\d{4}\s+\d{1,2}:\d{2}(?::\d{2})?"
+    r"\s+(?:[+-]\d{4}|GMT|UTC|UT|Z)$"
+)
+
+
+class UnsupportedFeed(Exception):
+    """The feed needs feedparser to get the same entries"""
+
+
+def _parse_date(value: Optional[str]) -> Optional[time.struct_time]:
+    if value is None:
+        return None
+    value = value.strip()
+    if _RFC822_RE.match(value):
+        parsed = parsedate_tz(value)
+        if parsed is None or parsed[9] is None:
+            raise UnsupportedFeed(f"Unparsed date {value!r}")
+        return time.gmtime(mktime_tz(parsed))
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        raise UnsupportedFeed(f"Unknown date format {value!r}")
+    if dt.tzinfo is None:
+        raise UnsupportedFeed(f"Date without a timezone {value!r}")
+    return dt.astimezone(timezone.utc).utctimetuple()
+
+
+def _text(parent: ET.Element, tag: str, markup: bool = False) -> Optional[str]:
+    """Text of the first `tag` child of `parent`.
+
+    Values with markup, which feedparser would sanitize and escape, raise
+    UnsupportedFeed unless `markup` is set for fields strip_html cleans later.
+    """
+    elem = parent.find(tag)
+    if elem is None:
+        return None
+    if len(elem):
+        raise UnsupportedFeed(f"Nested markup in <{tag}>")
+    if elem.get("type") == "xhtml" or elem.get("src"):
+        raise UnsupportedFeed(f"Unsupported content type in <{tag}>")
+    text = (elem.text or "").strip()
+    if not markup and "<" in text:
+        raise UnsupportedFeed(f"Markup in <{tag}>")
+    return text
+
+
+def _absolute(url: Optional[str]) -> Optional[str]:
+    """Links must be absolute, resolving relative ones is left to feedparser."""
+    if url is None:
+        return None
+    url = url.strip()
+    if urlsplit(url).scheme not in ("http", "https"):
+        raise UnsupportedFeed(f"Relative link {url!r}")
+    return url
+
+
+def _media(item: ET.Element) -> Dict[str, List[Dict[str, str]]]:
+    media: Dict[str, List[Dict[str, str]]] = {}
+    for key, tag in (("media_content", "content"), ("media_thumbnail", "thumbnail")):
+        found = [dict(elem.attrib) for elem in item.iter(f"{MEDIA}{tag}")]
+        if found:
+            media[key] = found
+    return media
+
+
+def _content(value: Optional[str]) -> Dict[str, Any]:
+    return {"content": [{"value": value}]} if value else {}
+
+
+def _rss_entry(item: ET.Element) -> Dict[str, Any]:
+    guid = item.find("guid")
+    guid_text = (guid.text or "").strip() if guid is not None else None
+    link = item.findtext("link")
+    # Like feedparser, a permalink guid stands in for a missing link
+    if not (link and link.strip()) and guid is not None:
+        if guid.get("isPermaLink", "true").lower() != "false":
+            link = guid_text
+
+    category = item.find("category")
+    return {
+        "title": _text(item, "title"),
+        "link": _absolute(link),
+        "id": guid_text,
+        "description": _text(item, "description", markup=True),
+        **_content(_text(item, f"{CONTENT}encoded", markup=True)),
+        "category": (category.text or "").strip() if category is not None else None,
+        **_media(item),
+        "published_parsed": _parse_date(item.findtext("pubDate")),
+    }
+
+
+def _atom_entry(entry: ET.Element) -> Dict[str, Any]:
+    alternates = [
+        link.get("href")
+        for link in entry.findall(f"{ATOM}link")
+        if link.get("rel", "alternate") == "alternate"
+    ]
+    if len(alternates) > 1:
+        raise UnsupportedFeed("Several alternate links")
+
+    category = entry.find(f"{ATOM}category")
+    published = entry.findtext(f"{ATOM}published") or entry.findtext(f"{ATOM}issued")
+    return {
+        "title": _text(entry, f"{ATOM}title"),
+        "link": _absolute(alternates[0] if alternates else None),
+        "id": (entry.findtext(f"{ATOM}id") or "").strip() or None,
+        "description": _text(entry, f"{ATOM}summary", markup=True),
+        **_content(_text(entry, f"{ATOM}content", markup=True)),
+        "category": category.get("term") if category is not None else None,
+        **_media(entry),
+        "published_parsed": _parse_date(published),
+    }
+
+
+def parse_entries(content: bytes) -> List[Dict[str, Any]]:
+    """Stream the entries of a well formed RSS 2.0 or Atom feed.
+
+    Only the fields used by normalize_entry are extracted, as plain dicts with
+    the same keys and values feedparser would give. Each entry's element is
+    removed from the tree once read, so the tree is not kept beyond the
+    fields extracted. The body and the extracted entries are still in memory.
+
+    Raises:
+        ET.ParseError: If the feed is not well formed XML
+        UnsupportedFeed: If the feed uses anything feedparser would treat
+            differently, e.g. RSS 1.0, relative links or unusual dates
+    """
+    events = ET.iterparse(io.BytesIO(content), events=("start", "end"))
+    _, root = next(events)
+    if root.tag == "rss" and root.get("version", "2.0").startswith("2."):
+        entry_tag, build = "item", _rss_entry
+    elif root.tag == f"{ATOM}feed":
+        entry_tag, build = f"{ATOM}entry", _atom_entry
+    else:
+        raise UnsupportedFeed(f"Unsupported root element <{root.tag}>")
+
+    entries = []
+    # Open elements, the last one is the parent of the element that ends
+    open_elems = [root]
+    for event, elem in events:
+        if event == "start":
+            open_elems.append(elem)
+            continue
+        open_elems.pop()
+        if elem.tag == entry_tag:
+            entries.append(build(elem))
+            open_elems[-1].remove(elem)
+    return entries
+
+
+def _encodings_agree(content: bytes, headers: Dict[str, str]) -> bool:
+    """Whether the XML declaration and the HTTP charset, which feedparser gives
+    precedence to, name the same encoding."""
+    content_type = next(
+        (value for key, value in headers.items() if key.lower() == "content-type"), ""
+    )
+    charset = _CHARSET_RE.search(content_type)
+    if not charset:
+        return True
+    declared = _XML_ENCODING_RE.match(content)
+    declared_encoding = declared.group(1).decode("ascii") if declared else "utf-8"
+    return charset.group(1).lower() == declared_encoding.lower()
+
+
+def try_parse_entries(
+    content: bytes, headers: Optional[Dict[str, str]] = None
+) -> Optional[List[Dict[str, Any]]]:
+    """Entries of the feed, or None if it needs the full feedparser."""
+    if headers and not _encodings_agree(content, headers):
+        logger.debug("Falling back to feedparser: HTTP and XML encodings differ")
+        return None
+    try:
+        return parse_entries(content)
+    except (ET.ParseError, UnsupportedFeed) as e:
+        logger.debug(f"Falling back to feedparser: {str(e)}")
+        return None
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import logging
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.feed_sources import FeedSource
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FeedValidators:
+    """HTTP validators and content hash from the last processed response of a feed"""
+
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_hash: Optional[str] = None
+
+    def request_headers(self) -> Dict[str, str]:
+        """Conditional GET headers for the next request of this feed."""
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def hash_content(content: bytes) -> str:
+    """Hash of a raw feed body, used to detect unchanged feeds without validators."""
+    return hashlib.sha256(content).hexdigest()
+
+
+class FeedValidatorCache:
+    """Per-source validator cache persisted as JSON between runs."""
+
+    def __init__(self, path: Path = Path("data") / "feed_validators.json") -> None:
+        self.path = path
+        self._validators: Dict[str, FeedValidators] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._validators = {
+                source_id: FeedValidators(**values)
+                for source_id, values in data.items()
+            }
+        except Exception as e:
+            logger.error(f"Error loading feed validator cache {self.path}: {str(e)}")
+            self._validators = {}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    source_id: asdict(validators)
+                    for source_id, validators in self._validators.items()
+                }
+            ),
+            encoding="utf-8",
+        )
+        tmp_path.replace(self.path)
+
+    def get(self, source: FeedSource) -> Optional[FeedValidators]:
+        """Validators for a source, ignored if the source URL has since changed."""
+        validators = self._validators.get(source.id)
+        if validators is None or validators.url != source.url:
+            return None
+        return validators
+
+    def update(
+        self, source: FeedSource, headers: Dict[str, str], content_hash: str
+    ) -> None:
+        """Record the validators of a successfully processed response."""
+        headers = {key.lower(): value for key, value in headers.items()}
+        self._validators[source.id] = FeedValidators(
+            url=source.url,
+            etag=headers.get("etag"),
+            last_modified=headers.get("last-modified"),
+            content_hash=content_hash,
+        )
+
+
+@dataclass
+class FeedWatermark:
+    """Newest publish time seen in a feed and the entries published at that time"""
+
+    url: str
+    published: float
+    entry_ids: List[str] = field(default_factory=list)
+
+    def is_seen(self, published: Optional[float], entry_id: Optional[str]) -> bool:
+        """Whether an entry was already processed in an earlier poll.
+
+        Entries without a publish time can't be placed and are never seen.
+        """
+        if published is None:
+            return False
+        if published < self.published:
+            return True
+        return published == self.published and entry_id in self.entry_ids
+
+
+class FeedWatermarkStore:
+    """Per-source watermarks persisted as JSON between runs."""
+
+    def __init__(self, path: Path = Path("data") / "feed_watermarks.json") -> None:
+        self.path = path
+        self._watermarks: Dict[str, FeedWatermark] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._watermarks = {
+                source_id: FeedWatermark(**values) for source_id, values in data.items()
+            }
+        except Exception as e:
+            logger.error(f"Error loading feed watermarks {self.path}: {str(e)}")
+            self._watermarks = {}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    source_id: asdict(watermark)
+                    for source_id, watermark in self._watermarks.items()
+                }
+            ),
+            encoding="utf-8",
+        )
+        tmp_path.replace(self.path)
+
+    def get(self, source: FeedSource) -> Optional[FeedWatermark]:
+        """Watermark for a source, ignored if the source URL has since changed."""
+        watermark = self._watermarks.get(source.id)
+        if watermark is None or watermark.url != source.url:
+            return None
+        return watermark
+
+    def update(self, source: FeedSource, watermark: Optional[FeedWatermark]) -> None:
+        """Move a source's watermark forward, it never moves back."""
+        current = self.get(source)
+        if watermark is None or (current and watermark.published < current.published):
+            return
+        if current and watermark.published == current.published:
+            entry_ids = set(current.entry_ids) | set(watermark.entry_ids)
+            watermark.entry_ids = sorted(entry_ids)
+        self._watermarks[source.id] = watermark
@@ -0,0 +1,218 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+from app.feed_sources import FeedSource
+from app.services.feed_cache import FeedValidators
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    "news-sentiment-feed-parser/0.1 (+https://github.com/garmeeh/news-emotional-impact)"
+)
+
+
+@dataclass
+class FetchResult:
+    """Raw response for a single feed source"""
+
+    source: FeedSource
+    content: Optional[bytes] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    status_code: Optional[int] = None
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    not_modified: bool = False
+    # The body was over the fetch's max_bytes and was not downloaded in full
+    too_large: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.content is not None
+
+
+class FeedFetcher:
+    """Fetch feeds concurrently over a shared, pooled async HTTP client.
+
+    Concurrency is capped globally and per host, as many of the sources
+    live on the same host (feeds.feedburner.com, feeds.breakingnews.ie).
+
+    Every request has a connect deadline and a read deadline for the whole
+    body, so a publisher that trickles bytes can't stall a run. Both can be
+    overridden per source on FeedSource. Requests to the same host can also be
+    spaced out by `min_host_interval` seconds, e.g. when fetching many
+    article pages from one publisher.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 10,
+        max_per_host: int = 2,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 30.0,
+        min_host_interval: float = 0.0,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.min_host_interval = min_host_interval
+        self._client: Optional[httpx.AsyncClient] = None
+        self._global_limit = asyncio.Semaphore(max_concurrency)
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+        self._host_next_start: Dict[str, float] = {}
+
+    async def __aenter__(self) -> "FeedFetcher":
+        self._client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            follow_redirects=True,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _wait_for_host(self, url: str) -> None:
+        if not self.min_host_interval:
+            return
+        host = urlsplit(url).netloc.lower()
+        now = asyncio.get_running_loop().time()
+        start_at = max(now, self._host_next_start.get(host, now))
+        self._host_next_start[host] = start_at + self.min_host_interval
+        if start_at > now:
+            await asyncio.sleep(start_at - now)
+
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc.lower()
+        if host not in self._host_limits:
+            self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return self._host_limits[host]
+
+    async def fetch(
+        self,
+        source: FeedSource,
+        validators: Optional[FeedValidators] = None,
+        max_bytes: Optional[int] = None,
+    ) -> FetchResult:
+        """Fetch a single feed, never raising for network or HTTP errors.
+
+        If `validators` are given a conditional GET is made, and a 304 response
+        is returned with `not_modified` set and no content. Bodies over
+        `max_bytes` are not downloaded: the Content-Length is checked first and
+        the download stops once the limit is passed, returning `too_large` set
+        and no content.
+        """
+        if self._client is None:
+            raise RuntimeError("FeedFetcher must be used as an async context manager")
+
+        # Wait for the host before taking a global slot, so a host being spaced
+        # out does not hold up requests to other hosts
+        async with self._host_limit(source.url):
+            await self._wait_for_host(source.url)
+            async with self._global_limit:
+                return await self._request(source, validators, max_bytes)
+
+    async def _get(
+        self,
+        source: FeedSource,
+        validators: Optional[FeedValidators],
+        timeout: httpx.Timeout,
+        max_bytes: Optional[int],
+    ) -> Tuple[httpx.Response, Optional[bytes]]:
+        """The response and its body, None if not modified or over max_bytes."""
+        assert self._client is not None
+        async with self._client.stream(
+            "GET",
+            source.url,
+            headers=validators.request_headers() if validators else None,
+            timeout=timeout,
+        ) as response:
+            if response.status_code == 304:
+                return response, None
+            response.raise_for_status()
+            length = response.headers.get("content-length", "")
+            if max_bytes is not None and length.isdigit() and int(length) > max_bytes:
+                return response, None
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body.extend(chunk)
+                if max_bytes is not None and len(body) > max_bytes:
+                    return response, None
+            return response, bytes(body)
+
+    async def _request(
+        self,
+        source: FeedSource,
+        validators: Optional[FeedValidators],
+        max_bytes: Optional[int] = None,
+    ) -> FetchResult:
+        assert self._client is not None
+        connect_timeout = source.connect_timeout or self.connect_timeout
+        read_timeout = source.read_timeout or self.read_timeout
+        start = time.perf_counter()
+        try:
+            # httpx's read timeout is per chunk, the outer deadline caps the
+            # whole request
+            response, content = await asyncio.wait_for(
+                self._get(
+                    source,
+                    validators,
+                    httpx.Timeout(read_timeout, connect=connect_timeout),
+                    max_bytes,
+                ),
+                timeout=connect_timeout + read_timeout,
+            )
+            if response.status_code == 304:
+                return FetchResult(
+                    source=source,
+                    status_code=response.status_code,
+                    elapsed=time.perf_counter() - start,
+                    not_modified=True,
+                )
+            if content is None:
+                return FetchResult(
+                    source=source,
+                    headers=dict(response.headers),
+                    status_code=response.status_code,
+                    elapsed=time.perf_counter() - start,
+                    too_large=True,
+                )
+            return FetchResult(
+                source=source,
+                content=content,
+                headers=dict(response.headers),
+                status_code=response.status_code,
+                elapsed=time.perf_counter() - start,
+            )
+        except httpx.HTTPError as e:
+            logger.error(f"Error fetching {source.id}: {str(e)}")
+            return FetchResult(
+                source=source,
+                status_code=(
+                    e.response.status_code
+                    if isinstance(e, httpx.HTTPStatusError)
+                    else None
+                ),
+                elapsed=time.perf_counter() - start,
+                error=str(e) or type(e).__name__,
+            )
+        except asyncio.TimeoutError:
+            elapsed = time.perf_counter() - start
+            logger.error(f"Timed out fetching {source.id} after {elapsed:.1f}s")
+            return FetchResult(
+                source=source,
+                elapsed=elapsed,
+                error=f"Timed out after {elapsed:.1f}s",
+            )
@@ -0,0 +1,171 @@
+import json
+import logging
+import math
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from app.feed_sources import FeedSource
+
+logger = logging.getLogger(__name__)
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile, None if there are no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+@dataclass
+class FeedHealth:
+    """Recent fetch history of a feed source"""
+
+    # Latencies of the most recent successful fetches, in seconds
+    latencies: List[float] = field(default_factory=list)
+    # Outcomes of the most recent polls, True for success
+    outcomes: List[bool] = field(default_factory=list)
+    # Polls in a row that failed or were slower than the slow threshold
+    consecutive_failures: int = 0
+    last_success: Optional[str] = None
+    last_error: Optional[str] = None
+    last_error_at: Optional[str] = None
+    # Epoch seconds until which the circuit breaker skips this source
+    open_until: float = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def summary(self) -> Dict[str, Optional[float | str]]:
+        return {
+            "p50_seconds": percentile(self.latencies, 50),
+            "p95_seconds": percentile(self.latencies, 95),
+            "error_rate": round(self.error_rate, 3),
+            "last_success": self.last_success,
+            "last_error": self.last_error,
+        }
+
+
+class FeedHealthTracker:
+    """Per-source health and circuit breaker, persisted as JSON between runs.
+
+    A source that fails, or is slower than `slow_seconds`, `failure_threshold`
+    polls in a row is skipped for `base_backoff` seconds, doubling with every
+    further failure up to `max_backoff`. Once the backoff has passed the source
+    is tried again and a single success closes the breaker.
+    """
+
+    def __init__(
+        self,
+        path: Path = Path("data") / "feed_health.json",
+        window: int = 20,
+        failure_threshold: int = 3,
+        slow_seconds: float = 20.0,
+        base_backoff: float = 15 * 60,
+        max_backoff: float = 24 * 3600,
+    ) -> None:
+        self.path = path
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.slow_seconds = slow_seconds
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._health: Dict[str, FeedHealth] = {}
+        self.load()
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self._health = {
+                source_id: FeedHealth(
+                    **{
+                        key: value
+                        for key, value in values.items()
+                        if key in FeedHealth.__dataclass_fields__
+                    }
+                )
+                for source_id, values in data.items()
+            }
+        except Exception as e:
+            logger.error(f"Error loading feed health {self.path}: {str(e)}")
+            self._health = {}
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        # The summary is written alongside the raw history for people reading the file
+        tmp_path.write_text(
+            json.dumps(
+                {
+                    source_id: {**asdict(health), **health.summary()}
+                    for source_id, health in self._health.items()
+                },
+                indent=2,
+            ),
+            encoding="utf-8",
+        )
+        tmp_path.replace(self.path)
+
+    def get(self, source: FeedSource) -> FeedHealth:
+        return self._health.setdefault(source.id, FeedHealth())
+
+    def is_open(self, source: FeedSource) -> bool:
+        """Whether the circuit breaker is currently skipping this source."""
+        health = self._health.get(source.id)
+        return health is not None and health.open_until > time.time()
+
+    def order(self, sources: Sequence[FeedSource]) -> List[FeedSource]:
+        """Sources slowest first, so long fetches don't hold up the end of a run.
+
+        Sources without a recorded latency are treated as the slowest.
+        """
+
+        def median_latency(source: FeedSource) -> float:
+            health = self._health.get(source.id)
+            p50 = percentile(health.latencies, 50) if health else None
+            return math.inf if p50 is None else p50
+
+        return sorted(sources, key=median_latency, reverse=True)
+
+    def _record(self, health: FeedHealth, ok: bool) -> None:
+        health.outcomes = (health.outcomes + [ok])[-self.window :]
+
+    def record_success(self, source: FeedSource, elapsed: float) -> None:
+        health = self.get(source)
+        self._record(health, True)
+        health.latencies = (health.latencies + [round(elapsed, 3)])[-self.window :]
+        health.last_success = datetime.now(timezone.utc).isoformat()
+        if elapsed > self.slow_seconds:
+            logger.warning(f"Slow feed {source.id}: {elapsed:.1f}s to fetch")
+            self._strike(source, health)
+        else:
+            health.consecutive_failures = 0
+            health.open_until = 0.0
+
+    def record_failure(self, source: FeedSource, error: Optional[str]) -> None:
+        health = self.get(source)
+        self._record(health, False)
+        health.last_error = error
+        health.last_error_at = datetime.now(timezone.utc).isoformat()
+        self._strike(source, health)
+
+    def _strike(self, source: FeedSource, health: FeedHealth) -> None:
+        health.consecutive_failures += 1
+        over = health.consecutive_failures - self.failure_threshold
+        if over < 0:
+            return
+        backoff = min(self.base_backoff * 2**over, self.max_backoff)
+        health.open_until = time.time() + backoff
+        logger.warning(
+            f"Circuit open for {source.id} after {health.consecutive_failures} "
+            f"bad polls, skipping it for {backoff / 60:.0f} minutes"
+        )
@@ -0,0 +1,218 @@
+import calendar
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Container, Dict, Iterable, Iterator, List, Optional
+
+import feedparser  # type: ignore
+
+from app.feed_sources import FeedSource
+from app.services.fast_feed_parser import try_parse_entries
+from app.services.feed_cache import FeedWatermark
+from app.utils.html_mods import strip_html
+
+logger = logging.getLogger(__name__)
+
+# Publish times further ahead than this are treated as bad dates and never
+# move a feed's watermark, or they would hide real new entries until then
+MAX_FUTURE_SECONDS = 24 * 3600
+
+
+@dataclass(slots=True)
+class ArticleRecord:
+    """A normalized feed entry, cleaned and validated once, ready to insert"""
+
+    title: str
+    url: str
+    publish_date: str
+    source: str
+    description: Optional[str] = None
+    category: str = "UNKNOWN"
+    media_url: Optional[str] = None
+
+    def to_row(self) -> Dict[str, Optional[str]]:
+        """The news_articles row for this record, see Database.insert_articles."""
+        return {
+            "title": self.title,
+            "url": self.url,
+            "description": self.description,
+            "category": self.category,
+            "media_url": self.media_url,
+            "publish_date": self.publish_date,
+            "source": self.source,
+        }
+
+
+@dataclass
+class ParsedFeed:
+    """Plain result of parsing a feed body, safe to send between processes"""
+
+    articles: List[ArticleRecord] = field(default_factory=list)
+    entry_count: int = 0
+    skipped_count: int = 0
+    published_timestamps: List[float] = field(default_factory=list)
+    parse_seconds: float = 0.0
+    normalize_seconds: float = 0.0
+    watermark: Optional[FeedWatermark] = None
+    # Parsed by the streaming parser rather than feedparser
+    fast_parsed: bool = False
+    error: Optional[str] = None
+
+
+def normalize_entry(
+    entry: Any, source: FeedSource, url: Optional[str] = None
+) -> Optional[ArticleRecord]:
+    """Map a feedparser entry to an ArticleRecord, with the description
+    stripped of HTML.
+
+    Returns None if the entry is missing a title, url or publish date.
+    """
+    title: str | None = entry.get("title")
+    url = url or entry.get("link")
+    description: str | None = entry.get("description")
+
+    # If no description, try to get content
+    if not description:
+        content_array = entry.get("content")
+        description = content_array[0].get("value") if content_array else None
+
+    # Media or thumbnail if available
+    media_url: str | None = None
+    media = entry.get("media_content")
+    if media is None:
+        media = entry.get("media_thumbnail")
+    if media:
+        media_url = media[0]["url"]
+
+    # Parse date if present
+    publish_date: str | None = None
+    published_parsed = entry.get("published_parsed")
+    if published_parsed:
+        try:
+            publish_date = datetime(*published_parsed[:6]).isoformat()
+        except Exception as e:
+            logger.warning(f"Error parsing published_parsed date. Error: {str(e)}")
+
+    title = title.strip() if title else None
+    url = url.strip() if url else None
+
+    # If title or url is missing, skip
+    if not title or not url or not publish_date:
+        logger.warning(
+            f"Skipping article from {source.id} - missing required fields: {' and '.join(field for field, value in [('title', title), ('url', url), ('publish_date', publish_date)] if not value)}"
+        )
+        return None
+
+    category: str | None = entry.get("category")
+    return ArticleRecord(
+        title=title,
+        url=url,
+        publish_date=publish_date,
+        source=source.name.strip() if source.name else "Unknown",
+        description=strip_html(description),
+        category=category.strip() if category else "UNKNOWN",
+        media_url=media_url.strip() if media_url else None,
+    )
+
+
+def iter_articles(
+    entries: Iterable[Any],
+    source: FeedSource,
+    parsed: ParsedFeed,
+    seen_urls: Optional[Container[str]] = None,
+    watermark: Optional[FeedWatermark] = None,
+) -> Iterator[ArticleRecord]:
+    """Yield a record for every new, valid entry, counting into `parsed`.
+
+    The newest publish time in the feed, and the entries published at that
+    time, are recorded as the feed's next watermark in `parsed.watermark`,
+    once the generator is exhausted. parse_feed collects the records into a
+    list: the ParsedFeed is sent back from pool workers and each feed is
+    inserted in one request, so nothing downstream consumes them one by one.
+    """
+    newest: Optional[float] = None
+    newest_ids: List[str] = []
+    latest_allowed = time.time() + MAX_FUTURE_SECONDS
+
+    for entry in entries:
+        parsed.entry_count += 1
+
+        # Publish times of every entry, used to learn how often a source publishes
+        published: Optional[float] = None
+        published_parsed = entry.get("published_parsed")
+        if published_parsed:
+            published = calendar.timegm(published_parsed)
+            parsed.published_timestamps.append(published)
+
+        url: str | None = entry.get("link")
+        entry_id: str | None = entry.get("id") or url
+
+        if published is not None and entry_id and published <= latest_allowed:
+            if newest is None or published > newest:
+                newest, newest_ids = published, [entry_id]
+            elif published == newest:
+                newest_ids.append(entry_id)
+
+        # Older than the last poll, or already ingested, skip before any
+        # normalization work
+        if (watermark and watermark.is_seen(published, entry_id)) or (
+            url and seen_urls is not None and url in seen_urls
+        ):
+            parsed.skipped_count += 1
+            continue
+
+        article = normalize_entry(entry, source, url)
+        if article:
+            yield article
+
+    if newest is not None:
+        parsed.watermark = FeedWatermark(
+            url=source.url, published=newest, entry_ids=newest_ids
+        )
+
+
+def parse_feed(
+    content: bytes,
+    headers: Dict[str, str],
+    source: FeedSource,
+    seen_urls: Optional[Container[str]] = None,
+    watermark: Optional[FeedWatermark] = None,
+    fast: bool = True,
+) -> ParsedFeed:
+    """Parse a raw feed body and normalize its entries into ArticleRecords.
+
+    This is a plain module level function so it can run in a process pool.
+    Well formed RSS 2.0 and Atom feeds are read with the streaming parser in
+    fast_feed_parser, anything it can't handle exactly like feedparser falls
+    back to feedparser.
+
+    Args:
+        content: Raw feed body
+        headers: HTTP response headers, used by feedparser to detect the encoding
+        source: Feed source the body was fetched from
+        seen_urls: URLs to skip before normalizing, e.g. a SeenUrlIndex
+        watermark: Skip entries published before the feed's last poll
+        fast: Try the streaming parser before feedparser
+    """
+    start = time.perf_counter()
+    # Some publishers emit whitespace before the XML declaration, which
+    # feedparser would otherwise flag as a bozo feed
+    content = content.lstrip()
+    entries = try_parse_entries(content, headers) if fast else None
+    fast_parsed = entries is not None
+    if entries is None:
+        d = feedparser.parse(content, response_headers=headers)
+        if hasattr(d, "bozo_exception"):
+            return ParsedFeed(
+                error=str(d.bozo_exception),
+                parse_seconds=time.perf_counter() - start,
+            )
+        entries = d.entries
+    parse_seconds = time.perf_counter() - start
+
+    parsed = ParsedFeed(parse_seconds=parse_seconds, fast_parsed=fast_parsed)
+    start = time.perf_counter()
+    parsed.articles = list(iter_articles(entries, source, parsed, seen_urls, watermark))
+    parsed.normalize_seconds = time.perf_counter() - start
+    return parsed
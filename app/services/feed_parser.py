@@ -1,12 +1,25 @@
-from typing import List
-import feedparser  # type: ignore
-import logging
-import json
 from datetime import datetime
+from typing import List, Optional
+import asyncio
+import logging
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from app.db import Database
 from app.feed_sources import FeedSource, NewsFeedSources
-from app.utils.html_mods import strip_html
+from app.services.article_content import ArticleContentService
+from app.services.feed_archive import FeedArchive
+from app.services.feed_cache import (
+    FeedValidatorCache,
+    FeedWatermarkStore,
+    hash_content,
+)
+from app.services.feed_fetcher import FeedFetcher, FetchResult
+from app.services.feed_health import FeedHealthTracker
+from app.services.feed_normalizer import ArticleRecord, ParsedFeed, parse_feed
+from app.services.seen_urls import SeenUrlIndex
+from app.services.story_index import StoryIndex
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
@@ -15,141 +28,490 @@ load_dotenv()
 
 
 class FeedParserService:
-    def __init__(self, store_json: bool = False):
-        self.db = Database()
-        self.store_json = store_json
-        self.data_dir = Path("data")
-        if store_json:
-            self.data_dir.mkdir(exist_ok=True)
+    def __init__(
+        self,
+        archive_feeds: bool = False,
+        sources: Optional[List[FeedSource]] = None,
+        db: Optional[Database] = None,
+        max_concurrency: int = 10,
+        max_per_host: int = 2,
+        use_validator_cache: bool = True,
+        use_seen_urls: bool = True,
+        parse_workers: int = 0,
+        use_story_index: bool = True,
+        use_watermarks: bool = True,
+        use_health: bool = True,
+        data_dir: Path = Path("data"),
+        fast_parse: bool = True,
+        fetch_content: bool = False,
+        store_json: Optional[bool] = None,
+    ):
+        """
+        Args:
+            archive_feeds: Keep the raw body of every fetched feed in
+                data/archive, compressed and deduplicated, see FeedArchive
+            sources: Feed sources to parse, defaults to NewsFeedSources
+            db: Database to insert into, defaults to a new Database
+            max_concurrency: Maximum number of feeds fetched at the same time
+            max_per_host: Maximum number of feeds fetched at the same time per host
+            use_validator_cache: Skip feeds that are unchanged since the last run,
+                using ETag/Last-Modified and a hash of the feed body
+            use_seen_urls: Drop entries whose URL is already in the database
+                using a local index, before normalizing or inserting them
+            parse_workers: Parse and normalize feeds in a process pool of this
+                size instead of on the event loop, 0 disables the pool
+            use_story_index: Link copies of a story already ingested from
+                another feed, matched on canonical URL or on headline within a
+                day, to that article instead of inserting them again
+            use_watermarks: Skip entries published before the newest entry
+                of the feed's last successful poll, before normalizing them
+            use_health: Track fetch latency and errors per source, fetch the
+                slowest sources first and skip sources that keep failing for
+                a while, see FeedHealthTracker
+            data_dir: Directory for the local caches and indexes
+            fast_parse: Parse well formed RSS 2.0 and Atom feeds with the
+                streaming parser, falling back to feedparser for anything else
+            fetch_content: Fetch the pages of newly inserted articles and store
+                their text, see ArticleContentService. Done at the end of
+                parse_all_feeds, and after each poll under the FeedScheduler
+            store_json: Deprecated alias of archive_feeds. The entries of each
+                feed are no longer written to data/<source>.ndjson.gz, the
+                archived bodies can be replayed instead
+        """
+        if store_json is not None:
+            warnings.warn(
+                "store_json is deprecated, use archive_feeds",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            archive_feeds = archive_feeds or store_json
+        self.db = db or Database()
+        self.sources = sources
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.data_dir = data_dir
+        self.archive: Optional[FeedArchive] = (
+            FeedArchive(self.data_dir / "archive") if archive_feeds else None
+        )
+        self.validator_cache: Optional[FeedValidatorCache] = (
+            FeedValidatorCache(self.data_dir / "feed_validators.json")
+            if use_validator_cache
+            else None
+        )
+        self.seen_urls: Optional[SeenUrlIndex] = (
+            SeenUrlIndex(self.data_dir / "seen_urls.bin") if use_seen_urls else None
+        )
+        self.story_index: Optional[StoryIndex] = (
+            StoryIndex(self.data_dir / "story_index.json") if use_story_index else None
+        )
+        self.watermarks: Optional[FeedWatermarkStore] = (
+            FeedWatermarkStore(self.data_dir / "feed_watermarks.json")
+            if use_watermarks
+            else None
+        )
+        self.health: Optional[FeedHealthTracker] = (
+            FeedHealthTracker(self.data_dir / "feed_health.json")
+            if use_health
+            else None
+        )
+        self.fast_parse = fast_parse
+        self.fetch_content = fetch_content
+        # Rows inserted since their content was last fetched, see fetch_content
+        self.inserted_articles: List[dict] = []
+        self.parse_workers = parse_workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        # Seconds spent in each stage, summed over all feeds of a run
+        self.stage_seconds: dict[str, float] = {}
 
     async def parse_all_feeds(self) -> dict[str, str | int]:
         """
-        Parse RSS/Atom feeds from various sources and store in database.
+        Fetch RSS/Atom feeds from various sources concurrently and store in database.
         Returns dict with status message and number of articles inserted.
         """
-        sources: List[FeedSource] = NewsFeedSources.get_all_sources()
+        sources: List[FeedSource] = self.sources or NewsFeedSources.get_all_sources()
+        if self.health:
+            sources = self.health.order(sources)
         logger.info(f"Starting to parse {len(sources)} feeds")
         logger.info(f"Sources: {sources}")
 
-        total_articles: int = 0
-        inserted_count = 0
-        skipped_count = 0
-        error_count = 0
-
-        for source in sources:
-            logger.info(f"Parsing feed: {source.id}")
-            d = feedparser.parse(source.url)
-
-            if hasattr(d, "bozo_exception"):
-                logger.error(f"Error parsing {source.id}: {d.bozo_exception}")
-                error_count += 1
-                continue
-
-            if self.store_json:
-                json_path: Path = self.data_dir / f"{source.id}.json"
-                try:
-                    with open(json_path, "w", encoding="utf-8") as f:
-                        json.dump(d.entries, f, ensure_ascii=False, indent=2)
-                    logger.info(f"Saved {len(d.entries)} entries to {json_path}")
-                except Exception as e:
-                    logger.error(f"Error saving JSON file for {source.id}: {str(e)}")
-
-            logger.info(f"Found {len(d.entries)} articles in {source.id}")
-            total_articles += len(d.entries)
-            for entry in d.entries:
-                title: str | None = getattr(entry, "title", None)
-                url: str | None = getattr(entry, "link", None)
-                description: str | None = getattr(entry, "description", None)
-
-                # If no description, try to get content
-                if not description:
-                    content_array = getattr(entry, "content", [])
-                    content = (
-                        content_array[0].get("value", None) if content_array else None
-                    )
-                    if content:
-                        description = strip_html(content)
+        counts = self._start_run()
+        await self.start()
+        try:
+            async with FeedFetcher(
+                max_concurrency=self.max_concurrency, max_per_host=self.max_per_host
+            ) as fetcher:
+                await asyncio.gather(
+                    *(self.ingest_source(fetcher, source, counts) for source in sources)
+                )
+        finally:
+            await self.stop()
 
-                category: str | None = getattr(entry, "category", None)
-                media_url: str | None = None
+        return await self._finish_run(counts)
 
-                # Media or thumbnail if available
-                if hasattr(entry, "media_content"):
-                    media: dict | None = (
-                        entry.media_content[0] if entry.media_content else None
-                    )
-                    media_url = media["url"] if media else None
-                elif hasattr(entry, "media_thumbnail"):
-                    media_thumb: dict | None = (
-                        entry.media_thumbnail[0] if entry.media_thumbnail else None
-                    )
-                    media_url = media_thumb["url"] if media_thumb else None
-
-                # Parse date if present
-                publish_date: str | None = None
-
-                if hasattr(entry, "published_parsed") and entry.published_parsed:
-                    try:
-                        parsed_date = datetime(*entry.published_parsed[:6])
-                        publish_date = parsed_date.isoformat()
-                    except Exception as e:
-                        logger.warning(
-                            f"Error parsing published_parsed date. Error: {str(e)}"
-                        )
-                        publish_date = None
-
-                # If title or url is missing, skip
-                if not title or not url or not publish_date:
-                    logger.warning(
-                        f"Skipping article from {source.id} - missing required fields: {' and '.join(field for field, value in [('title', title), ('url', url), ('publish_date', publish_date)] if not value)}"
-                    )
-                    continue
-
-                # Insert into DB
-                try:
-                    inserted_article = await self.db.insert_article(
-                        title=title,
-                        url=url,
-                        description=description,
-                        category=category,
-                        media_url=media_url,
-                        publish_date=publish_date,
-                        source=source.name,
+    async def replay_archive(
+        self,
+        archive: FeedArchive,
+        source_ids: Optional[List[str]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        reprocess: bool = False,
+    ) -> dict[str, str | int]:
+        """
+        Re-ingest archived feed snapshots instead of fetching the feeds, e.g. to
+        backfill a new database, reprocess after a normalization fix or load
+        test the database. Snapshots of each source are processed in fetch
+        order, and sources concurrently. Every snapshot is parsed in full: the
+        validator cache, watermarks and feed health are neither checked nor
+        updated, as they only make sense for live polling.
+
+        By default articles already in the database, or linked to a story in
+        it, are skipped. With `reprocess` the seen URL and story indexes are
+        bypassed and stored articles are overwritten with the newly normalized
+        rows. Returns the same counts as parse_all_feeds, where inserted also
+        counts the updated articles when reprocessing.
+        """
+        source_ids = source_ids or archive.source_ids()
+        logger.info(f"Replaying archived snapshots of {len(source_ids)} feeds")
+
+        counts = self._start_run()
+        counts["snapshots"] = 0
+        await self.start()
+        try:
+            await asyncio.gather(
+                *(
+                    self._replay_source(
+                        archive, source_id, since, until, counts, reprocess
                     )
+                    for source_id in source_ids
+                )
+            )
+        finally:
+            await self.stop()
+
+        result = await self._finish_run(counts)
+        result["snapshots_replayed"] = counts["snapshots"]
+        return result
 
-                    if inserted_article:
-                        inserted_count += 1
-                    else:
-                        skipped_count += 1
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f"Error inserting article from {source.id}: {str(e)}")
+    async def _replay_source(
+        self,
+        archive: FeedArchive,
+        source_id: str,
+        since: Optional[datetime],
+        until: Optional[datetime],
+        counts: dict[str, int],
+        reprocess: bool,
+    ) -> None:
+        snapshots = archive.snapshots(source_id, since, until)
+        for fetched in archive.fetch_results(snapshots):
+            counts["snapshots"] += 1
+            await self.process_feed(fetched, counts, replay=True, reprocess=reprocess)
+
+    def _start_run(self) -> dict[str, int]:
+        """Reset the per run state and return zeroed counts."""
+        self.stage_seconds = {
+            "fetch": 0.0,
+            "parse": 0.0,
+            "normalize": 0.0,
+            "insert": 0.0,
+        }
+        self.inserted_articles = []
+        return {
+            "total": 0,
+            "inserted": 0,
+            "skipped": 0,
+            "duplicates": 0,
+            "errors": 0,
+            "unchanged": 0,
+            "circuit_open": 0,
+        }
+
+    async def _finish_run(self, counts: dict[str, int]) -> dict[str, str | int]:
+        """Fetch the content of the inserted articles, if enabled, and report."""
+        content_stats = await self.fetch_inserted_content()
 
         logger.info(
-            f"Finished parsing feeds. Inserted {inserted_count} articles, skipped {skipped_count} articles, errors {error_count} out of {total_articles}"
+            f"Finished parsing feeds. Inserted {counts['inserted']} articles, skipped {counts['skipped']} articles, {counts['duplicates']} duplicate stories, errors {counts['errors']} out of {counts['total']}, {counts['unchanged']} feeds unchanged, {counts['circuit_open']} feeds skipped with an open circuit"
         )
         return {
             "message": "Feeds parsed successfully",
-            "articles_inserted": inserted_count,
-            "articles_skipped": skipped_count,
-            "articles_errors": error_count,
-            "total_articles": total_articles,
+            "articles_inserted": counts["inserted"],
+            "articles_skipped": counts["skipped"],
+            "articles_duplicates": counts["duplicates"],
+            "articles_errors": counts["errors"],
+            "total_articles": counts["total"],
+            "feeds_unchanged": counts["unchanged"],
+            "feeds_circuit_open": counts["circuit_open"],
+            "article_pages_stored": int(content_stats.get("stored", 0)),
         }
 
+    async def fetch_inserted_content(self) -> dict[str, float]:
+        """Fetch and store the pages of the articles inserted since the last call.
+
+        Does nothing unless `fetch_content` is set. Long running callers like
+        the FeedScheduler call this after each ingest_source, the articles are
+        taken off the list first so concurrent polls don't fetch them twice.
+        """
+        articles, self.inserted_articles = self.inserted_articles, []
+        if not self.fetch_content or not articles:
+            return {}
+        return await ArticleContentService(
+            db=self.db,
+            max_concurrency=self.max_concurrency,
+            max_per_host=self.max_per_host,
+            extract_workers=self.parse_workers,
+        ).process_articles(articles)
+
+    async def start(self) -> None:
+        """Sync the seen URL index and start the parse pool, if enabled."""
+        if self.seen_urls is not None:
+            try:
+                await self.seen_urls.sync(self.db)
+            except Exception as e:
+                # The index only saves work, unknown URLs still go to the DB
+                logger.error(f"Error syncing seen URL index: {str(e)}")
+
+        if self.parse_workers > 0 and self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+
+    async def stop(self) -> None:
+        """Shut down the parse pool and persist the local caches."""
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.save_state()
+
+    def save_state(self) -> None:
+        """Persist the local caches, indexes and feed health."""
+        if self.validator_cache:
+            self.validator_cache.save()
+        if self.health:
+            self.health.save()
+        if self.watermarks:
+            self.watermarks.save()
+        if self.seen_urls is not None:
+            self.seen_urls.save()
+        if self.story_index is not None:
+            self.story_index.save()
+
+    async def ingest_source(
+        self, fetcher: FeedFetcher, source: FeedSource, counts: dict[str, int]
+    ) -> Optional[ParsedFeed]:
+        """Fetch, parse and insert a single source, see process_feed."""
+        if self.health and self.health.is_open(source):
+            logger.info(f"Skipping {source.id}, circuit open after repeated failures")
+            counts["circuit_open"] += 1
+            return None
+
+        validators = self.validator_cache.get(source) if self.validator_cache else None
+        fetched = await fetcher.fetch(source, validators)
+        if self.archive is not None and fetched.ok:
+            try:
+                self.archive.add(fetched)
+            except Exception as e:
+                logger.error(f"Error archiving {source.id}: {str(e)}")
+        return await self.process_feed(fetched, counts)
+
+    def _split_duplicates(
+        self, articles: List[ArticleRecord], reprocess: bool = False
+    ) -> tuple[List[ArticleRecord], List[dict[str, str]]]:
+        """Split articles into new stories and aliases of stories already ingested.
+
+        New stories are added to the story index straight away, so a copy in a
+        feed processed concurrently is matched before this insert finishes.
+        """
+        if self.story_index is None or reprocess:
+            return articles, []
+
+        new_articles: List[ArticleRecord] = []
+        aliases: List[dict[str, str]] = []
+        for article in articles:
+            canonical_url = self.story_index.match(article)
+            if canonical_url:
+                aliases.append(
+                    {
+                        "url": article.url,
+                        "news_article_url": canonical_url,
+                        "title": article.title,
+                        "source": article.source,
+                    }
+                )
+            else:
+                self.story_index.add(article)
+                new_articles.append(article)
+        return new_articles, aliases
+
+    def _record_health(self, fetched: FetchResult, error: Optional[str] = None) -> None:
+        if not self.health:
+            return
+        if error:
+            self.health.record_failure(fetched.source, error)
+        else:
+            self.health.record_success(fetched.source, fetched.elapsed)
+
+    def _add_stage_time(self, stage: str, seconds: float) -> None:
+        self.stage_seconds[stage] = self.stage_seconds.get(stage, 0.0) + seconds
+
+    async def process_feed(
+        self,
+        fetched: FetchResult,
+        counts: dict[str, int],
+        replay: bool = False,
+        reprocess: bool = False,
+    ) -> Optional[ParsedFeed]:
+        """Parse a fetched feed and insert its articles, updating `counts` in place.
+
+        Args:
+            fetched: Result of fetching the feed, or an archived snapshot
+            counts: Counts of the run, shared with feeds processed concurrently
+            replay: The feed is an archived snapshot, parse it whatever the
+                validator cache, watermarks and feed health say, and leave
+                them as they are
+            reprocess: Skip the seen URL and story indexes and overwrite the
+                articles already stored, see replay_archive
+
+        Returns the parsed feed, or None if it was unchanged or failed.
+        """
+        source = fetched.source
+        validator_cache = None if replay else self.validator_cache
+        watermarks = None if replay else self.watermarks
+        seen_urls = None if reprocess else self.seen_urls
+        self._add_stage_time("fetch", fetched.elapsed)
+        if fetched.not_modified:
+            logger.info(f"Feed not modified: {source.id}")
+            if not replay:
+                self._record_health(fetched)
+            counts["unchanged"] += 1
+            return None
+
+        if not fetched.ok:
+            if not replay:
+                self._record_health(fetched, fetched.error or "No content")
+            counts["errors"] += 1
+            return None
+
+        content_hash = hash_content(fetched.content)
+        validators = validator_cache.get(source) if validator_cache else None
+        if validators and validators.content_hash == content_hash:
+            logger.info(f"Feed content unchanged: {source.id}")
+            self._record_health(fetched)
+            counts["unchanged"] += 1
+            return None
+
+        watermark = watermarks.get(source) if watermarks else None
+        logger.info(f"Parsing feed: {source.id} ({fetched.elapsed:.2f}s to fetch)")
+        if self.executor is not None:
+            # The seen URL index stays in this process, so it is applied after
+            # parsing instead of before normalization
+            parsed = await asyncio.get_running_loop().run_in_executor(
+                self.executor,
+                parse_feed,
+                fetched.content,
+                fetched.headers,
+                source,
+                None,
+                watermark,
+                self.fast_parse,
+            )
+            if seen_urls is not None:
+                new_articles = [
+                    article
+                    for article in parsed.articles
+                    if article.url not in seen_urls
+                ]
+                parsed.skipped_count += len(parsed.articles) - len(new_articles)
+                parsed.articles = new_articles
+        else:
+            parsed = parse_feed(
+                fetched.content,
+                fetched.headers,
+                source,
+                seen_urls,
+                watermark,
+                self.fast_parse,
+            )
+
+        self._add_stage_time("parse", parsed.parse_seconds)
+        self._add_stage_time("normalize", parsed.normalize_seconds)
+        if not replay:
+            self._record_health(fetched, parsed.error)
+        if parsed.error:
+            logger.error(f"Error parsing {source.id}: {parsed.error}")
+            counts["errors"] += 1
+            return None
+
+        logger.info(f"Found {parsed.entry_count} articles in {source.id}")
+        counts["total"] += parsed.entry_count
+        counts["skipped"] += parsed.skipped_count
+        articles, aliases = self._split_duplicates(parsed.articles, reprocess)
+        # Whether every article of this feed made it to the database. Tracked
+        # per feed, as `counts` is shared with feeds processed concurrently
+        stored = True
+
+        # Insert the whole feed in one request, known URLs are skipped by the DB
+        if articles:
+            start = time.perf_counter()
+            try:
+                inserted_articles = await self.db.insert_articles(
+                    [article.to_row() for article in articles],
+                    already_clean=True,
+                    update_existing=reprocess,
+                )
+                counts["inserted"] += len(inserted_articles)
+                # Updated rows already have their content
+                if self.fetch_content and not reprocess:
+                    self.inserted_articles.extend(inserted_articles)
+                counts["skipped"] += len(articles) - len(inserted_articles)
+                # Skipped rows were already in the DB, so all of them are known now
+                if self.seen_urls is not None:
+                    self.seen_urls.update(article.url for article in articles)
+            except Exception as e:
+                stored = False
+                counts["errors"] += len(articles)
+                if self.story_index is not None:
+                    self.story_index.discard(articles)
+                logger.error(f"Error inserting articles from {source.id}: {str(e)}")
+            self._add_stage_time("insert", time.perf_counter() - start)
+
+        if aliases:
+            start = time.perf_counter()
+            try:
+                await self.db.insert_article_aliases(aliases)
+                counts["duplicates"] += len(aliases)
+                if self.seen_urls is not None:
+                    self.seen_urls.update(alias["url"] for alias in aliases)
+                logger.info(f"Linked {len(aliases)} duplicate stories from {source.id}")
+            except Exception as e:
+                stored = False
+                counts["errors"] += len(aliases)
+                logger.error(f"Error inserting aliases from {source.id}: {str(e)}")
+            self._add_stage_time("insert", time.perf_counter() - start)
+
+        # Only remember the feed once all its articles made it to the database,
+        # so a failed run is retried in full next time
+        if stored:
+            if validator_cache:
+                validator_cache.update(source, fetched.headers, content_hash)
+            if watermarks:
+                watermarks.update(source, parsed.watermark)
+
+        return parsed
+
 
 if __name__ == "__main__":
-    import asyncio
 
     async def main() -> None:
-        parser = FeedParserService(store_json=False)
+        parser = FeedParserService(archive_feeds=False)
         result: dict[str, str | int] = await parser.parse_all_feeds()
 
         message = (
             "📰 *Feed Parser Report* 📰\n\n"
             f"✅ *Successfully Inserted:* {result['articles_inserted']}\n"
             f"⏭️ *Skipped:* {result['articles_skipped']}\n"
+            f"🔁 *Duplicate Stories:* {result['articles_duplicates']}\n"
             f"❌ *Errors:* {result['articles_errors']}\n"
-            f"📊 *Total Articles:* {result['total_articles']}\n\n"
+            f"📊 *Total Articles:* {result['total_articles']}\n"
+            f"💤 *Unchanged Feeds:* {result['feeds_unchanged']}\n"
+            f"🚧 *Skipped Failing Feeds:* {result['feeds_circuit_open']}\n\n"
         )
         print(message)
 
@@ -0,0 +1,202 @@
+import asyncio
+import heapq
+import json
+import logging
+import random
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.feed_sources import FeedSource, NewsFeedSources
+from app.services.feed_fetcher import FeedFetcher
+from app.services.feed_parser import FeedParserService
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+MIN_INTERVAL_SECONDS = 5 * 60
+MAX_INTERVAL_SECONDS = 6 * 3600
+DEFAULT_INTERVAL_SECONDS = 3600
+
+
+def estimate_interval(
+    published_timestamps: Sequence[float],
+    previous_interval: float,
+    items_per_poll: float = 2.0,
+    smoothing: float = 0.5,
+    min_interval: float = MIN_INTERVAL_SECONDS,
+    max_interval: float = MAX_INTERVAL_SECONDS,
+) -> float:
+    """Next poll interval for a source from the publish times in its feed.
+
+    Aims for roughly `items_per_poll` new items per poll, blended with the
+    previous interval so one unusual poll does not swing the schedule.
+    """
+    timestamps = sorted(published_timestamps)
+    if len(timestamps) < 2 or timestamps[-1] <= timestamps[0]:
+        # Can't tell the rate, back off gently
+        target = previous_interval * 1.5
+    else:
+        mean_gap = (timestamps[-1] - timestamps[0]) / (len(timestamps) - 1)
+        target = mean_gap * items_per_poll
+
+    interval = smoothing * previous_interval + (1 - smoothing) * target
+    return min(max(interval, min_interval), max_interval)
+
+
+class FeedScheduler:
+    """Long running alternative to the hourly cron job.
+
+    Each source is polled on its own interval, learned from the publish times
+    in its feed: busy feeds are polled more often and quiet ones less often.
+    Polls are kept in a priority queue ordered by due time, with jitter so
+    sources sharing a host spread out, and at most `max_concurrent_polls`
+    run at once.
+
+    If `owns` is given, only the sources it returns True for are polled, the
+    others are checked again every `unowned_recheck` seconds. This is how a
+    FeedShardWorker polls just the sources in its shards.
+    """
+
+    def __init__(
+        self,
+        service: FeedParserService,
+        sources: Optional[List[FeedSource]] = None,
+        max_concurrent_polls: int = 5,
+        jitter: float = 0.1,
+        initial_spread: float = 60,
+        state_path: Path = Path("data") / "feed_schedule.json",
+        owns: Optional[Callable[[FeedSource], bool]] = None,
+        unowned_recheck: float = 60,
+    ) -> None:
+        self.service = service
+        self.sources = sources or service.sources or NewsFeedSources.get_all_sources()
+        self.max_concurrent_polls = max_concurrent_polls
+        self.jitter = jitter
+        self.initial_spread = initial_spread
+        self.state_path = state_path
+        self.owns = owns
+        self.unowned_recheck = unowned_recheck
+        self.intervals: Dict[str, float] = self._load_intervals()
+        self.counts = {
+            "total": 0,
+            "inserted": 0,
+            "skipped": 0,
+            "duplicates": 0,
+            "errors": 0,
+            "unchanged": 0,
+            "circuit_open": 0,
+        }
+        self._queue: List[Tuple[float, int, FeedSource]] = []
+        self._sequence = 0
+
+    def _load_intervals(self) -> Dict[str, float]:
+        if not self.state_path.exists():
+            return {}
+        try:
+            return json.loads(self.state_path.read_text(encoding="utf-8"))
+        except Exception as e:
+            logger.error(f"Error loading feed schedule {self.state_path}: {str(e)}")
+            return {}
+
+    def _save_intervals(self) -> None:
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        self.state_path.write_text(json.dumps(self.intervals), encoding="utf-8")
+
+    def _schedule(self, source: FeedSource, delay: float) -> None:
+        jittered = delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+        due = asyncio.get_running_loop().time() + jittered
+        # The sequence number keeps ordering stable for sources due at the same time
+        self._sequence += 1
+        heapq.heappush(self._queue, (due, self._sequence, source))
+
+    async def _poll(
+        self, fetcher: FeedFetcher, source: FeedSource, limit: asyncio.Semaphore
+    ) -> None:
+        previous = self.intervals.get(source.id, DEFAULT_INTERVAL_SECONDS)
+        try:
+            parsed = await self.service.ingest_source(fetcher, source, self.counts)
+            await self.service.fetch_inserted_content()
+            timestamps = parsed.published_timestamps if parsed else []
+            interval = estimate_interval(timestamps, previous)
+        except Exception as e:
+            logger.error(f"Error polling {source.id}: {str(e)}", exc_info=True)
+            interval = previous
+        finally:
+            limit.release()
+
+        self.intervals[source.id] = interval
+        logger.info(f"Next poll of {source.id} in {interval / 60:.1f} minutes")
+        self._schedule(source, interval)
+
+    async def run(
+        self, stop: Optional[asyncio.Event] = None, save_every: float = 300
+    ) -> None:
+        """Poll sources until `stop` is set.
+
+        Args:
+            stop: Event to stop the scheduler, runs forever if not given
+            save_every: Seconds between saves of the local caches and intervals
+        """
+        stop = stop or asyncio.Event()
+        limit = asyncio.Semaphore(self.max_concurrent_polls)
+        loop = asyncio.get_running_loop()
+        tasks: set[asyncio.Task] = set()
+
+        # Spread the first round of polls so they don't all start at once
+        for source in self.sources:
+            self._schedule(source, random.uniform(0, self.initial_spread))
+
+        await self.service.start()
+        next_save = loop.time() + save_every
+        try:
+            async with FeedFetcher(
+                max_concurrency=self.service.max_concurrency,
+                max_per_host=self.service.max_per_host,
+            ) as fetcher:
+                while not stop.is_set():
+                    now = loop.time()
+                    if now >= next_save:
+                        self.service.save_state()
+                        self._save_intervals()
+                        next_save = now + save_every
+
+                    # The queue is briefly empty while every source is being polled
+                    due = self._queue[0][0] if self._queue else now + 1
+                    if due > now:
+                        # Wake up at least every 30s, polls finishing may have
+                        # queued a source that is due sooner
+                        try:
+                            await asyncio.wait_for(
+                                stop.wait(), timeout=min(due, next_save, now + 30) - now
+                            )
+                        except asyncio.TimeoutError:
+                            pass
+                        continue
+
+                    await limit.acquire()
+                    _, _, source = heapq.heappop(self._queue)
+                    if self.owns is not None and not self.owns(source):
+                        limit.release()
+                        self._schedule(source, self.unowned_recheck)
+                        continue
+                    task = asyncio.create_task(self._poll(fetcher, source, limit))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+
+                await asyncio.gather(*tasks)
+        finally:
+            await self.service.stop()
+            self._save_intervals()
+            logger.info(f"Feed scheduler stopped: {self.counts}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    async def main() -> None:
+        scheduler = FeedScheduler(FeedParserService())
+        await scheduler.run()
+
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+import hashlib
+
+
+def jump_consistent_hash(key: int, num_buckets: int) -> int:
+    """Bucket for a 64-bit key, from Lamping and Veach's jump consistent hash.
+
+    Growing from n to n + 1 buckets only moves 1/(n + 1) of the keys, all of
+    them into the new bucket.
+    """
+    if num_buckets < 1:
+        raise ValueError("num_buckets must be at least 1")
+    bucket, j = -1, 0
+    while j < num_buckets:
+        bucket = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_for(source_id: str, num_shards: int) -> int:
+    """Logical shard of a feed source, the same in every process and host."""
+    # hash() is salted per process, so it can't be shared between workers
+    key = int.from_bytes(
+        hashlib.blake2b(source_id.encode("utf-8"), digest_size=8).digest(), "little"
+    )
+    return jump_consistent_hash(key, num_shards)
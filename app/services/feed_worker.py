@@ -0,0 +1,135 @@
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from pathlib import Path
+from typing import FrozenSet, List, Optional
+
+from app.db import Database
+from app.feed_sources import FeedSource
+from app.services.feed_parser import FeedParserService
+from app.services.feed_scheduler import FeedScheduler
+from app.services.feed_sharding import shard_for
+from dotenv import load_dotenv
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+
+DEFAULT_NUM_SHARDS = 64
+
+
+class FeedShardWorker:
+    """One of several processes or hosts sharing the feed sources.
+
+    Sources are mapped onto `num_shards` logical shards by a consistent hash of
+    their id. Each worker leases a fair share of the shards in Postgres (see
+    the claim_feed_shards function) and runs a FeedScheduler that only polls
+    the sources in its shards. Leases are renewed every third of
+    `lease_seconds`. When a worker dies its leases run out and the remaining
+    workers take over its shards, and when a worker joins the others hand
+    over the shards beyond their new fair share.
+    """
+
+    def __init__(
+        self,
+        service: FeedParserService,
+        num_shards: int = DEFAULT_NUM_SHARDS,
+        worker_id: Optional[str] = None,
+        lease_seconds: int = 300,
+        sources: Optional[List[FeedSource]] = None,
+    ) -> None:
+        self.service = service
+        self.db: Database = service.db
+        self.num_shards = num_shards
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.shards: FrozenSet[int] = frozenset()
+        self._lease_expires = 0.0
+        self.scheduler = FeedScheduler(
+            service,
+            sources=sources,
+            state_path=service.data_dir / "feed_schedule.json",
+            owns=self.owns,
+        )
+
+    def owns(self, source: FeedSource) -> bool:
+        """Whether this worker currently holds the lease for a source's shard."""
+        # Stop polling once the lease may have been taken over by another worker
+        if asyncio.get_running_loop().time() >= self._lease_expires:
+            return False
+        return shard_for(source.id, self.num_shards) in self.shards
+
+    async def renew(self) -> None:
+        """Renew this worker's leases and claim its fair share of free shards."""
+        requested_at = asyncio.get_running_loop().time()
+        shards = frozenset(
+            await self.db.claim_feed_shards(
+                self.worker_id, self.num_shards, self.lease_seconds
+            )
+        )
+        if shards != self.shards:
+            logger.info(
+                f"Worker {self.worker_id} now owns {len(shards)} of {self.num_shards} "
+                f"shards: {sorted(shards)}"
+            )
+        self.shards = shards
+        self._lease_expires = requested_at + self.lease_seconds
+
+    async def _renew_until(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.lease_seconds / 3)
+            except asyncio.TimeoutError:
+                pass
+            if stop.is_set():
+                break
+            try:
+                await self.renew()
+            except Exception as e:
+                # Keep polling until the current leases run out, see owns
+                logger.error(f"Error renewing shard leases: {str(e)}")
+
+    async def run(self, stop: Optional[asyncio.Event] = None) -> None:
+        """Poll the sources in this worker's shards until `stop` is set."""
+        stop = stop or asyncio.Event()
+        await self.renew()
+        renewer = asyncio.create_task(self._renew_until(stop))
+        try:
+            await self.scheduler.run(stop)
+        finally:
+            stop.set()
+            await renewer
+            try:
+                await self.db.release_feed_shards(self.worker_id)
+            except Exception as e:
+                logger.error(f"Error releasing shard leases: {str(e)}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Run a sharded feed ingestion worker")
+    parser.add_argument("--shards", type=int, default=DEFAULT_NUM_SHARDS)
+    parser.add_argument(
+        "--worker-id",
+        default=None,
+        help="Stable id for this worker, defaults to <hostname>-<pid>",
+    )
+    parser.add_argument("--lease-seconds", type=int, default=300)
+    args = parser.parse_args()
+
+    async def main() -> None:
+        worker_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        # Each worker keeps its own local caches, so several can share a host
+        service = FeedParserService(data_dir=Path("data") / "workers" / worker_id)
+        worker = FeedShardWorker(
+            service,
+            num_shards=args.shards,
+            worker_id=worker_id,
+            lease_seconds=args.lease_seconds,
+        )
+        await worker.run()
+
+    asyncio.run(main())
@@ -1,11 +1,13 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 import asyncio
 import time
 from collections import deque
 
 from app.db import Database
-from app.graph.graph import run_graph, InputState
+from app.llm.usage import llm_metrics
+from app.services.analysis_cache import analysis_cache
+from app.graph.graph import analysis_batch_size, run_batch, run_graph, InputState
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
@@ -19,14 +21,28 @@ MAX_RUN_TIME_HOURS = 8
 
 
 class SentimentAnalysisService:
-    def __init__(self, batch_size: int = 100):
+    def __init__(
+        self,
+        batch_size: int = 100,
+        concurrency: int = 10,
+        db: Optional[Database] = None,
+        store_metrics: bool = False,
+    ):
         """Initialize service with configurable batch size.
 
         Args:
             batch_size: Number of articles to process in one batch (default: 10)
+            concurrency: Maximum number of articles analysed at the same time
+                by run_sentiment_analysis, each making 4 LLM calls at once
+            db: Database to read articles from and save results to
+            store_metrics: Also store the tokens, latency and cost of each
+                article's LLM calls in version_info. They are always appended
+                to data/llm_calls.ndjson
         """
-        self.db = Database()
+        self.db = db or Database()
         self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.store_metrics = store_metrics
 
     async def process_article(self, article: Dict[str, Any]) -> bool:
         """Process a single article through the sentiment analysis graph.
@@ -44,7 +60,7 @@ class SentimentAnalysisService:
                 "news_article_id": article["id"],
             }
 
-            await run_graph(input_state)
+            await run_graph(input_state, self.db, self.store_metrics)
             logger.info(f"Successfully processed article {article['id']}")
             return True
 
@@ -54,15 +70,48 @@ class SentimentAnalysisService:
             )
             return False
 
+    async def process_articles_batch(
+        self, articles: List[Dict[str, Any]]
+    ) -> List[bool]:
+        """Process several articles with batched prompts, see run_batch.
+
+        Args:
+            articles: Article data from database
+
+        Returns:
+            List[bool]: Whether each article was processed successfully
+        """
+        try:
+            inputs: List[InputState] = [
+                {
+                    "headline": article["title"],
+                    "description": article["description"],
+                    "news_article_id": article["id"],
+                }
+                for article in articles
+            ]
+            return await run_batch(inputs, self.db, self.store_metrics)
+
+        except Exception as e:
+            logger.error(
+                f"Error processing batch of {len(articles)} articles: {str(e)}",
+                exc_info=True,
+            )
+            return [False] * len(articles)
+
     async def run_sentiment_analysis(self) -> Dict[str, int]:
         """Run sentiment analysis on articles without sentiment, with no rate limiting.
 
+        Up to `concurrency` articles, or batches of articles if the prompt config
+        sets a batch_size, are processed at the same time.
+
         Returns:
             Dict with summary statistics of the processing run
         """
         logger.info(
             f"Starting sentiment analysis run with batch size {self.batch_size}"
         )
+        llm_metrics.reset()
 
         try:
             articles: List[
@@ -78,25 +127,39 @@ class SentimentAnalysisService:
             successful_count = 0
             failed_count = 0
             total_processed = 0
-
-            for article in articles:
-                success = await self.process_article(article)
-                total_processed += 1
-                logger.info(f"PROCESSED {total_processed} of {len(articles)}")
-                if success:
-                    logger.info(
-                        f"Successfully processed article {article['id']}: {article['title']}"
-                    )
-                    successful_count += 1
-                else:
-                    logger.error(
-                        f"Failed to process article {article['id']}: {article['title']}"
-                    )
-                    failed_count += 1
-
-                if total_processed >= self.batch_size:
-                    logger.info(f"Stopping as max limit reached of {self.batch_size}")
-                    break
+            limit = asyncio.Semaphore(self.concurrency)
+
+            async def process(group: List[Dict[str, Any]]) -> None:
+                nonlocal successful_count, failed_count, total_processed
+                async with limit:
+                    if len(group) == 1:
+                        successes = [await self.process_article(group[0])]
+                    else:
+                        successes = await self.process_articles_batch(group)
+                for article, success in zip(group, successes):
+                    total_processed += 1
+                    logger.info(f"PROCESSED {total_processed} of {len(articles)}")
+                    if success:
+                        logger.info(
+                            f"Successfully processed article {article['id']}: {article['title']}"
+                        )
+                        successful_count += 1
+                    else:
+                        logger.error(
+                            f"Failed to process article {article['id']}: {article['title']}"
+                        )
+                        failed_count += 1
+
+            articles = articles[: self.batch_size]
+            group_size = analysis_batch_size()
+            await asyncio.gather(
+                *(
+                    process(articles[start : start + group_size])
+                    for start in range(0, len(articles), group_size)
+                )
+            )
+            logger.info(f"Analysis cache: {analysis_cache.stats()}")
+            self._log_metrics(successful_count)
 
             return {
                 "total_articles": len(articles),
@@ -122,6 +185,7 @@ class SentimentAnalysisService:
         logger.info(
             f"Starting rate-limited sentiment analysis run with batch size {self.batch_size}"
         )
+        llm_metrics.reset()
 
         try:
             start_time = time.time()
@@ -187,6 +251,7 @@ class SentimentAnalysisService:
                     logger.info(f"Stopping as max limit reached of {self.batch_size}")
                     break
 
+            self._log_metrics(successful_count)
             return {
                 "total_articles": len(articles),
                 "successful": successful_count,
@@ -197,6 +262,10 @@ class SentimentAnalysisService:
             logger.error(f"Error in sentiment analysis run: {str(e)}", exc_info=True)
             raise
 
+    def _log_metrics(self, articles: int) -> None:
+        llm_metrics.flush()
+        logger.info(f"LLM calls: {llm_metrics.summary(articles)}")
+
 
 if __name__ == "__main__":
 
@@ -206,12 +275,22 @@ if __name__ == "__main__":
         result = await service.run_sentiment_analysis()
         run_duration = int(time.time() - start_time)
         duration_str = f"{run_duration // 60}m {run_duration % 60}s"
+        metrics = llm_metrics.summary(result["successful"])
 
         message = (
             "🤖 *Sentiment Analysis Report* 🤖\n\n"
             f"📊 *Articles:* {result['total_articles']}\n"
             f"✅ *Successfully Processed:* {result['successful']}\n"
             f"❌ *Failed:* {result['failed']}\n"
+            f"💾 *Cache Hits:* {analysis_cache.hits + analysis_cache.shared}\n"
+            f"🧊 *Cached Input Tokens:* {llm_metrics.usage.cache_read_tokens} of "
+            f"{llm_metrics.usage.input_tokens}\n"
+            f"📞 *LLM Calls:* {int(metrics['calls'])} "
+            f"({int(metrics['retries'])} retries, {int(metrics['failures'])} failed)\n"
+            f"⏳ *Latency p50/p95:* {metrics['p50_latency']:.2f}s / "
+            f"{metrics['p95_latency']:.2f}s\n"
+            f"💵 *Cost:* ${metrics['cost']:.4f} "
+            f"(${metrics['cost_per_1k_articles']:.2f} per 1k articles)\n"
             f"⏱ *Duration:* {duration_str}\n"
         )
         logger.info(message)
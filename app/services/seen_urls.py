@@ -0,0 +1,104 @@
+import hashlib
+import json
+import logging
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Iterable, Set
+
+from app.db import Database
+
+logger = logging.getLogger(__name__)
+
+
+def hash_url(url: str) -> int:
+    """64-bit hash of a URL, collisions are negligible at our table sizes."""
+    return int.from_bytes(
+        hashlib.blake2b(url.strip().encode("utf-8"), digest_size=8).digest(), "little"
+    )
+
+
+class SeenUrlIndex:
+    """Compact local set of the URLs already in news_articles.
+
+    URLs are stored as a sorted array of 64-bit hashes (8 bytes per URL) plus
+    a small set of hashes added since the last save. The snapshot remembers the
+    highest article id it has seen, so syncing on startup only reads new rows.
+    """
+
+    def __init__(self, path: Path = Path("data") / "seen_urls.bin") -> None:
+        self.path = path
+        self.meta_path = path.with_suffix(".json")
+        self.last_article_id = 0
+        self._hashes: array = array("Q")
+        self._recent: Set[int] = set()
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._hashes) + len(self._recent)
+
+    def __contains__(self, url: str) -> bool:
+        key = hash_url(url)
+        if key in self._recent:
+            return True
+        i = bisect_left(self._hashes, key)
+        return i < len(self._hashes) and self._hashes[i] == key
+
+    def add(self, url: str) -> None:
+        if url not in self:
+            self._recent.add(hash_url(url))
+
+    def update(self, urls: Iterable[str]) -> None:
+        for url in urls:
+            self.add(url)
+
+    def _compact(self) -> None:
+        if self._recent:
+            self._hashes = array("Q", sorted([*self._hashes, *self._recent]))
+            self._recent = set()
+
+    def load(self) -> None:
+        if not self.path.exists() or not self.meta_path.exists():
+            return
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            hashes = array("Q")
+            hashes.frombytes(self.path.read_bytes())
+            self._hashes = hashes
+            self.last_article_id = int(meta.get("last_article_id", 0))
+        except Exception as e:
+            logger.error(f"Error loading seen URL index {self.path}: {str(e)}")
+            self._hashes = array("Q")
+            self.last_article_id = 0
+
+    def save(self) -> None:
+        self._compact()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_bytes(self._hashes.tobytes())
+        tmp_path.replace(self.path)
+        self.meta_path.write_text(
+            json.dumps(
+                {"last_article_id": self.last_article_id, "count": len(self._hashes)}
+            ),
+            encoding="utf-8",
+        )
+
+    async def sync(self, db: Database, page_size: int = 1000) -> int:
+        """Add the URLs of articles inserted since the last sync, returns how many."""
+        added = 0
+        while True:
+            rows = await db.get_article_urls(
+                after_id=self.last_article_id, limit=page_size
+            )
+            for row in rows:
+                self.add(row["url"])
+            added += len(rows)
+            if rows:
+                self.last_article_id = max(row["id"] for row in rows)
+            if len(rows) < page_size:
+                break
+
+        self._compact()
+        logger.info(f"Seen URL index synced, {added} new URLs, {len(self)} in total")
+        return added
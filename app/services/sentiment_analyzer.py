@@ -1,9 +1,17 @@
 import asyncio
+from langchain_core.messages import BaseMessage
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import Any, Dict, List, Literal, Optional
 from app.config.prompt_config import PromptConfig, prompt_config
 from app.llm.llm import create_llm
+from app.llm.prompt_prefix import cached_prefix_prompt
+from app.services.analysis_cache import analysis_cache
+from app.services.batch_analysis import (
+    analyze_in_batches,
+    batch_prompt,
+    batch_response_model,
+)
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,6 +32,10 @@ class HeadlineSentiment(BaseModel):
 
 
 class SentimentAnalyzer:
+    # Name of the prompt in PromptsConfig, also keys the shared instance
+    PROMPT_NAME = "headline_sentiment"
+    RESPONSE_MODEL = HeadlineSentiment
+
     def __init__(self) -> None:
         # Load prompts if not already loaded
         if prompt_config.headline_sentiment.content is None:
@@ -32,8 +44,13 @@ class SentimentAnalyzer:
         if prompt_config.headline_sentiment.content is None:
             raise ValueError("Headline sentiment prompt is not loaded")
 
-        self.sentiment_prompt: ChatPromptTemplate = ChatPromptTemplate.from_template(
-            prompt_config.headline_sentiment.content
+        # Static parts of the prompt, rendered once per prompt version
+        self.static_inputs = {"categories": SENTIMENT_CATEGORIES}
+
+        self.sentiment_prompt: ChatPromptTemplate = cached_prefix_prompt(
+            prompt_config.headline_sentiment.content,
+            self.static_inputs,
+            prompt_config.headline_sentiment.model,
         )
 
         self.sentiment_analyzer = create_llm(
@@ -44,15 +61,64 @@ class SentimentAnalyzer:
 
         self.sentiment_chain = self.sentiment_prompt | self.sentiment_analyzer
 
+        self.sentiment_batch_chain = batch_prompt(
+            prompt_config.headline_sentiment.content,
+            self.static_inputs,
+            prompt_config.headline_sentiment.model,
+        ) | create_llm(
+            model=prompt_config.headline_sentiment.model,
+            temperature=prompt_config.headline_sentiment.temperature,
+            response_model=batch_response_model(HeadlineSentiment),
+        )
+
     async def analyze_headline(
         self, headline: str
     ) -> tuple[HeadlineSentiment, PromptConfig]:
         """Analyze the sentiment of a single headline"""
-        result = self.sentiment_chain.invoke(
-            {"headline": headline, "categories": SENTIMENT_CATEGORIES}
+        result = await analysis_cache.get_or_compute(
+            prompt_config.headline_sentiment,
+            HeadlineSentiment,
+            {"headline": headline},
+            lambda: self.sentiment_chain.ainvoke(self.prompt_inputs(headline)),
+            self.static_inputs,
         )
 
-        return HeadlineSentiment.model_validate(
-            result
-        ), prompt_config.headline_sentiment
+        return self.validate_result(result), prompt_config.headline_sentiment
+
+    async def analyze_headlines(
+        self, headlines: List[str]
+    ) -> tuple[List[Optional[HeadlineSentiment]], PromptConfig]:
+        """Analyze the sentiment of several headlines, batch_size per request.
+
+        Headlines whose analysis failed twice are None.
+        """
+
+        async def analyze_one(item: dict[str, str]) -> HeadlineSentiment:
+            result, _ = await self.analyze_headline(item["headline"])
+            return result
+
+        results = await analyze_in_batches(
+            prompt_config.headline_sentiment,
+            [{"headline": headline} for headline in headlines],
+            self.sentiment_batch_chain,
+            HeadlineSentiment,
+            analyze_one,
+            prompt_config.headline_sentiment.batch_size,
+            self.static_inputs,
+        )
+        return results, prompt_config.headline_sentiment
+
+    def prompt_inputs(
+        self, headline: str, description: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Template values of the prompt for a single headline"""
+        return {"headline": headline}
+
+    def format_messages(
+        self, headline: str, description: Optional[str] = None
+    ) -> List[BaseMessage]:
+        """The prompt for a single headline, as sent to the model"""
+        return self.sentiment_prompt.format_messages(**self.prompt_inputs(headline))
 
+    def validate_result(self, result: Any) -> HeadlineSentiment:
+        return HeadlineSentiment.model_validate(result)
@@ -0,0 +1,131 @@
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.services.feed_normalizer import ArticleRecord
+from app.utils.url_mods import canonicalize_url, title_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_AGE_SECONDS = 7 * 24 * 3600
+DEFAULT_TITLE_WINDOW_SECONDS = 24 * 3600
+
+# URL of the first article of a story, when it was added and published
+Story = Tuple[str, float, Optional[float]]
+
+
+def _published_at(article: ArticleRecord) -> Optional[float]:
+    try:
+        published = datetime.fromisoformat(article.publish_date)
+    except (TypeError, ValueError):
+        return None
+    if published.tzinfo is None:
+        # Normalized dates are naive UTC
+        published = published.replace(tzinfo=timezone.utc)
+    return published.timestamp()
+
+
+class StoryIndex:
+    """Local index of recently ingested stories, used to spot the same story
+    published in several feeds.
+
+    Each story is keyed by its canonical URL and by a fingerprint of its
+    headline, and maps to the URL of the first article ingested for it. Entries
+    older than `max_age` are dropped on save, as syndicated copies of a story
+    show up within hours of each other.
+
+    Headlines recur ("Lotto results", "Your horoscope for today"), so a match
+    on the headline alone only counts when the two articles were published
+    within `title_window` of each other.
+    """
+
+    def __init__(
+        self,
+        path: Path = Path("data") / "story_index.json",
+        max_age: float = DEFAULT_MAX_AGE_SECONDS,
+        title_window: float = DEFAULT_TITLE_WINDOW_SECONDS,
+    ) -> None:
+        self.path = path
+        self.max_age = max_age
+        self.title_window = title_window
+        self._stories: Dict[str, Story] = {}
+        self.load()
+
+    def __len__(self) -> int:
+        return len(self._stories)
+
+    @staticmethod
+    def _keys(article: ArticleRecord) -> List[str]:
+        keys = [f"url:{canonicalize_url(article.url)}"]
+        fingerprint = title_fingerprint(article.title)
+        if fingerprint:
+            keys.append(f"title:{fingerprint}")
+        return keys
+
+    def _same_time(self, published: Optional[float], story: Story) -> bool:
+        """Whether an article and a story were published close enough for a
+        headline match, using the time they were seen if the date is unknown."""
+        story_published = story[2] if story[2] is not None else story[1]
+        published = published if published is not None else time.time()
+        return abs(published - story_published) <= self.title_window
+
+    def match(self, article: ArticleRecord) -> Optional[str]:
+        """URL of an already ingested article for the same story, if any.
+
+        An article that matches itself, e.g. the same URL listed in two feeds,
+        is not a duplicate story and returns None.
+        """
+        published = _published_at(article)
+        for key in self._keys(article):
+            story = self._stories.get(key)
+            if not story or story[0] == article.url:
+                continue
+            if key.startswith("title:") and not self._same_time(published, story):
+                continue
+            return story[0]
+        return None
+
+    def add(self, article: ArticleRecord) -> None:
+        story: Story = (article.url, time.time(), _published_at(article))
+        for key in self._keys(article):
+            existing = self._stories.get(key)
+            # A recurring headline points to its latest story
+            if existing is None or (
+                key.startswith("title:") and not self._same_time(story[2], existing)
+            ):
+                self._stories[key] = story
+
+    def discard(self, articles: Iterable[ArticleRecord]) -> None:
+        """Forget articles that were added but never made it to the database."""
+        for article in articles:
+            for key in self._keys(article):
+                story = self._stories.get(key)
+                if story and story[0] == article.url:
+                    del self._stories[key]
+
+    def load(self) -> None:
+        if not self.path.exists():
+            return
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            # Indexes saved before publish times were kept have pairs
+            self._stories = {
+                key: (story[0], story[1], story[2] if len(story) > 2 else None)
+                for key, story in data.items()
+            }
+        except Exception as e:
+            logger.error(f"Error loading story index {self.path}: {str(e)}")
+            self._stories = {}
+
+    def save(self) -> None:
+        cutoff = time.time() - self.max_age
+        self._stories = {
+            key: story for key, story in self._stories.items() if story[1] >= cutoff
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self._stories), encoding="utf-8")
+        tmp_path.replace(self.path)
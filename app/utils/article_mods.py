@@ -0,0 +1,138 @@
+from dataclasses import dataclass
+from typing import List, Optional
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+
+# Page furniture that is never part of the article text
+_NOISE_TAGS = [
+    "script",
+    "style",
+    "noscript",
+    "template",
+    "svg",
+    "iframe",
+    "form",
+    "button",
+    "nav",
+    "header",
+    "footer",
+    "aside",
+    "figure",
+]
+_BLOCK_TAGS = ["h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "blockquote", "pre"]
+
+
+@dataclass
+class ExtractedArticle:
+    """Main text of an article page, as plain text, markdown and cleaned HTML"""
+
+    content: str
+    markdown_content: str
+    html_content: str
+
+
+def _text(element: Tag) -> str:
+    return " ".join(element.get_text(" ").split())
+
+
+def _inline_markdown(element: Tag) -> str:
+    parts: List[str] = []
+    for child in element.children:
+        if isinstance(child, NavigableString):
+            parts.append(str(child))
+        elif isinstance(child, Tag):
+            text = _inline_markdown(child)
+            if not text.strip():
+                continue
+            if child.name == "a" and child.get("href", "").startswith("http"):
+                parts.append(f"[{text.strip()}]({child['href']})")
+            elif child.name in ("strong", "b"):
+                parts.append(f"**{text.strip()}**")
+            elif child.name in ("em", "i"):
+                parts.append(f"*{text.strip()}*")
+            else:
+                parts.append(text)
+    return " ".join("".join(parts).split())
+
+
+def _main_element(soup: BeautifulSoup) -> Optional[Tag]:
+    """The element holding the article body.
+
+    Uses <article> or an articleBody/<main> element if the page has one,
+    otherwise the parent of the most paragraph text.
+    """
+    candidates = soup.find_all("article") or soup.select(
+        '[itemprop="articleBody"], main'
+    )
+    if candidates:
+        return max(
+            candidates, key=lambda el: sum(len(_text(p)) for p in el.find_all("p"))
+        )
+
+    scores: dict[int, int] = {}
+    parents: dict[int, Tag] = {}
+    for paragraph in soup.find_all("p"):
+        parent = paragraph.parent
+        if parent is None:
+            continue
+        scores[id(parent)] = scores.get(id(parent), 0) + len(_text(paragraph))
+        parents[id(parent)] = parent
+    if not scores:
+        return None
+    return parents[max(scores, key=lambda key: scores[key])]
+
+
+def extract_article(
+    html: str | bytes, min_length: int = 200
+) -> Optional[ExtractedArticle]:
+    """Extract the main text of an article page.
+
+    This is a plain module level function so it can run in a process pool.
+
+    Args:
+        html: Raw HTML of the page, bytes are decoded using the charset the
+            page declares
+        min_length: Pages with less body text than this are not articles, e.g.
+            galleries, videos or consent walls
+
+    Returns:
+        The extracted article, or None if no article body was found
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    for element in soup(_NOISE_TAGS):
+        element.decompose()
+
+    main = _main_element(soup)
+    if main is None:
+        return None
+
+    paragraphs: List[str] = []
+    markdown: List[str] = []
+    for block in main.find_all(_BLOCK_TAGS):
+        # Only the outermost block, e.g. a <p> inside an <li> is part of the <li>
+        if block.find_parent(_BLOCK_TAGS):
+            continue
+        text = _text(block)
+        if not text:
+            continue
+        paragraphs.append(text)
+        inline = _inline_markdown(block)
+        if block.name.startswith("h"):
+            markdown.append(f"{'#' * int(block.name[1])} {inline}")
+        elif block.name == "li":
+            markdown.append(f"- {inline}")
+        elif block.name == "blockquote":
+            markdown.append(f"> {inline}")
+        elif block.name == "pre":
+            markdown.append(f"```\n{block.get_text()}\n```")
+        else:
+            markdown.append(inline)
+
+    content = "\n\n".join(paragraphs)
+    if len(content) < min_length:
+        return None
+    return ExtractedArticle(
+        content=content,
+        markdown_content="\n\n".join(markdown),
+        html_content=str(main),
+    )
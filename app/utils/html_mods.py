@@ -1,21 +1,59 @@
+import re
+from html import unescape
+from html.entities import html5
 from typing import Optional
 from bs4 import BeautifulSoup
 
+# A start or end tag with optional attributes, quoted values may contain ">"
+_TAG_RE = re.compile(
+    r"""</?[a-zA-Z][^\s/>]*(?:\s+[^\s"'=/>]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s"'>]+))?)*\s*/?>"""
+)
+# Markup the fast path does not handle: script/style bodies, comments, CDATA,
+# doctypes and processing instructions
+_COMPLEX_RE = re.compile(r"<(?:script|style|!|\?)", re.IGNORECASE)
+_ENTITY_RE = re.compile(r"&(?:#(\d+)|#[xX]([0-9a-fA-F]+)|([a-zA-Z][a-zA-Z0-9]*));")
 
-def strip_html(text: Optional[str]) -> Optional[str]:
-    """
-    Remove HTML tags and decode entities from text safely.
-    Returns None if input is None or empty after cleaning.
 
-    Args:
-        text: Optional string that may contain HTML
+def _has_only_simple_entities(text: str) -> bool:
+    """Check every "&" starts a well formed entity that html.unescape and the
+    HTML parser decode the same way."""
+    if text.count("&") != len(_ENTITY_RE.findall(text)):
+        return False
+    for match in _ENTITY_RE.finditer(text):
+        decimal, hexadecimal, name = match.groups()
+        if name is not None:
+            if f"{name};" not in html5:
+                return False
+            continue
+        code = int(decimal) if decimal is not None else int(hexadecimal, 16)
+        # Control, windows-1252 remapped, surrogate and out of range code points
+        # are decoded differently, leave them to the full parser
+        if code < 32 or 127 <= code < 160 or 0xD800 <= code <= 0xDFFF:
+            return False
+        if code > 0x10FFFF:
+            return False
+    return True
 
-    Returns:
-        Cleaned text with HTML removed or None if no text content
+
+def _strip_html_fast(text: str) -> Optional[str]:
+    """Strip plain text or simple markup without building a tree.
+
+    Returns None if the text needs the full HTML parser.
     """
-    if not text:
+    if "&" in text and not _has_only_simple_entities(text):
         return None
+    if "<" in text:
+        if _COMPLEX_RE.search(text):
+            return None
+        text = _TAG_RE.sub("", text)
+        if "<" in text:
+            return None
+    if "&" in text:
+        text = unescape(text)
+    return " ".join(text.split())
+
 
+def _strip_html_with_parser(text: str) -> Optional[str]:
     try:
         # Parse with 'html.parser' which is more lenient with malformed HTML
         soup = BeautifulSoup(text, "html.parser")
@@ -31,3 +69,27 @@ def strip_html(text: Optional[str]) -> Optional[str]:
     except Exception:
         # Return None if any parsing errors occur
         return None
+
+
+def strip_html(text: Optional[str]) -> Optional[str]:
+    """
+    Remove HTML tags and decode entities from text safely.
+    Returns None if input is None or empty after cleaning.
+
+    Plain text and simple markup are cleaned with regular expressions, only
+    complex HTML (scripts, comments, malformed tags, unusual entities) is
+    handed to BeautifulSoup. Both paths produce the same output.
+
+    Args:
+        text: Optional string that may contain HTML
+
+    Returns:
+        Cleaned text with HTML removed or None if no text content
+    """
+    if not text:
+        return None
+
+    clean_text = _strip_html_fast(text)
+    if clean_text is None:
+        return _strip_html_with_parser(text)
+    return clean_text if clean_text else None
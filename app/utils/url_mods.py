@@ -0,0 +1,74 @@
+import hashlib
+import re
+import unicodedata
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query parameters that only track where a click came from
+TRACKING_PARAMS = {
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "mc_cid",
+    "mc_eid",
+    "ocid",
+    "cmpid",
+    "ito",
+    "icid",
+    "ref",
+    "at_medium",
+    "at_campaign",
+    "_ga",
+    "igshid",
+}
+TRACKING_PREFIXES = ("utm_", "at_", "pk_", "ns_")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize an article URL so copies of the same page compare equal.
+
+    Lowercases the scheme and host, treats http as https, drops "www.",
+    default ports, fragments, tracking query parameters and trailing slashes,
+    and sorts the remaining query parameters.
+
+    Args:
+        url: Article URL as found in the feed
+
+    Returns:
+        The canonical form of the URL
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    path = parts.path.rstrip("/") or "/"
+    scheme = "https" if parts.scheme.lower() in ("http", "https") else parts.scheme
+
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def title_fingerprint(title: str, min_words: int = 5) -> str | None:
+    """
+    Fingerprint of a headline that ignores case, accents and punctuation.
+
+    Returns None for headlines with fewer than `min_words` words, which are too
+    generic ("Live updates", "In pictures") to identify a story.
+    """
+    normalized = unicodedata.normalize("NFKD", title.casefold())
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    words = _WORD_RE.findall(normalized)
+    if len(words) < min_words:
+        return None
+    return hashlib.blake2b(" ".join(words).encode("utf-8"), digest_size=8).hexdigest()
@@ -0,0 +1,130 @@
+"""
+Benchmark article page fetching and extraction against a local HTTP server.
+
+Synthetic article pages are written to a temporary directory, built from the
+descriptions in example_feeds/ and padded with the navigation, scripts and
+styles of a typical news page. They are served locally and run through
+ArticleContentService with an in-memory stand-in for the Database. Pages/sec,
+bytes processed and the time spent per stage are printed as JSON.
+
+    poetry run python -m scripts.benchmark_article_content --pages 200 --extract-workers 2
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import tempfile
+from html import escape
+from pathlib import Path
+from typing import Any, Dict, List
+
+import feedparser  # type: ignore
+
+from app.services.article_content import ArticleContentService
+from app.utils.html_mods import strip_html
+from scripts.benchmark_ingestion import InMemoryDatabase
+from scripts.feed_server import EXAMPLE_FEEDS_DIR, serve_feeds
+
+
+def load_paragraphs(directory: Path = EXAMPLE_FEEDS_DIR) -> List[str]:
+    paragraphs: List[str] = []
+    for path in sorted(directory.glob("*.xml")):
+        for entry in feedparser.parse(path.read_bytes().lstrip()).entries:
+            text = strip_html(entry.get("description"))
+            if text:
+                paragraphs.append(text)
+    return paragraphs
+
+
+def build_page(title: str, paragraphs: List[str], padding_kb: int) -> str:
+    """A news page with the article in <article> among typical page furniture."""
+    script = "var tracking = {};" * (padding_kb * 1024 // 32)
+    nav = "".join(f'<li><a href="/section/{i}">Section {i}</a></li>' for i in range(30))
+    body = "".join(f"<p>{escape(p)}</p>" for p in paragraphs)
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>{escape(title)}</title><style>body{{margin:0}}</style>"
+        f"<script>{script}</script></head><body>"
+        f"<header><nav><ul>{nav}</ul></nav></header>"
+        "<aside><h3>Most read</h3><p>Other stories you may like</p></aside>"
+        f"<article><h1>{escape(title)}</h1><p><strong>By Staff Reporter</strong></p>"
+        f"{body}<figure><img src='/a.jpg'><figcaption>Photo</figcaption></figure>"
+        "</article><footer><p>Copyright</p></footer>"
+        f"<script>{script}</script></body></html>"
+    )
+
+
+def write_pages(directory: Path, count: int, padding_kb: int) -> None:
+    paragraphs = load_paragraphs()
+    rng = random.Random(0)
+    for i in range(count):
+        page = build_page(
+            f"Article {i}", rng.sample(paragraphs, min(8, len(paragraphs))), padding_kb
+        )
+        (directory / f"article-{i}.html").write_text(page, encoding="utf-8")
+
+
+async def benchmark(
+    pages: int,
+    padding_kb: int,
+    extract_workers: int,
+    max_per_host: int,
+    latency: float,
+) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        write_pages(directory, pages, padding_kb)
+        with serve_feeds(directory, latency=latency) as base_url:
+            db = InMemoryDatabase()
+            db.rows = [
+                {"id": i + 1, "url": f"{base_url}/article-{i}.html", "source": "Local"}
+                for i in range(pages)
+            ]
+            service = ArticleContentService(
+                db=db,  # type: ignore[arg-type]
+                max_concurrency=max_per_host,
+                max_per_host=max_per_host,
+                min_host_interval=0.0,
+                extract_workers=extract_workers,
+            )
+            stats = await service.process_articles(list(db.rows))
+
+    return {
+        "pages": pages,
+        "extract_workers": extract_workers,
+        **{
+            key: round(value, 4) if isinstance(value, float) else value
+            for key, value in stats.items()
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument(
+        "--padding-kb", type=int, default=80, help="Script bytes per page, in KB"
+    )
+    parser.add_argument("--extract-workers", type=int, default=0)
+    parser.add_argument(
+        "--max-per-host",
+        type=int,
+        default=10,
+        help="All pages are served from one host, so this caps concurrency",
+    )
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds of latency per page"
+    )
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        benchmark(
+            args.pages,
+            args.padding_kb,
+            args.extract_workers,
+            args.max_per_host,
+            args.latency,
+        )
+    )
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,106 @@
+"""
+Check the streaming feed parser against feedparser and time both.
+
+Every feed in example_feeds/ is parsed with parse_feed using the streaming
+parser and using feedparser only, the script exits with an error if the
+ArticleRecords, publish times or watermarks differ. Feeds the streaming parser
+hands to feedparser are listed. It then reports entries/sec for both on the
+example feeds scaled up by repeating their items.
+
+    poetry run python -m scripts.benchmark_fast_parser --scale 20 --rounds 5
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List, Tuple
+
+from app.feed_sources import FeedSource
+from app.services.fast_feed_parser import try_parse_entries
+from app.services.feed_normalizer import ParsedFeed, parse_feed
+from scripts.benchmark_ingestion import scale_feed
+from scripts.feed_server import EXAMPLE_FEEDS_DIR
+
+
+def load_feeds(scale: int = 1) -> List[Tuple[FeedSource, bytes]]:
+    feeds = []
+    for path in sorted(EXAMPLE_FEEDS_DIR.glob("*.xml")):
+        content = scale_feed(path.read_text(encoding="utf-8"), scale)
+        source = FeedSource(path.stem, path.stem, path.resolve().as_uri())
+        feeds.append((source, content.encode("utf-8")))
+    return feeds
+
+
+def comparable(parsed: ParsedFeed) -> Dict[str, Any]:
+    return {
+        "articles": parsed.articles,
+        "entry_count": parsed.entry_count,
+        "published_timestamps": parsed.published_timestamps,
+        "watermark": parsed.watermark,
+        "error": parsed.error,
+    }
+
+
+def check_parity(feeds: List[Tuple[FeedSource, bytes]]) -> Tuple[List[str], List[str]]:
+    """Ids of the feeds whose output differs, and of those that fell back."""
+    mismatches, fallbacks = [], []
+    for source, content in feeds:
+        fast = parse_feed(content, {}, source, fast=True)
+        full = parse_feed(content, {}, source, fast=False)
+        if comparable(fast) != comparable(full):
+            mismatches.append(source.id)
+        if not fast.fast_parsed:
+            fallbacks.append(source.id)
+    return mismatches, fallbacks
+
+
+def time_parse(
+    feeds: List[Tuple[FeedSource, bytes]], fast: bool, rounds: int
+) -> Tuple[float, int]:
+    """Best time of `rounds` to parse and normalize all feeds, and the entry count."""
+    best, entries = float("inf"), 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        entries = sum(
+            parse_feed(content, {}, source, fast=fast).entry_count
+            for source, content in feeds
+        )
+        best = min(best, time.perf_counter() - start)
+    return best, entries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scale", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    mismatches, fallbacks = check_parity(load_feeds() + load_feeds(scale=3))
+    if mismatches:
+        for source_id in mismatches:
+            print(f"Mismatch for: {source_id}", file=sys.stderr)
+        sys.exit(1)
+
+    feeds = load_feeds(args.scale)
+    fast_feeds = [
+        (source, content)
+        for source, content in feeds
+        if try_parse_entries(content.lstrip()) is not None
+    ]
+    fast_seconds, entries = time_parse(fast_feeds, True, args.rounds)
+    full_seconds, _ = time_parse(fast_feeds, False, args.rounds)
+    print(
+        json.dumps(
+            {
+                "feeds": len(feeds),
+                "identical": True,
+                "feedparser_fallbacks": sorted(set(fallbacks)),
+                "entries": entries,
+                "streaming_entries_per_second": round(entries / fast_seconds, 1),
+                "feedparser_entries_per_second": round(entries / full_seconds, 1),
+                "speedup": round(full_seconds / fast_seconds, 2),
+            },
+            indent=2,
+        )
+    )
@@ -0,0 +1,83 @@
+"""
+Compare feed parsing throughput on the event loop thread against a process pool.
+
+Every file in example_feeds/ is parsed and normalized `--rounds` times, first
+one after the other in this process (what FeedParserService does with
+parse_workers=0) and then spread over a ProcessPoolExecutor.
+
+    poetry run python -m scripts.benchmark_feed_parsing --rounds 50 --workers 4
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Tuple
+
+from app.feed_sources import FeedSource
+from app.services.feed_normalizer import parse_feed
+from scripts.feed_server import EXAMPLE_FEEDS_DIR
+
+
+def load_feeds(directory: Path = EXAMPLE_FEEDS_DIR) -> List[Tuple[FeedSource, bytes]]:
+    return [
+        (FeedSource(path.stem, path.stem, path.resolve().as_uri()), path.read_bytes())
+        for path in sorted(directory.glob("*.xml"))
+    ]
+
+
+def count_entries(source: FeedSource, content: bytes) -> int:
+    return parse_feed(content, {}, source).entry_count
+
+
+def run_serial(feeds: List[Tuple[FeedSource, bytes]], rounds: int) -> int:
+    return sum(
+        count_entries(source, content)
+        for _ in range(rounds)
+        for source, content in feeds
+    )
+
+
+def run_pool(feeds: List[Tuple[FeedSource, bytes]], rounds: int, workers: int) -> int:
+    jobs = [feed for _ in range(rounds) for feed in feeds]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return sum(
+            executor.map(
+                count_entries,
+                [source for source, _ in jobs],
+                [content for _, content in jobs],
+                chunksize=max(1, len(jobs) // (workers * 4)),
+            )
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    feeds = load_feeds()
+    results = {}
+    for mode in ("serial", "process_pool"):
+        start = time.perf_counter()
+        if mode == "serial":
+            entries = run_serial(feeds, args.rounds)
+        else:
+            entries = run_pool(feeds, args.rounds, args.workers)
+        elapsed = time.perf_counter() - start
+        results[mode] = {
+            "entries": entries,
+            "seconds": round(elapsed, 3),
+            "entries_per_second": round(entries / elapsed, 1),
+        }
+
+    results["workers"] = args.workers
+    results["speedup"] = round(
+        results["process_pool"]["entries_per_second"]
+        / results["serial"]["entries_per_second"],
+        2,
+    )
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,235 @@
+"""
+Benchmark feed ingestion end to end against a local HTTP server.
+
+The captured feeds in example_feeds/, and synthetic copies scaled up by
+repeating their items with unique links and titles, are served locally and run
+through FeedParserService with an in-memory stand-in for the Database. Time
+spent per stage (fetch, parse, normalize, insert), entries/sec and the peak
+resident memory of the process are printed as JSON so runs can be compared for
+regressions. Scales run from smallest to largest, as the peak never goes down.
+
+    poetry run python -m scripts.benchmark_ingestion --scales 1,10,50 --rounds 3
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import tempfile
+import time
+import resource
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.db import Database
+from app.services.feed_parser import FeedParserService
+from scripts.feed_server import EXAMPLE_FEEDS_DIR, example_sources, serve_feeds
+
+_ITEM_RE = re.compile(r"<(item|entry)\b.*?</\1>", re.DOTALL)
+_RSS_LINK_RE = re.compile(r"(<link>\s*)(<!\[CDATA\[)?([^<\]]+)")
+_ATOM_LINK_RE = re.compile(r'(<link\b[^>]*?\bhref=")([^"]+)(")')
+_TITLE_END_RE = re.compile(r"(\]\]>)?</title>")
+
+
+class InMemoryDatabase:
+    """Stand-in for Database with the methods used by FeedParserService."""
+
+    def __init__(self, insert_latency: float = 0.0) -> None:
+        self.insert_latency = insert_latency
+        self.rows: List[Dict[str, Any]] = []
+        self.urls: set[str] = set()
+
+    async def insert_articles(
+        self,
+        articles: List[Dict[str, Any]],
+        already_clean: bool = False,
+        update_existing: bool = False,
+    ) -> List[Dict[str, Any]]:
+        if self.insert_latency:
+            await asyncio.sleep(self.insert_latency)
+        inserted = []
+        for article in articles:
+            row = (
+                dict(article)
+                if already_clean
+                else Database._build_article_row(**article)
+            )
+            if row["url"] in self.urls:
+                continue
+            self.urls.add(row["url"])
+            row["id"] = len(self.rows) + 1
+            self.rows.append(row)
+            inserted.append(row)
+        return inserted
+
+    async def insert_article_aliases(
+        self, aliases: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        return aliases
+
+    async def update_article_contents(self, articles: List[Dict[str, Any]]) -> int:
+        if self.insert_latency:
+            await asyncio.sleep(self.insert_latency)
+        rows_by_id = {row["id"]: row for row in self.rows}
+        for article in articles:
+            rows_by_id[article["id"]].update(article)
+        return len(articles)
+
+    async def get_article_urls(
+        self, after_id: int = 0, limit: int = 1000
+    ) -> List[Dict[str, Any]]:
+        return [
+            {"id": row["id"], "url": row["url"]}
+            for row in self.rows[after_id : after_id + limit]
+        ]
+
+
+def _with_copy(url: str, copy: int, escaped: bool) -> str:
+    if "?" not in url:
+        return f"{url}?copy={copy}"
+    return f"{url}{'&amp;' if escaped else '&'}copy={copy}"
+
+
+def _unique_item(item: str, copy: int) -> str:
+    """Make a copy of a feed item with its own link and title."""
+    if item.startswith("<entry"):
+        item = _ATOM_LINK_RE.sub(
+            lambda m: f"{m.group(1)}{_with_copy(m.group(2), copy, True)}{m.group(3)}",
+            item,
+        )
+    else:
+        item = _RSS_LINK_RE.sub(
+            lambda m: m.group(1)
+            + (m.group(2) or "")
+            + _with_copy(m.group(3).strip(), copy, not m.group(2)),
+            item,
+            count=1,
+        )
+    return _TITLE_END_RE.sub(
+        lambda m: f" copy {copy}{m.group(1) or ''}</title>", item, count=1
+    )
+
+
+def scale_feed(content: str, factor: int) -> str:
+    """Repeat every item of a feed `factor` times."""
+    items = [match.group(0) for match in _ITEM_RE.finditer(content)]
+    if not items or factor <= 1:
+        return content
+    copies = "".join(
+        _unique_item(item, copy) for copy in range(1, factor) for item in items
+    )
+    last = list(_ITEM_RE.finditer(content))[-1]
+    return content[: last.end()] + copies + content[last.end() :]
+
+
+def write_scaled_feeds(directory: Path, factor: int) -> None:
+    for path in sorted(EXAMPLE_FEEDS_DIR.glob("*.xml")):
+        scaled = scale_feed(path.read_text(encoding="utf-8"), factor)
+        (directory / path.name).write_text(scaled, encoding="utf-8")
+
+
+async def run_once(
+    base_url: str,
+    directory: Path,
+    parse_workers: int,
+    insert_latency: float,
+) -> Dict[str, Any]:
+    db = InMemoryDatabase(insert_latency=insert_latency)
+    service = FeedParserService(
+        sources=example_sources(base_url, directory),
+        db=db,  # type: ignore[arg-type]
+        use_validator_cache=False,
+        use_seen_urls=False,
+        use_story_index=False,
+        use_watermarks=False,
+        use_health=False,
+        parse_workers=parse_workers,
+    )
+
+    start = time.perf_counter()
+    result = await service.parse_all_feeds()
+    elapsed = time.perf_counter() - start
+
+    return {
+        "seconds": elapsed,
+        "entries": result["total_articles"],
+        "inserted": result["articles_inserted"],
+        "errors": result["articles_errors"],
+        "stage_seconds": service.stage_seconds,
+    }
+
+
+async def benchmark(
+    scales: List[int],
+    rounds: int,
+    parse_workers: int,
+    latency: float,
+    insert_latency: float,
+    output: Optional[Path],
+) -> List[Dict[str, Any]]:
+    results = []
+    for factor in sorted(scales):
+        with tempfile.TemporaryDirectory() as tmp:
+            directory = Path(tmp)
+            write_scaled_feeds(directory, factor)
+            with serve_feeds(directory, latency=latency) as base_url:
+                runs = [
+                    await run_once(base_url, directory, parse_workers, insert_latency)
+                    for _ in range(rounds)
+                ]
+
+        best = min(runs, key=lambda run: run["seconds"])
+        results.append(
+            {
+                "scale": factor,
+                "rounds": rounds,
+                "parse_workers": parse_workers,
+                "entries": best["entries"],
+                "inserted": best["inserted"],
+                "errors": best["errors"],
+                "best_seconds": round(best["seconds"], 4),
+                "mean_seconds": round(sum(r["seconds"] for r in runs) / rounds, 4),
+                "entries_per_second": round(best["entries"] / best["seconds"], 1),
+                "stage_seconds": {
+                    stage: round(seconds, 4)
+                    for stage, seconds in best["stage_seconds"].items()
+                },
+                # ru_maxrss is in kilobytes on Linux
+                "peak_rss_bytes": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                * 1024,
+            }
+        )
+
+    if output:
+        output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--scales", default="1,10,50")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--parse-workers", type=int, default=0)
+    parser.add_argument(
+        "--latency", type=float, default=0.0, help="Seconds of latency per feed"
+    )
+    parser.add_argument(
+        "--insert-latency",
+        type=float,
+        default=0.0,
+        help="Seconds of latency per insert request",
+    )
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    results = asyncio.run(
+        benchmark(
+            [int(scale) for scale in args.scales.split(",")],
+            args.rounds,
+            args.parse_workers,
+            args.latency,
+            args.insert_latency,
+            args.output,
+        )
+    )
+    print(json.dumps(results, indent=2))
@@ -0,0 +1,219 @@
+"""
+Benchmark the headline analysis pipeline against a simulated LLM provider.
+
+Every prompt is pointed at the fake provider in app/llm/fake_llm.py, which
+answers after a fixed latency, and headlines from example_feeds/ are run
+through SentimentAnalysisService with an in-memory stand-in for the Database.
+The same batch is processed one article at a time and with the given
+concurrency, then with the combined single call prompt, and then with both
+prompt styles sending several headlines per request. The analysis cache is
+off for those runs, the last run repeats the batch with it on and a warm
+cache. Articles/sec, LLM requests per article, estimated input tokens per
+article and the share of them served from the prompt cache are printed as
+JSON.
+
+The fake provider only caches prefixes marked with cache_control, which
+prompts only get for Anthropic models, so the cached share is 0 unless
+--cache-control marks the fake's prefixes as well. It is then the share an
+Anthropic style prompt cache would serve, as simulated by the fake, not a
+measurement of any provider.
+
+    poetry run python -m scripts.benchmark_sentiment_analysis --articles 100 --latency 0.5 --concurrency 20 --batch-size 10 --cache-control
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import feedparser  # type: ignore
+
+from app.config.prompt_config import PromptConfig, prompt_config
+from app.llm import prompt_prefix
+from app.llm.llm import get_chat_model
+from app.llm.usage import llm_metrics
+from app.services.analysis_cache import analysis_cache
+from app.services.analyzer_registry import analyzer_registry
+from app.services.run_sentiment_analysis import SentimentAnalysisService
+from scripts.feed_server import EXAMPLE_FEEDS_DIR
+
+
+class InMemorySentimentDatabase:
+    """Stand-in for Database with the methods used by SentimentAnalysisService."""
+
+    def __init__(self, articles: List[Dict[str, Any]]) -> None:
+        self.articles = articles
+        self.sentiments: List[Dict[str, Any]] = []
+
+    async def get_articles_without_sentiment(
+        self, limit: int = 100, created_after: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return self.articles[:limit]
+
+    async def insert_article_sentiment(self, **sentiment: Any) -> Dict[str, Any]:
+        row = {"id": len(self.sentiments) + 1, **sentiment}
+        self.sentiments.append(row)
+        return row
+
+    async def insert_emotional_impact_tags(self, **tags: Any) -> None:
+        pass
+
+    async def insert_category_tags(self, **tags: Any) -> None:
+        pass
+
+
+def load_articles(count: int) -> List[Dict[str, Any]]:
+    entries = [
+        entry
+        for path in sorted(EXAMPLE_FEEDS_DIR.glob("*.xml"))
+        for entry in feedparser.parse(path.read_bytes().lstrip()).entries
+        if entry.get("title")
+    ]
+    return [
+        {
+            "id": i + 1,
+            "title": entries[i % len(entries)]["title"],
+            "description": entries[i % len(entries)].get("description"),
+        }
+        for i in range(count)
+    ]
+
+
+def use_fake_provider(latency: float, combined: bool, batch_size: int) -> None:
+    """Point every prompt at the fake provider, with or without the combined one."""
+    prompt_config.combined = (
+        PromptConfig(
+            version=prompt_config.headline_sentiment.version,
+            path="prompts/combined-analysis-v1.txt",
+            model=f"fake/{latency}",
+            temperature=prompt_config.headline_sentiment.temperature,
+        )
+        if combined
+        else None
+    )
+    for prompt in prompt_config.__dict__.values():
+        if isinstance(prompt, PromptConfig):
+            prompt.model = f"fake/{latency}"
+            prompt.batch_size = batch_size
+    analyzer_registry.clear()
+
+
+async def run_once(
+    articles: List[Dict[str, Any]],
+    concurrency: int,
+    latency: float,
+    combined: bool,
+    batch_size: int = 1,
+    cache: bool = False,
+) -> Dict[str, Any]:
+    use_fake_provider(latency, combined, batch_size)
+    analysis_cache.enabled = cache
+    analysis_cache.hits, analysis_cache.shared, analysis_cache.misses = 0, 0, 0
+    llm = get_chat_model(
+        f"fake/{latency}", prompt_config.headline_sentiment.temperature
+    )
+    # Each run starts with a cold provider prompt cache
+    llm.cached_prefixes.clear()  # type: ignore[attr-defined]
+    llm_metrics.reset()
+    db = InMemorySentimentDatabase(articles)
+    service = SentimentAnalysisService(
+        batch_size=len(articles),
+        concurrency=concurrency,
+        db=db,  # type: ignore[arg-type]
+    )
+    start = time.perf_counter()
+    # The graph prints its debug output for every article
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = await service.run_sentiment_analysis()
+    elapsed = time.perf_counter() - start
+    if result["successful"] != len(articles):
+        raise RuntimeError(f"Only {result['successful']} articles succeeded")
+    return {
+        "seconds": round(elapsed, 2),
+        "articles_per_second": round(len(articles) / elapsed, 2),
+        "requests_per_article": llm_metrics.usage.calls / len(articles),
+        "input_tokens_per_article": round(
+            llm_metrics.usage.input_tokens / len(articles)
+        ),
+        "cached_input_share": round(llm_metrics.usage.stats()["cached_share"], 2),
+        "p95_latency": llm_metrics.summary(len(articles))["p95_latency"],
+    }
+
+
+async def benchmark(
+    articles: int,
+    latency: float,
+    concurrency: int,
+    batch_size: int,
+    cache_control: bool = False,
+) -> Dict[str, Any]:
+    if cache_control:
+        # Mark the fake provider's prefixes as for Anthropic models
+        prompt_prefix.CACHE_CONTROL_PROVIDERS += ("fake/",)
+    batch = load_articles(articles)
+    sequential = await run_once(batch, 1, latency, combined=False)
+    concurrent = await run_once(batch, concurrency, latency, combined=False)
+    combined = await run_once(batch, concurrency, latency, combined=True)
+    batched = await run_once(batch, concurrency, latency, False, batch_size)
+    combined_batched = await run_once(batch, concurrency, latency, True, batch_size)
+    with tempfile.TemporaryDirectory() as tmp:
+        analysis_cache.path = Path(tmp) / "analysis_cache.sqlite3"
+        await run_once(batch, concurrency, latency, True, batch_size, cache=True)
+        cached = await run_once(
+            batch, concurrency, latency, True, batch_size, cache=True
+        )
+        cached["cache"] = analysis_cache.stats()
+        analysis_cache.close()
+    return {
+        "articles": articles,
+        "latency": latency,
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "simulated_cache_control": cache_control,
+        "sequential": sequential,
+        "concurrent": concurrent,
+        "combined": combined,
+        "batched": batched,
+        "combined_batched": combined_batched,
+        "cached_rerun": cached,
+        "speedup": round(sequential["seconds"] / concurrent["seconds"], 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--articles", type=int, default=100)
+    parser.add_argument(
+        "--latency", type=float, default=0.5, help="Seconds per simulated LLM call"
+    )
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument(
+        "--batch-size", type=int, default=10, help="Headlines per batched request"
+    )
+    parser.add_argument(
+        "--cache-control",
+        action="store_true",
+        help="Mark the fake provider's prompt prefixes with cache_control to "
+        "simulate an Anthropic style prompt cache",
+    )
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    # Simulated calls are not written to the metrics sink
+    llm_metrics.sink = None
+    result = asyncio.run(
+        benchmark(
+            args.articles,
+            args.latency,
+            args.concurrency,
+            args.batch_size,
+            args.cache_control,
+        )
+    )
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,75 @@
+"""
+Check strip_html against the full BeautifulSoup parser and time both.
+
+Every description and content value in example_feeds/ is stripped with the
+fast path and with BeautifulSoup, the script exits with an error if any output
+differs, then reports the time per call for each.
+
+    poetry run python -m scripts.benchmark_strip_html --rounds 200
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import feedparser  # type: ignore
+
+from app.utils.html_mods import _strip_html_with_parser, strip_html
+from scripts.feed_server import EXAMPLE_FEEDS_DIR
+
+
+def load_descriptions(directory: Path = EXAMPLE_FEEDS_DIR) -> List[str]:
+    texts: List[str] = []
+    for path in sorted(directory.glob("*.xml")):
+        d = feedparser.parse(path.read_bytes().lstrip())
+        for entry in d.entries:
+            if entry.get("description"):
+                texts.append(entry.description)
+            for content in entry.get("content", []):
+                if content.get("value"):
+                    texts.append(content["value"])
+    return texts
+
+
+def time_calls(
+    strip: Callable[[str], Optional[str]], texts: List[str], rounds: int
+) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for text in texts:
+            strip(text)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    texts = load_descriptions()
+    mismatches = [
+        text for text in texts if strip_html(text) != _strip_html_with_parser(text)
+    ]
+    if mismatches:
+        for text in mismatches:
+            print(f"Mismatch for: {text[:200]!r}", file=sys.stderr)
+        sys.exit(1)
+
+    calls = len(texts) * args.rounds
+    fast = time_calls(strip_html, texts, args.rounds)
+    full = time_calls(_strip_html_with_parser, texts, args.rounds)
+    print(
+        json.dumps(
+            {
+                "texts": len(texts),
+                "identical": True,
+                "strip_html_us_per_call": round(fast / calls * 1e6, 2),
+                "beautifulsoup_us_per_call": round(full / calls * 1e6, 2),
+                "speedup": round(full / fast, 2),
+            },
+            indent=2,
+        )
+    )
@@ -0,0 +1,80 @@
+"""
+Serve the captured feeds in example_feeds/ over a local HTTP server so the
+feed parser can be run and timed without touching the real publishers.
+
+    poetry run python -m scripts.feed_server --port 8765 --latency 0.5
+
+The helpers are also imported by the benchmark scripts.
+"""
+
+import argparse
+import threading
+import time
+from contextlib import contextmanager
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Iterator, List
+
+from app.feed_sources import FeedSource
+
+EXAMPLE_FEEDS_DIR = Path("example_feeds")
+
+
+class FeedRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler with optional artificial latency per request."""
+
+    latency: float = 0.0
+
+    def do_GET(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+        super().do_GET()
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@contextmanager
+def serve_feeds(
+    directory: Path = EXAMPLE_FEEDS_DIR, port: int = 0, latency: float = 0.0
+) -> Iterator[str]:
+    """Serve `directory` in a background thread and yield the base URL."""
+    handler = type("Handler", (FeedRequestHandler,), {"latency": latency})
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", port), partial(handler, directory=str(directory))
+    )
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def example_sources(
+    base_url: str, directory: Path = EXAMPLE_FEEDS_DIR
+) -> List[FeedSource]:
+    """Build one FeedSource per XML file in `directory`, pointing at `base_url`."""
+    return [
+        FeedSource(path.stem, path.stem, f"{base_url}/{path.name}")
+        for path in sorted(directory.glob("*.xml"))
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with serve_feeds(port=args.port, latency=args.latency) as base_url:
+        for source in example_sources(base_url):
+            print(f"{source.id}: {source.url}")
+        print("Serving, press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
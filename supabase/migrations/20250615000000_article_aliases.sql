@@ -0,0 +1,65 @@
+-- URLs of the same story published in other feeds, linked to the article that
+-- was ingested first. news_article_url is not a foreign key so an alias can be
+-- written while the insert of its canonical article is still in flight.
+create table "public"."news_article_aliases" (
+    "id" bigint generated by default as identity not null,
+    "created_at" timestamp with time zone not null default now(),
+    "url" text not null,
+    "news_article_url" text not null,
+    "title" text,
+    "source" text not null
+);
+
+
+CREATE UNIQUE INDEX news_article_aliases_pkey ON public.news_article_aliases USING btree (id);
+
+CREATE UNIQUE INDEX news_article_aliases_url_key ON public.news_article_aliases USING btree (url);
+
+CREATE INDEX idx_naa_news_article_url ON public.news_article_aliases USING btree (news_article_url);
+
+alter table "public"."news_article_aliases" add constraint "news_article_aliases_pkey" PRIMARY KEY using index "news_article_aliases_pkey";
+
+alter table "public"."news_article_aliases" add constraint "news_article_aliases_url_key" UNIQUE using index "news_article_aliases_url_key";
+
+grant delete on table "public"."news_article_aliases" to "anon";
+
+grant insert on table "public"."news_article_aliases" to "anon";
+
+grant references on table "public"."news_article_aliases" to "anon";
+
+grant select on table "public"."news_article_aliases" to "anon";
+
+grant trigger on table "public"."news_article_aliases" to "anon";
+
+grant truncate on table "public"."news_article_aliases" to "anon";
+
+grant update on table "public"."news_article_aliases" to "anon";
+
+grant delete on table "public"."news_article_aliases" to "authenticated";
+
+grant insert on table "public"."news_article_aliases" to "authenticated";
+
+grant references on table "public"."news_article_aliases" to "authenticated";
+
+grant select on table "public"."news_article_aliases" to "authenticated";
+
+grant trigger on table "public"."news_article_aliases" to "authenticated";
+
+grant truncate on table "public"."news_article_aliases" to "authenticated";
+
+grant update on table "public"."news_article_aliases" to "authenticated";
+
+grant delete on table "public"."news_article_aliases" to "service_role";
+
+grant insert on table "public"."news_article_aliases" to "service_role";
+
+grant references on table "public"."news_article_aliases" to "service_role";
+
+grant select on table "public"."news_article_aliases" to "service_role";
+
+grant trigger on table "public"."news_article_aliases" to "service_role";
+
+grant truncate on table "public"."news_article_aliases" to "service_role";
+
+grant update on table "public"."news_article_aliases" to "service_role";
+
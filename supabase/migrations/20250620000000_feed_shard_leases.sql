@@ -0,0 +1,180 @@
+-- Lease based ownership of feed source shards, see app/services/feed_worker.py.
+-- Sources are mapped onto a fixed number of logical shards by a consistent hash
+-- of their id, and each worker leases a fair share of the shards.
+create table "public"."feed_ingest_workers" (
+    "worker_id" text not null,
+    "heartbeat_at" timestamp with time zone not null default now()
+);
+
+
+create table "public"."feed_shard_leases" (
+    "shard" integer not null,
+    "worker_id" text,
+    "leased_until" timestamp with time zone
+);
+
+
+CREATE UNIQUE INDEX feed_ingest_workers_pkey ON public.feed_ingest_workers USING btree (worker_id);
+
+CREATE UNIQUE INDEX feed_shard_leases_pkey ON public.feed_shard_leases USING btree (shard);
+
+CREATE INDEX idx_fsl_worker_id ON public.feed_shard_leases USING btree (worker_id);
+
+alter table "public"."feed_ingest_workers" add constraint "feed_ingest_workers_pkey" PRIMARY KEY using index "feed_ingest_workers_pkey";
+
+alter table "public"."feed_shard_leases" add constraint "feed_shard_leases_pkey" PRIMARY KEY using index "feed_shard_leases_pkey";
+
+set check_function_bodies = off;
+
+CREATE OR REPLACE FUNCTION public.claim_feed_shards(worker text, num_shards integer, lease_seconds integer)
+ RETURNS TABLE(shard integer)
+ LANGUAGE plpgsql
+AS $function$
+DECLARE
+    lease interval := make_interval(secs => lease_seconds);
+    live_workers integer;
+    fair_share integer;
+    owned integer;
+BEGIN
+    INSERT INTO feed_ingest_workers AS w (worker_id, heartbeat_at)
+    VALUES (worker, now())
+    ON CONFLICT (worker_id) DO UPDATE SET heartbeat_at = excluded.heartbeat_at;
+
+    DELETE FROM feed_ingest_workers w WHERE w.heartbeat_at < now() - lease;
+
+    -- Every worker must use the same number of shards
+    INSERT INTO feed_shard_leases (shard)
+    SELECT generate_series(0, num_shards - 1)
+    ON CONFLICT DO NOTHING;
+    DELETE FROM feed_shard_leases l WHERE l.shard >= num_shards;
+
+    SELECT count(*) INTO live_workers FROM feed_ingest_workers;
+    fair_share := ceil(num_shards::numeric / greatest(live_workers, 1));
+
+    -- Give up shards beyond the fair share, so a new worker gets some
+    UPDATE feed_shard_leases l
+    SET worker_id = NULL, leased_until = NULL
+    WHERE l.shard IN (
+        SELECT o.shard FROM feed_shard_leases o
+        WHERE o.worker_id = worker
+        ORDER BY o.shard
+        OFFSET fair_share
+    );
+
+    UPDATE feed_shard_leases l
+    SET leased_until = now() + lease
+    WHERE l.worker_id = worker;
+    GET DIAGNOSTICS owned = ROW_COUNT;
+
+    -- Take over free shards and the shards of workers whose lease ran out
+    UPDATE feed_shard_leases l
+    SET worker_id = worker, leased_until = now() + lease
+    WHERE l.shard IN (
+        SELECT f.shard FROM feed_shard_leases f
+        WHERE f.worker_id IS NULL OR f.leased_until < now()
+        ORDER BY f.shard
+        LIMIT greatest(fair_share - owned, 0)
+        FOR UPDATE SKIP LOCKED
+    );
+
+    RETURN QUERY
+    SELECT l.shard FROM feed_shard_leases l
+    WHERE l.worker_id = worker
+    ORDER BY l.shard;
+END;
+$function$
+;
+
+CREATE OR REPLACE FUNCTION public.release_feed_shards(worker text)
+ RETURNS void
+ LANGUAGE sql
+AS $function$
+    UPDATE feed_shard_leases SET worker_id = NULL, leased_until = NULL WHERE worker_id = worker;
+    DELETE FROM feed_ingest_workers WHERE worker_id = worker;
+$function$
+;
+
+grant delete on table "public"."feed_ingest_workers" to "anon";
+
+grant insert on table "public"."feed_ingest_workers" to "anon";
+
+grant references on table "public"."feed_ingest_workers" to "anon";
+
+grant select on table "public"."feed_ingest_workers" to "anon";
+
+grant trigger on table "public"."feed_ingest_workers" to "anon";
+
+grant truncate on table "public"."feed_ingest_workers" to "anon";
+
+grant update on table "public"."feed_ingest_workers" to "anon";
+
+grant delete on table "public"."feed_ingest_workers" to "authenticated";
+
+grant insert on table "public"."feed_ingest_workers" to "authenticated";
+
+grant references on table "public"."feed_ingest_workers" to "authenticated";
+
+grant select on table "public"."feed_ingest_workers" to "authenticated";
+
+grant trigger on table "public"."feed_ingest_workers" to "authenticated";
+
+grant truncate on table "public"."feed_ingest_workers" to "authenticated";
+
+grant update on table "public"."feed_ingest_workers" to "authenticated";
+
+grant delete on table "public"."feed_ingest_workers" to "service_role";
+
+grant insert on table "public"."feed_ingest_workers" to "service_role";
+
+grant references on table "public"."feed_ingest_workers" to "service_role";
+
+grant select on table "public"."feed_ingest_workers" to "service_role";
+
+grant trigger on table "public"."feed_ingest_workers" to "service_role";
+
+grant truncate on table "public"."feed_ingest_workers" to "service_role";
+
+grant update on table "public"."feed_ingest_workers" to "service_role";
+
+grant delete on table "public"."feed_shard_leases" to "anon";
+
+grant insert on table "public"."feed_shard_leases" to "anon";
+
+grant references on table "public"."feed_shard_leases" to "anon";
+
+grant select on table "public"."feed_shard_leases" to "anon";
+
+grant trigger on table "public"."feed_shard_leases" to "anon";
+
+grant truncate on table "public"."feed_shard_leases" to "anon";
+
+grant update on table "public"."feed_shard_leases" to "anon";
+
+grant delete on table "public"."feed_shard_leases" to "authenticated";
+
+grant insert on table "public"."feed_shard_leases" to "authenticated";
+
+grant references on table "public"."feed_shard_leases" to "authenticated";
+
+grant select on table "public"."feed_shard_leases" to "authenticated";
+
+grant trigger on table "public"."feed_shard_leases" to "authenticated";
+
+grant truncate on table "public"."feed_shard_leases" to "authenticated";
+
+grant update on table "public"."feed_shard_leases" to "authenticated";
+
+grant delete on table "public"."feed_shard_leases" to "service_role";
+
+grant insert on table "public"."feed_shard_leases" to "service_role";
+
+grant references on table "public"."feed_shard_leases" to "service_role";
+
+grant select on table "public"."feed_shard_leases" to "service_role";
+
+grant trigger on table "public"."feed_shard_leases" to "service_role";
+
+grant truncate on table "public"."feed_shard_leases" to "service_role";
+
+grant update on table "public"."feed_shard_leases" to "service_role";
+
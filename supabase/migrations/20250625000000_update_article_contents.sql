@@ -0,0 +1,22 @@
+set check_function_bodies = off;
+
+-- Bulk update of the extracted article bodies, one call per batch of pages
+-- instead of one request per article, see app/services/article_content.py
+CREATE OR REPLACE FUNCTION public.update_article_contents(articles jsonb)
+ RETURNS integer
+ LANGUAGE sql
+AS $function$
+    WITH updated AS (
+        UPDATE news_articles na
+        SET content = a.content,
+            markdown_content = a.markdown_content,
+            html_content = a.html_content
+        FROM jsonb_to_recordset(articles) AS a(id bigint, content text, markdown_content text, html_content text)
+        WHERE na.id = a.id
+        RETURNING 1
+    )
+    SELECT count(*)::integer FROM updated;
+$function$
+;
+
+CREATE INDEX idx_na_without_content ON public.news_articles USING btree (id DESC) WHERE (content IS NULL);